@@ -1,8 +1,6 @@
 import slicer
 from slicer.ScriptedLoadableModule import *
 
-from DentalSegmentatorLib import SegmentationWidget
-
 
 class DentalSegmentator(ScriptedLoadableModule):
     def __init__(self, parent):
@@ -37,11 +35,17 @@ class DentalSegmentatorWidget(ScriptedLoadableModuleWidget):
     def setup(self) -> None:
         """Called when the user opens the module the first time and the widget is initialized."""
         ScriptedLoadableModuleWidget.setup(self)
+
+        # Imported on module opening rather than on Slicer startup
+        from DentalSegmentatorLib import SegmentationWidget
         widget = SegmentationWidget()
         self.logic = widget.logic
         self.layout.addWidget(widget)
         self.layout.addStretch()
 
+        # Check the dependencies and weights while the user loads and inspects the volume to segment
+        widget.startPrefetch()
+
 
 class DentalSegmentatorTest(ScriptedLoadableModuleTest):
     def runTest(self):
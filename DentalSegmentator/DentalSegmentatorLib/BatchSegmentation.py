@@ -0,0 +1,351 @@
+import json
+import logging
+import time
+import traceback
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional
+
+import slicer
+
+from .ClosedSurfaceCache import ClosedSurfaceCache
+from .PythonDependencyChecker import PythonDependencyChecker
+from .SegmentationExport import ExportFormat, exportSegmentation
+from .SegmentationPostProcessing import SegmentationPostProcessor
+
+
+@dataclass
+class BatchCaseResult:
+    """
+    Status and timings of one processed case. Serialized as is in the batch manifest.
+    """
+    inputPath: str
+    outputFolder: str
+    status: str = "pending"
+    error: str = ""
+    timings_s: dict = field(default_factory=dict)
+
+    def isSuccess(self):
+        return self.status == "success"
+
+
+class BatchSegmentationLogic:
+    """
+    Runs the DentalSegmentator inference, post-processing and export on a list of volume files without the module UI.
+    Each case is processed independently : a failing case is reported in the manifest and the batch moves on to the
+    next case.
+
+    Usage example from the Slicer python console or from a script run with `Slicer --no-main-window --python-script` :
+
+        logic = BatchSegmentationLogic(device="cuda")
+        results = logic.run(BatchSegmentationLogic.findInputFiles("/path/to/scans"), "/path/to/output")
+    """
+
+    manifestName = "dental_segmentator_manifest.json"
+    volumeExtensions = (".nii", ".nii.gz", ".nrrd", ".nhdr", ".mha", ".mhd")
+
+    def __init__(
+            self,
+            device: str = "cuda",
+            exportFormats: ExportFormat = ExportFormat.STL | ExportFormat.NIFTI,
+            reductionFactor: float = 0.9,
+            minimumIslandSize_mm3: float = 60,
+            logic=None,
+            dependencyChecker: Optional[PythonDependencyChecker] = None,
+            progressCallback: Optional[Callable[[str], None]] = None,
+            allowUnverifiedWeights: bool = False
+    ):
+        """
+        :param device: Inference device ("cuda", "cpu" or "mps").
+        :param exportFormats: ExportFormat flags used for each processed case.
+        :param reductionFactor: glTF decimation factor.
+        :param minimumIslandSize_mm3: Islands smaller than this volume are removed during post-processing.
+        :param logic: Optional segmentation logic. Defaults to the SlicerNNUNet SegmentationLogic.
+        :param dependencyChecker: Optional dependency checker used to download the weights when missing.
+        :param progressCallback: Optional function called with progress information. Defaults to logging.info.
+        :param allowUnverifiedWeights: If True, downloads the weights even if no SHA-256 digest is available to verify
+            them.
+        """
+        self.device = device
+        self.exportFormats = exportFormats
+        self.reductionFactor = reductionFactor
+        self.progressCallback = progressCallback or logging.info
+        self.allowUnverifiedWeights = allowUnverifiedWeights
+        self.logic = logic
+        self._dependencyChecker = dependencyChecker
+        self._postProcessor = SegmentationPostProcessor(minimumIslandSize_mm3, self.progressCallback)
+        # Cases don't share surfaces : only the surfaces of the last exported case are kept for its mesh exports
+        self._surfaceCache = ClosedSurfaceCache(maxSize_MB=0)
+        self._inferenceError = ""
+        self._isInferenceFinished = False
+
+    @classmethod
+    def findInputFiles(cls, inputPaths) -> List[Path]:
+        """
+        Expand the input list of files and directories into the sorted list of volume files to process.
+        """
+        if isinstance(inputPaths, (str, Path)):
+            inputPaths = [inputPaths]
+
+        files = []
+        for inputPath in map(Path, inputPaths):
+            if inputPath.is_dir():
+                files.extend(sorted(p for p in inputPath.iterdir() if cls.isVolumeFile(p)))
+            else:
+                files.append(inputPath)
+        return files
+
+    @classmethod
+    def isVolumeFile(cls, path: Path) -> bool:
+        return path.is_file() and path.name.lower().endswith(cls.volumeExtensions)
+
+    @classmethod
+    def caseName(cls, path: Path) -> str:
+        name = path.name
+        for ext in sorted(cls.volumeExtensions, key=len, reverse=True):
+            if name.lower().endswith(ext):
+                return name[:-len(ext)]
+        return path.stem
+
+    @classmethod
+    def caseFolders(cls, inputFiles: Iterable, outputFolder, previousResults: Optional[dict] = None) -> dict:
+        """
+        Assign a distinct output folder to each input file. Folders are named after the input files and suffixed with
+        _2, _3, ... when inputs from different directories share the same name. Cases recorded in the previous manifest
+        keep their folder.
+
+        :param inputFiles: List of volume files to process.
+        :param outputFolder: Output folder in which the case folders are written.
+        :param previousResults: Optional dict of input path to BatchCaseResult read from the previous manifest.
+        :returns: dict of input path to case folder.
+        """
+        outputFolder = Path(outputFolder)
+        folders = {
+            inputPath: outputFolder.joinpath(Path(result.outputFolder).name)
+            for inputPath, result in (previousResults or {}).items()
+        }
+
+        # Names are compared case-insensitively for the case-insensitive file systems
+        usedNames = {folder.name.lower() for folder in folders.values()}
+        for inputFile in map(Path, inputFiles):
+            if inputFile.as_posix() in folders:
+                continue
+
+            name = folderName = cls.caseName(inputFile)
+            index = 2
+            while folderName.lower() in usedNames:
+                folderName = f"{name}_{index}"
+                index += 1
+            usedNames.add(folderName.lower())
+            folders[inputFile.as_posix()] = outputFolder.joinpath(folderName)
+        return folders
+
+    def prepare(self) -> bool:
+        """
+        Install the nnUNet dependencies and download the weights if needed.
+
+        :returns: True if the inference can be run. False otherwise.
+        """
+        try:
+            from SlicerNNUNetLib import InstallLogic, SegmentationLogic
+        except ImportError:
+            self.progressCallback("The NNUNet module is not available. Please install the NNUNet extension.")
+            return False
+
+        installLogic = InstallLogic()
+        installLogic.progressInfo.connect(self.progressCallback)
+        if not installLogic.setupPythonRequirements():
+            return False
+
+        if self._dependencyChecker is None:
+            self._dependencyChecker = PythonDependencyChecker(
+                errorDisplayF=self._logError,
+                confirmUnverifiedDownloadF=lambda download_url: self.allowUnverifiedWeights
+            )
+
+        if self._dependencyChecker.areWeightsMissing():
+            if not self._dependencyChecker.downloadWeights(self.progressCallback):
+                return False
+
+        if self.logic is None:
+            self.logic = SegmentationLogic()
+        return True
+
+    def run(self, inputFiles: Iterable, outputFolder, skipProcessed: bool = True) -> List[BatchCaseResult]:
+        """
+        Process each input file and write the results in a dedicated sub folder of outputFolder. The folder of each case
+        is recorded in the manifest. The manifest is written after each case to keep track of the batch state if the run
+        is interrupted.
+
+        :param inputFiles: List of volume files to process.
+        :param outputFolder: Output folder in which the case folders and the manifest will be written.
+        :param skipProcessed: If True, cases which were successfully processed in a previous run are skipped.
+        :returns: List of BatchCaseResult for each input file.
+        """
+        inputFiles = list(map(Path, inputFiles))
+        outputFolder = Path(outputFolder)
+        outputFolder.mkdir(parents=True, exist_ok=True)
+        previousResults = self.readManifest(outputFolder)
+        caseFolders = self.caseFolders(inputFiles, outputFolder, previousResults)
+
+        if not self.prepare():
+            raise RuntimeError("Failed to prepare the DentalSegmentator dependencies.")
+
+        self._connectLogic()
+        results = []
+        try:
+            for inputFile in inputFiles:
+                previous = previousResults.get(inputFile.as_posix())
+                if skipProcessed and previous is not None and previous.isSuccess():
+                    self.progressCallback(f"Skipping already processed case {inputFile}")
+                    previous.status = "skipped"
+                    results.append(previous)
+                    continue
+
+                results.append(self.processCase(inputFile, caseFolders[inputFile.as_posix()]))
+                self.writeManifest(outputFolder, results)
+        finally:
+            self._disconnectLogic()
+            self._postProcessor.cleanup()
+
+        self.writeManifest(outputFolder, results)
+        return results
+
+    def processCase(self, inputFile: Path, caseFolder: Path) -> BatchCaseResult:
+        """
+        Load, segment, post-process and export one case. Errors are caught and reported in the returned result.
+        """
+        result = BatchCaseResult(inputPath=inputFile.as_posix(), outputFolder=caseFolder.as_posix())
+        createdNodes = []
+        start = time.perf_counter()
+        self.progressCallback(f"Processing {inputFile}...")
+
+        def timed(stepName, f, *args):
+            stepStart = time.perf_counter()
+            try:
+                return f(*args)
+            finally:
+                result.timings_s[stepName] = round(time.perf_counter() - stepStart, 3)
+
+        try:
+            volumeNode = timed("load", slicer.util.loadVolume, inputFile.as_posix())
+            createdNodes.append(volumeNode)
+
+            timed("inference", self._runInference, volumeNode)
+            segmentationNode = timed("loadResults", self.logic.loadSegmentation)
+            createdNodes.append(segmentationNode)
+            segmentationNode.SetName(volumeNode.GetName() + "_Segmentation")
+            segmentationNode.SetReferenceImageGeometryParameterFromVolumeNode(volumeNode)
+
+            SegmentationPostProcessor.setSegmentNamesAndColors(segmentationNode)
+            timed("postProcessing", self._postProcessor.process, segmentationNode, volumeNode)
+
+            caseFolder.mkdir(parents=True, exist_ok=True)
+            timed("export", self._export, segmentationNode, caseFolder)
+            result.status = "success"
+        except Exception as e:  # noqa
+            result.status = "failed"
+            result.error = f"{e}\n{traceback.format_exc()}"
+            self.progressCallback(f"Failed to process {inputFile} :\n{e}")
+        finally:
+            for node in createdNodes:
+                if node is not None and slicer.mrmlScene.IsNodePresent(node):
+                    slicer.mrmlScene.RemoveNode(node)
+            result.timings_s["total"] = round(time.perf_counter() - start, 3)
+
+        self.progressCallback(f"{inputFile} : {result.status} in {result.timings_s['total']} s")
+        return result
+
+    def createParameter(self):
+        from SlicerNNUNetLib import Parameter
+        dependencyChecker = self._dependencyChecker or PythonDependencyChecker(errorDisplayF=self._logError)
+        parameter = Parameter(folds="0", modelPath=dependencyChecker.getActiveWeightsFolder(), device=self.device)
+        if not parameter.isSelectedDeviceAvailable():
+            self.progressCallback(
+                f"Selected device ({parameter.device.upper()}) is not available. The inference will run on CPU."
+            )
+        return parameter
+
+    def _runInference(self, volumeNode):
+        self._inferenceError = ""
+        self._isInferenceFinished = False
+        self.logic.setParameter(self.createParameter())
+        self.logic.startSegmentation(volumeNode)
+        self.logic.waitForSegmentationFinished()
+        slicer.app.processEvents()
+
+        if self._inferenceError:
+            raise RuntimeError(f"Encountered error during inference :\n{self._inferenceError}")
+        if not self._isInferenceFinished:
+            raise RuntimeError("Inference was interrupted before completion.")
+
+    def _export(self, segmentationNode, caseFolder: Path):
+        exportSegmentation(
+            segmentationNode,
+            caseFolder.as_posix(),
+            self.exportFormats,
+            self.reductionFactor,
+            errorDisplayF=self._raiseError,
+            surfaceCache=self._surfaceCache
+        )
+
+    def _connectLogic(self):
+        self._connectIds = [
+            (self.logic.progressInfo, self.logic.progressInfo.connect(self.progressCallback)),
+            (self.logic.errorOccurred, self.logic.errorOccurred.connect(self._onInferenceError)),
+            (self.logic.inferenceFinished, self.logic.inferenceFinished.connect(self._onInferenceFinished)),
+        ]
+
+    def _disconnectLogic(self):
+        for signal, connectId in getattr(self, "_connectIds", []):
+            signal.disconnect(connectId)
+        self._connectIds = []
+
+    def _onInferenceError(self, errorMsg):
+        self._inferenceError = errorMsg
+
+    def _onInferenceFinished(self, *_):
+        self._isInferenceFinished = True
+
+    def _logError(self, msg, *_, **__):
+        logging.error(msg)
+
+    @staticmethod
+    def _raiseError(msg, *_, **__):
+        raise RuntimeError(msg)
+
+    @classmethod
+    def manifestPath(cls, outputFolder) -> Path:
+        return Path(outputFolder).joinpath(cls.manifestName)
+
+    @classmethod
+    def writeManifest(cls, outputFolder, results: List[BatchCaseResult]):
+        manifest = {
+            "cases": [asdict(result) for result in results],
+            "summary": {
+                status: sum(result.status == status for result in results)
+                for status in ["success", "failed", "skipped"]
+            },
+        }
+        cls.manifestPath(outputFolder).write_text(json.dumps(manifest, indent=2))
+
+    @classmethod
+    def readManifest(cls, outputFolder) -> dict:
+        """
+        :returns: dict of input path to BatchCaseResult for the cases stored in the output folder manifest.
+        """
+        path = cls.manifestPath(outputFolder)
+        if not path.exists():
+            return {}
+
+        try:
+            cases = json.loads(path.read_text()).get("cases", [])
+            results = [BatchCaseResult(**case) for case in cases]
+        except (ValueError, TypeError):
+            return {}
+
+        # Skipped cases were successful in an earlier run
+        for result in results:
+            if result.status == "skipped":
+                result.status = "success"
+        return {result.inputPath: result for result in results}
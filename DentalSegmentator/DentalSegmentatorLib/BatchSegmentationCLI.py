@@ -0,0 +1,79 @@
+"""
+Command line entry point for the DentalSegmentator batch segmentation.
+
+Usage :
+    Slicer --no-main-window --python-script /path/to/DentalSegmentatorLib/BatchSegmentationCLI.py \\
+        -i /path/to/scans /path/to/other_scan.nii.gz -o /path/to/output --device cuda --formats STL NIFTI
+
+Each input can be a volume file or a directory containing volume files. The results of each case are written to a
+dedicated sub folder of the output directory along with a JSON manifest containing the status and timings of each case.
+"""
+import argparse
+import logging
+import sys
+
+
+def parseArgs(argv):
+    parser = argparse.ArgumentParser(description="DentalSegmentator batch segmentation.")
+    parser.add_argument("-i", "--input", nargs="+", required=True, help="Input volume files or directories.")
+    parser.add_argument("-o", "--output", required=True, help="Output directory.")
+    parser.add_argument("--device", default="cuda", choices=["cuda", "cpu", "mps"], help="Inference device.")
+    parser.add_argument(
+        "--formats",
+        nargs="+",
+        default=["STL", "NIFTI"],
+        choices=["STL", "OBJ", "NIFTI", "GLTF"],
+        help="Export formats."
+    )
+    parser.add_argument("--reduction-factor", type=float, default=0.9, help="glTF decimation factor.")
+    parser.add_argument(
+        "--no-skip",
+        action="store_true",
+        help="Process all the inputs even if they were successfully processed by a previous run."
+    )
+    parser.add_argument(
+        "--allow-unverified-weights",
+        action="store_true",
+        help="Download the model weights even if no SHA-256 digest is available to verify them."
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv) -> int:
+    from DentalSegmentatorLib.BatchSegmentation import BatchSegmentationLogic
+    from DentalSegmentatorLib.SegmentationExport import ExportFormat
+
+    args = parseArgs(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s :: %(message)s")
+
+    exportFormats = ExportFormat(0)
+    for formatName in args.formats:
+        exportFormats |= ExportFormat[formatName]
+
+    logic = BatchSegmentationLogic(
+        device=args.device,
+        exportFormats=exportFormats,
+        reductionFactor=args.reduction_factor,
+        allowUnverifiedWeights=args.allow_unverified_weights
+    )
+    inputFiles = logic.findInputFiles(args.input)
+    if not inputFiles:
+        logging.error(f"No volume found in {args.input}")
+        return 1
+
+    try:
+        results = logic.run(inputFiles, args.output, skipProcessed=not args.no_skip)
+    except RuntimeError as e:
+        logging.error(e)
+        return 1
+
+    nFailed = sum(result.status == "failed" for result in results)
+    logging.info(
+        f"Batch finished : {len(results) - nFailed}/{len(results)} cases processed. "
+        f"Manifest : {logic.manifestPath(args.output)}"
+    )
+    return 1 if nFailed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,275 @@
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List
+
+import slicer
+import vtk
+
+from .SegmentationExport import combineHashes, segmentLabelmapHashes
+from .Tracing import traceSpan
+
+
+class ClosedSurfaceCache:
+    """
+    In memory cache of the closed surface representation of the segments shared by the 3D display and the exports.
+
+    Surfaces are addressed by the hash of the segment binary labelmap content and geometry and the closed surface
+    conversion parameters. Renaming or recoloring a segment doesn't change its surface. The missing surfaces are
+    generated concurrently, one segment per worker thread, on binary labelmaps detached from the MRML scene. The
+    surfaces are then set as the closed surface representation of the segmentation node, which is reused as is by the
+    show 3D button, the STL / OBJ export and the OpenAnatomy glTF export.
+
+    The cached surfaces are shared with the segmentation nodes, not copied. A surface modified in place by its node is
+    dropped from the cache. Cached surfaces are evicted in least recently used order when their total size exceeds
+    maxSize_MB.
+    """
+
+    conversionParameterNames = [
+        "Smoothing factor",
+        "Decimation factor",
+        "Compute surface normals",
+        "Joint smoothing",
+        "Conversion method",
+    ]
+    keyArrayName = "DentalSegmentatorSurfaceKey"
+    defaultMaxSize_MB = 1024
+    maxLabelmapHashEntries = 8
+
+    def __init__(self, maxSize_MB=defaultMaxSize_MB, maxWorkers=None, tracer=None):
+        """
+        :param maxSize_MB: Maximum total size of the cached surfaces. The surfaces of the last applied segmentation
+            are always kept.
+        :param maxWorkers: Optional maximum number of worker threads. Defaults to the number of CPUs.
+        :param tracer: Optional tracer recording the surface generation time.
+        """
+        self.maxSize_MB = maxSize_MB
+        self.maxWorkers = maxWorkers or os.cpu_count() or 1
+        self.tracer = tracer
+        self.nHits = 0
+        self.nMisses = 0
+        self._surfaces = OrderedDict()
+        self._labelmapHashes = OrderedDict()
+
+    def __len__(self):
+        return len(self._surfaces)
+
+    @property
+    def size_MB(self) -> float:
+        return sum(size_kB for _, _, size_kB in self._surfaces.values()) / 1024
+
+    def clear(self):
+        self._surfaces.clear()
+        self._labelmapHashes.clear()
+
+    @staticmethod
+    def closedSurfaceName():
+        return slicer.vtkSegmentationConverter.GetSegmentationClosedSurfaceRepresentationName()
+
+    @staticmethod
+    def binaryLabelmapName():
+        return slicer.vtkSegmentationConverter.GetBinaryLabelmapRepresentationName()
+
+    @classmethod
+    def conversionParameters(cls, segmentationNode) -> dict:
+        segmentation = segmentationNode.GetSegmentation()
+        return {name: segmentation.GetConversionParameter(name) for name in cls.conversionParameterNames}
+
+    @classmethod
+    def isJointSmoothingEnabled(cls, segmentationNode) -> bool:
+        """
+        Joint smoothing depends on all the segments and can't be computed one segment at a time.
+        """
+        try:
+            return float(cls.conversionParameters(segmentationNode)["Joint smoothing"] or 0) > 0
+        except ValueError:
+            return False
+
+    def labelmapHashes(self, segmentationNode) -> dict:
+        """
+        Hash the labelmap content and geometry of each segment. Hashes are reused as long as the segment labelmaps are
+        not modified, which avoids hashing the full volume again on each display update, smoothing change or export.
+
+        :returns: dict of segment ID to hash. Hashes are None if the segment is not stored as a binary labelmap.
+        """
+        segmentation = segmentationNode.GetSegmentation()
+        signature = []
+        for i in range(segmentation.GetNumberOfSegments()):
+            segmentId = segmentation.GetNthSegmentID(i)
+            labelmap = segmentation.GetLayerDataObject(segmentation.GetLayerIndex(segmentId))
+            signature.append((
+                segmentId,
+                segmentation.GetSegment(segmentId).GetLabelValue(),
+                labelmap.GetMTime() if labelmap is not None else None
+            ))
+        signature = (segmentation.GetSourceRepresentationName(), tuple(signature))
+
+        if signature not in self._labelmapHashes:
+            self._labelmapHashes[signature] = segmentLabelmapHashes(segmentationNode)
+            while len(self._labelmapHashes) > self.maxLabelmapHashEntries:
+                self._labelmapHashes.popitem(last=False)
+        self._labelmapHashes.move_to_end(signature)
+        return dict(self._labelmapHashes[signature])
+
+    def surfaceKeys(self, segmentationNode) -> dict:
+        """
+        :returns: dict of segment ID to surface key. Keys are None if the segment content can't be hashed.
+        """
+        parameters = self.conversionParameters(segmentationNode)
+        return {
+            segmentId: combineHashes({"labelmap": labelmapHash}, **parameters)
+            for segmentId, labelmapHash in self.labelmapHashes(segmentationNode).items()
+        }
+
+    def applyTo(self, segmentationNode) -> bool:
+        """
+        Set the cached closed surfaces as the closed surface representation of the segmentation node. Surfaces missing
+        from the cache are generated concurrently and added to the cache.
+
+        Falls back to the segmentation node closed surface conversion if the segments can't be converted independently.
+
+        :returns: True if the closed surface representation is available, False otherwise.
+        """
+        if segmentationNode is None:
+            return False
+
+        segmentation = segmentationNode.GetSegmentation()
+        isLabelmapSource = segmentation.GetSourceRepresentationName() == self.binaryLabelmapName()
+        if not isLabelmapSource or self.isJointSmoothingEnabled(segmentationNode):
+            return segmentationNode.CreateClosedSurfaceRepresentation()
+
+        keys = self.surfaceKeys(segmentationNode)
+        if any(key is None for key in keys.values()):
+            return segmentationNode.CreateClosedSurfaceRepresentation()
+
+        outdatedIds = [
+            segmentId for segmentId, key in keys.items() if not self._isApplied(segmentation, segmentId, key)
+        ]
+        cachedSurfaces = {segmentId: self._cachedSurface(keys[segmentId]) for segmentId in outdatedIds}
+        missingIds = [segmentId for segmentId, polyData in cachedSurfaces.items() if polyData is None]
+        self.nHits += len(outdatedIds) - len(missingIds)
+        self.nMisses += len(missingIds)
+
+        for segmentId, polyData in self._generateSurfaces(segmentationNode, missingIds).items():
+            cachedSurfaces[segmentId] = self._addSurface(keys[segmentId], polyData)
+
+        for segmentId, polyData in cachedSurfaces.items():
+            segmentation.GetSegment(segmentId).AddRepresentation(self.closedSurfaceName(), polyData)
+
+        self._evict(set(keys.values()))
+        return True
+
+    @contextmanager
+    def modifyingLabelmaps(self, segmentationNode):
+        """
+        Context manager removing the closed surfaces of the node while its labelmaps are modified. The segmentation
+        otherwise converts all its surfaces again, one segment at a time, after each labelmap modification. The
+        surfaces are restored from the cache on exit.
+        """
+        hasSurfaces = segmentationNode.GetSegmentation().ContainsRepresentation(self.closedSurfaceName())
+        if hasSurfaces:
+            segmentationNode.RemoveClosedSurfaceRepresentation()
+        try:
+            yield
+        finally:
+            if hasSurfaces:
+                self.applyTo(segmentationNode)
+
+    def _isApplied(self, segmentation, segmentId, key) -> bool:
+        """
+        :returns: True if the segment closed surface was set from the cache surface of the input key.
+        """
+        polyData = segmentation.GetSegment(segmentId).GetRepresentation(self.closedSurfaceName())
+        if polyData is None:
+            return False
+
+        keyArray = polyData.GetFieldData().GetAbstractArray(self.keyArrayName)
+        return keyArray is not None and keyArray.GetNumberOfValues() > 0 and keyArray.GetValue(0) == key
+
+    def _cachedSurface(self, key):
+        """
+        :returns: Cached surface of the key or None if the surface is not cached or was modified since it was cached.
+        """
+        if key not in self._surfaces:
+            return None
+
+        polyData, mTime, _ = self._surfaces[key]
+        if polyData.GetMTime() != mTime:
+            del self._surfaces[key]
+            return None
+        return polyData
+
+    def _addSurface(self, key, polyData):
+        """
+        Tag the surface with its key and add it to the cache.
+        """
+        keyArray = vtk.vtkStringArray()
+        keyArray.SetName(self.keyArrayName)
+        keyArray.InsertNextValue(key)
+        polyData.GetFieldData().AddArray(keyArray)
+        self._surfaces[key] = (polyData, polyData.GetMTime(), polyData.GetActualMemorySize())
+        return polyData
+
+    def _generateSurfaces(self, segmentationNode, segmentIds: List[str]) -> dict:
+        """
+        Convert the binary labelmap of each input segment to a closed surface in the worker threads.
+
+        :returns: dict of segment ID to generated vtkPolyData.
+        :raises RuntimeError: if any of the conversions failed.
+        """
+        if not segmentIds:
+            return {}
+
+        with traceSpan(self.tracer, "Closed surface generation", "display", nSegments=len(segmentIds)):
+            detachedSegmentations = {
+                segmentId: self._createDetachedSegmentation(segmentationNode, segmentId) for segmentId in segmentIds
+            }
+            nWorkers = max(1, min(self.maxWorkers, len(segmentIds)))
+            with ThreadPoolExecutor(max_workers=nWorkers) as executor:
+                polyDatas = executor.map(self._convertToClosedSurface, detachedSegmentations.values())
+                surfaces = dict(zip(segmentIds, polyDatas))
+
+        failedNames = [
+            segmentationNode.GetSegmentation().GetSegment(segmentId).GetName()
+            for segmentId, surface in surfaces.items() if surface is None
+        ]
+        if failedNames:
+            raise RuntimeError(f"Failed to generate the closed surface of {', '.join(failedNames)}.")
+        return surfaces
+
+    def _createDetachedSegmentation(self, segmentationNode, segmentId):
+        """
+        Copy the binary labelmap of the segment and the conversion parameters of the node to a segmentation detached
+        from the MRML scene.
+        """
+        labelmap = slicer.vtkOrientedImageData()
+        segmentationNode.GetBinaryLabelmapRepresentation(segmentId, labelmap)
+
+        segmentation = slicer.vtkSegmentation()
+        segmentation.SetSourceRepresentationName(self.binaryLabelmapName())
+        segmentation.CopyConversionParameters(segmentationNode.GetSegmentation())
+        segment = slicer.vtkSegment()
+        segment.AddRepresentation(self.binaryLabelmapName(), labelmap)
+        segmentation.AddSegment(segment, segmentId)
+        return segmentation
+
+    def _convertToClosedSurface(self, segmentation):
+        if not segmentation.CreateRepresentation(self.closedSurfaceName()):
+            return None
+
+        # The detached segmentation is discarded and its surface is owned by the cache
+        return segmentation.GetNthSegment(0).GetRepresentation(self.closedSurfaceName())
+
+    def _evict(self, usedKeys):
+        """
+        Evict the least recently used surfaces. Surfaces of the used keys are never evicted.
+        """
+        for key in usedKeys & self._surfaces.keys():
+            self._surfaces.move_to_end(key)
+
+        size_kB = sum(surfaceSize_kB for _, _, surfaceSize_kB in self._surfaces.values())
+        for key in list(self._surfaces):
+            if size_kB <= self.maxSize_MB * 1024 or key in usedKeys:
+                break
+            size_kB -= self._surfaces.pop(key)[2]
@@ -0,0 +1,247 @@
+import json
+import platform
+import time
+from copy import copy
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+import qt
+
+from .FieldOfViewCropping import FieldOfViewCrop, computeAnatomyBoundingBox
+from .FoldEnsemble import availableCpus, cappedThreads
+from .Signal import Signal
+
+
+@dataclass
+class CpuProfile:
+    """
+    Fastest CPU inference configuration measured on a machine.
+    """
+    nThreads: int
+    nProcessPreprocessing: int = 1
+    nProcessSegmentationExport: int = 1
+    runtime_s: float = 0.0
+    machineId: str = ""
+    createdAt: str = ""
+
+    def cpuSet(self):
+        """
+        :returns: Set of CPUs the inference is limited to.
+        """
+        return set(availableCpus()[:max(1, self.nThreads)])
+
+    def applyTo(self, parameter):
+        """
+        Set the worker counts of the profile on the nnU-Net parameter if supported.
+        """
+        for name in ["nProcessPreprocessing", "nProcessSegmentationExport"]:
+            if hasattr(parameter, name):
+                setattr(parameter, name, getattr(self, name))
+
+    def describe(self) -> str:
+        return (
+            f"{self.nThreads} threads, {self.nProcessPreprocessing} preprocessing and "
+            f"{self.nProcessSegmentationExport} export workers"
+        )
+
+
+def machineId() -> str:
+    """
+    :returns: Identifier of the current machine and of its CPU configuration.
+    """
+    return "_".join([platform.node() or "unknown", platform.machine(), str(len(availableCpus()))])
+
+
+class CpuProfileStore:
+    """
+    Per-machine CPU profiles persisted in the application settings.
+    """
+
+    settingsGroup = "DentalSegmentator/CpuProfiles"
+
+    @classmethod
+    def _key(cls) -> str:
+        return f"{cls.settingsGroup}/{machineId()}"
+
+    @classmethod
+    def load(cls) -> Optional[CpuProfile]:
+        """
+        :returns: Profile of the current machine or None if the machine was not autotuned.
+        """
+        value = qt.QSettings().value(cls._key(), "")
+        if not value:
+            return None
+
+        try:
+            return CpuProfile(**json.loads(value))
+        except (TypeError, ValueError):
+            return None
+
+    @classmethod
+    def save(cls, profile: CpuProfile):
+        qt.QSettings().setValue(cls._key(), json.dumps(asdict(profile)))
+
+    @classmethod
+    def clear(cls):
+        qt.QSettings().remove(cls._key())
+
+
+def candidateThreadCounts(nCpus) -> List[int]:
+    """
+    :returns: Thread counts to benchmark, from all the CPUs down to a quarter of them.
+    """
+    return sorted({max(1, nCpus * ratio // 4) for ratio in [4, 3, 2, 1]}, reverse=True)
+
+
+def createRepresentativeCrop(volumeNode, size_mm=80) -> FieldOfViewCrop:
+    """
+    :returns: Crop of the center of the volume anatomy of at most size_mm along each axis.
+    """
+    import slicer
+
+    spacing_kji = volumeNode.GetSpacing()[::-1]
+    anatomyBox = computeAnatomyBoundingBox(slicer.util.arrayFromVolume(volumeNode), spacing_kji, margin_mm=0)
+    boundingBox = []
+    for axisSlice, spacing in zip(anatomyBox, spacing_kji):
+        size = min(axisSlice.stop - axisSlice.start, max(1, int(size_mm / spacing)))
+        start = (axisSlice.start + axisSlice.stop - size) // 2
+        boundingBox.append(slice(start, start + size))
+    return FieldOfViewCrop(volumeNode, tuple(boundingBox))
+
+
+class CpuAutotuner:
+    """
+    Benchmark the CPU inference configurations on a volume and find the fastest one.
+
+    The configurations are tuned one setting at a time, keeping the fastest value of the previous settings : the
+    number of threads first, then the number of preprocessing workers and the number of export workers. An untimed
+    warm-up run is done first. Each run is a full nnU-Net inference of the input volume by the input logic.
+    """
+
+    settings = ["nThreads", "nProcessPreprocessing", "nProcessSegmentationExport"]
+
+    def __init__(self, logic, parameter, volumeNode):
+        """
+        :param logic: nnU-Net segmentation logic used for the benchmark runs. Its signals should not be connected to
+            the segmentation widget.
+        :param parameter: nnU-Net parameter of the benchmark runs.
+        :param volumeNode: Representative volume segmented by each run.
+        """
+        self.finished = Signal("CpuProfile")
+        self.errorOccurred = Signal("str")
+        self.progressInfo = Signal("str")
+        self.logic = logic
+        self.parameter = parameter
+        self.volumeNode = volumeNode
+        self.timings: Dict[Tuple[int, int, int], float] = {}
+
+        nCpus = len(availableCpus())
+        self._candidates = {
+            "nThreads": candidateThreadCounts(nCpus),
+            "nProcessPreprocessing": [n for n in [1, 2, 4] if n <= nCpus],
+            "nProcessSegmentationExport": [n for n in [1, 2] if n <= nCpus],
+        }
+        self._best = {name: values[0] for name, values in self._candidates.items()}
+        self._iSetting = 0
+        self._pending = []
+        self._current = None
+        self._isWarmUp = False
+        self._isStopped = False
+        self._startTime = 0
+        self._connections = [
+            (logic.inferenceFinished, logic.inferenceFinished.connect(self._onRunFinished)),
+            (logic.errorOccurred, logic.errorOccurred.connect(self._onRunError)),
+        ]
+
+    @property
+    def nRuns(self) -> int:
+        """
+        :returns: Maximum number of timed runs.
+        """
+        return sum(len(values) for values in self._candidates.values()) - len(self._candidates) + 1
+
+    def start(self):
+        self.progressInfo(f"Autotuning the CPU inference in at most {self.nRuns} runs after a warm-up run...")
+        self._isWarmUp = True
+        self._run(self._configuration(self._best))
+
+    def stop(self):
+        self._isStopped = True
+        self.logic.stopSegmentation()
+        self.logic.waitForSegmentationFinished()
+        self._disconnect()
+
+    def _disconnect(self):
+        for signal, connectId in self._connections:
+            signal.disconnect(connectId)
+        self._connections = []
+
+    def _configuration(self, settings) -> Tuple[int, int, int]:
+        return tuple(settings[name] for name in self.settings)
+
+    def _run(self, configuration):
+        self._current = configuration
+        nThreads, nProcessPreprocessing, nProcessSegmentationExport = configuration
+        profile = CpuProfile(nThreads, nProcessPreprocessing, nProcessSegmentationExport)
+        parameter = copy(self.parameter)
+        profile.applyTo(parameter)
+        self.logic.setParameter(parameter)
+
+        self.progressInfo(f"{'Warm-up run' if self._isWarmUp else 'Benchmarking'} : {profile.describe()}...")
+        self._startTime = time.perf_counter()
+        with cappedThreads(profile.cpuSet()):
+            self.logic.startSegmentation(self.volumeNode)
+
+    def _onRunError(self, errorMsg):
+        if self._isStopped:
+            return
+
+        self._isStopped = True
+        self._disconnect()
+        self.errorOccurred(f"CPU autotuning failed :\n{errorMsg}")
+
+    def _onRunFinished(self, *_):
+        if self._isStopped:
+            return
+
+        if self._isWarmUp:
+            self._isWarmUp = False
+        else:
+            self.timings[self._current] = time.perf_counter() - self._startTime
+            self.progressInfo(f"Run finished in {self.timings[self._current]:.1f} s.")
+        self._runNext()
+
+    def _runNext(self):
+        while True:
+            pendingConfigurations = [c for c in self._pending if c not in self.timings]
+            if pendingConfigurations:
+                self._run(pendingConfigurations[0])
+                return
+
+            if self._pending:
+                self._keepFastest()
+            if self._iSetting == len(self.settings):
+                self._finish()
+                return
+
+            name = self.settings[self._iSetting]
+            self._iSetting += 1
+            self._pending = [self._configuration({**self._best, name: value}) for value in self._candidates[name]]
+
+    def _keepFastest(self):
+        fastest = min(self._pending, key=lambda configuration: self.timings[configuration])
+        self._best = dict(zip(self.settings, fastest))
+        self._pending = []
+
+    def _finish(self):
+        self._isStopped = True
+        self._disconnect()
+        configuration = self._configuration(self._best)
+        profile = CpuProfile(
+            *configuration,
+            runtime_s=round(self.timings[configuration], 3),
+            machineId=machineId(),
+            createdAt=time.strftime("%Y-%m-%d %H:%M:%S")
+        )
+        self.progressInfo(f"Fastest CPU configuration : {profile.describe()} ({profile.runtime_s:.1f} s).")
+        self.finished(profile)
@@ -0,0 +1,124 @@
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import qt
+import slicer
+
+from .PythonDependencyChecker import PythonDependencyChecker
+from .Signal import Signal
+from .Tracing import Tracer, traceSpan
+
+
+@dataclass
+class PrefetchResult:
+    """
+    Result of the dependency and weights checks run in the background.
+    """
+    dependenciesSatisfied: bool = False
+    weightsMissing: bool = True
+    weightsOutdated: bool = False
+    errors: List[str] = field(default_factory=list)
+
+    def isReady(self) -> bool:
+        return self.dependenciesSatisfied and not self.weightsMissing
+
+
+class DependencyPrefetcher:
+    """
+    Runs the Python dependency checks, the weights checks and the download of missing weights in a background thread.
+
+    Importing the dependencies in the background also warms up the heavy torch and nnU-Net imports before the first
+    segmentation. Outdated weights are only reported, as updating them requires the user confirmation.
+
+    The progress and finished signals are emitted on the main thread.
+    """
+
+    def __init__(
+            self,
+            dependencyChecker: Optional[PythonDependencyChecker] = None,
+            downloadMissingWeights=True,
+            tracer: Optional[Tracer] = None
+    ):
+        """
+        :param dependencyChecker: Optional dependency checker whose weights folder, repository and connection
+            function are used for the checks. The checks run on a separate checker instance.
+        :param downloadMissingWeights: If True, missing weights are downloaded in the background.
+        :param tracer: Optional tracer recording the time of the dependency and weights checks.
+        """
+        dependencyChecker = dependencyChecker or PythonDependencyChecker()
+        self.result = PrefetchResult()
+        self.progress = Signal("str")
+        self.finished = Signal()
+        self.downloadMissingWeights = downloadMissingWeights
+        self.tracer = tracer
+
+        self._checker = PythonDependencyChecker(
+            repoPath=dependencyChecker.repo_path,
+            destWeightFolder=dependencyChecker.destWeightFolder,
+            hasInternetConnectionF=dependencyChecker.hasInternetConnectionF,
+            errorDisplayF=self._onError
+        )
+        self._messages = queue.Queue()
+        self._thread = None
+        self._isFinished = False
+        self._pollTimer = qt.QTimer()
+        self._pollTimer.setInterval(50)
+        self._pollTimer.timeout.connect(self._poll)
+
+    def isStarted(self):
+        return self._thread is not None
+
+    def isFinished(self):
+        return self._isFinished
+
+    def start(self):
+        if self.isStarted():
+            return
+
+        self._thread = threading.Thread(target=self._run, name="DentalSegmentatorPrefetch", daemon=True)
+        self._thread.start()
+        self._pollTimer.start()
+
+    def wait(self):
+        """
+        Block until the checks are finished while processing the application events.
+        """
+        if not self.isStarted():
+            self.start()
+
+        while not self._isFinished:
+            slicer.app.processEvents(qt.QEventLoop.AllEvents, 50)
+
+    def _run(self):
+        try:
+            self._messages.put("Checking Python dependencies...")
+            with traceSpan(self.tracer, "Dependency check", "dependencies"):
+                self.result.dependenciesSatisfied = self._checker.areDependenciesSatisfied()
+
+            self._messages.put("Checking model weights...")
+            with traceSpan(self.tracer, "Weights check", "dependencies"):
+                self.result.weightsMissing = self._checker.areWeightsMissing()
+                if self.result.weightsMissing and self.downloadMissingWeights:
+                    self._checker.downloadWeights(self._messages.put)
+                    self.result.weightsMissing = self._checker.areWeightsMissing()
+                elif not self.result.weightsMissing:
+                    self.result.weightsOutdated = self._checker.areWeightsOutdated()
+        except Exception as e:  # noqa
+            self.result.errors.append(str(e))
+
+    def _onError(self, msg, *_, **__):
+        self.result.errors.append(msg)
+
+    def _poll(self):
+        isRunning = self._thread.is_alive()
+        while not self._messages.empty():
+            self.progress(self._messages.get())
+
+        if isRunning:
+            return
+
+        self._pollTimer.stop()
+        self._isFinished = True
+        self.finished()
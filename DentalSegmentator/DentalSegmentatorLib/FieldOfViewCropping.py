@@ -0,0 +1,199 @@
+from typing import Optional, Tuple
+
+import slicer
+import vtk
+
+from .SegmentationLoading import LabelArrayResult
+
+
+def otsuThreshold(array, nBins=256) -> float:
+    """
+    :returns: Threshold maximizing the between class variance of the input array values.
+    """
+    import numpy as np
+
+    histogram, binEdges = np.histogram(array, bins=nBins)
+    binCenters = (binEdges[:-1] + binEdges[1:]) / 2
+    weightBelow = np.cumsum(histogram)
+    weightAbove = weightBelow[-1] - weightBelow
+    sumBelow = np.cumsum(histogram * binCenters)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        meanBelow = sumBelow / weightBelow
+        meanAbove = (sumBelow[-1] - sumBelow) / weightAbove
+        betweenVariance = np.nan_to_num(weightBelow * weightAbove * (meanBelow - meanAbove) ** 2)
+
+    # Use the middle of the plateau when the classes are separated by empty bins
+    bestBins = np.flatnonzero(betweenVariance == betweenVariance.max())
+    return float(binCenters[bestBins[len(bestBins) // 2]])
+
+
+def computeAnatomyBoundingBox(
+        volumeArray,
+        spacing_kji,
+        margin_mm: float = 10,
+        downsampling: int = 4,
+        minComponentRatio: float = 0.05
+) -> Tuple[slice, slice, slice]:
+    """
+    Find the bounding box of the anatomy in the input volume.
+
+    The volume is thresholded with the Otsu threshold on a downsampled copy to separate the anatomy from air and
+    scanner padding. If SciPy is available, thin structures are removed by a morphological opening and only the
+    connected components larger than minComponentRatio times the largest component are kept.
+
+    :param volumeArray: Volume array in KJI order.
+    :param spacing_kji: Voxel spacing in KJI order.
+    :param margin_mm: Margin added around the anatomy bounding box.
+    :param downsampling: Downsampling factor used to compute the bounding box.
+    :param minComponentRatio: Minimum size ratio of the kept connected components relative to the largest one.
+    :returns: Bounding box as slices in KJI order. Whole volume if no anatomy was found.
+    """
+    import numpy as np
+
+    downsampled = volumeArray[::downsampling, ::downsampling, ::downsampling]
+    mask = downsampled > otsuThreshold(downsampled)
+
+    try:
+        from scipy import ndimage
+        mask = ndimage.binary_opening(mask)
+        components, nComponents = ndimage.label(mask)
+        if nComponents > 1:
+            componentSizes = np.bincount(components.ravel())
+            componentSizes[0] = 0
+            mask = (componentSizes >= minComponentRatio * componentSizes.max())[components]
+    except ImportError:
+        pass
+
+    if not mask.any():
+        return tuple(slice(0, size) for size in volumeArray.shape)
+
+    boundingBox = []
+    for axis, (size, spacing) in enumerate(zip(volumeArray.shape, spacing_kji)):
+        isPresent = np.flatnonzero(mask.any(axis=tuple(a for a in range(mask.ndim) if a != axis)))
+        # Anatomy may start up to downsampling - 1 voxels before the first downsampled voxel
+        margin = int(np.ceil(margin_mm / spacing))
+        start = (isPresent[0] - 1) * downsampling + 1 - margin
+        stop = (isPresent[-1] + 1) * downsampling + margin
+        boundingBox.append(slice(int(max(start, 0)), int(min(stop, size))))
+    return tuple(boundingBox)
+
+
+class FieldOfViewCrop:
+    """
+    Crop of a volume to its anatomy bounding box, used to run the inference on a smaller field of view.
+    The label array inferred on the cropped volume is pasted back into the original volume geometry.
+    """
+
+    def __init__(self, volumeNode, boundingBox: Tuple[slice, slice, slice]):
+        """
+        :param volumeNode: Original vtkMRMLScalarVolumeNode.
+        :param boundingBox: Cropped region as slices in KJI order.
+        """
+        self.volumeNode = volumeNode
+        self.boundingBox = boundingBox
+        self.originalShape = tuple(volumeNode.GetImageData().GetDimensions()[::-1])
+        self.croppedVolumeNode = None
+
+    @classmethod
+    def fromVolume(cls, volumeNode, margin_mm: float = 10, minReduction: float = 0.1) -> Optional["FieldOfViewCrop"]:
+        """
+        :param volumeNode: vtkMRMLScalarVolumeNode to crop.
+        :param margin_mm: Margin added around the anatomy bounding box.
+        :param minReduction: Minimum ratio of removed voxels for the crop to be worth it.
+        :returns: FieldOfViewCrop or None if cropping would remove less than minReduction of the voxels.
+        """
+        boundingBox = computeAnatomyBoundingBox(
+            slicer.util.arrayFromVolume(volumeNode), volumeNode.GetSpacing()[::-1], margin_mm
+        )
+        crop = cls(volumeNode, boundingBox)
+        return crop if crop.reduction >= minReduction else None
+
+    @property
+    def nOriginalVoxels(self) -> int:
+        return self.originalShape[0] * self.originalShape[1] * self.originalShape[2]
+
+    @property
+    def nCroppedVoxels(self) -> int:
+        nVoxels = 1
+        for s in self.boundingBox:
+            nVoxels *= s.stop - s.start
+        return nVoxels
+
+    @property
+    def croppedShape(self) -> Tuple[int, int, int]:
+        return tuple(s.stop - s.start for s in self.boundingBox)
+
+    @property
+    def reduction(self) -> float:
+        return 1 - self.nCroppedVoxels / self.nOriginalVoxels
+
+    def estimatedTimeSaved_s(self, croppedInferenceTime_s) -> float:
+        """
+        :returns: Estimated inference time saved by the crop, assuming the inference time is proportional to the
+            number of voxels.
+        """
+        return croppedInferenceTime_s * (self.nOriginalVoxels / self.nCroppedVoxels - 1)
+
+    def createCroppedVolumeNode(self):
+        """
+        Create the hidden cropped volume node in the scene. Its RAS geometry matches the original volume.
+        """
+        import numpy as np
+
+        self.croppedVolumeNode = slicer.mrmlScene.AddNewNodeByClass(
+            "vtkMRMLScalarVolumeNode", f"{self.volumeNode.GetName()}_Cropped"
+        )
+        self.croppedVolumeNode.SetHideFromEditors(True)
+
+        ijkToRas = vtk.vtkMatrix4x4()
+        self.volumeNode.GetIJKToRASMatrix(ijkToRas)
+        kStart, jStart, iStart = (s.start for s in self.boundingBox)
+        origin = ijkToRas.MultiplyPoint([iStart, jStart, kStart, 1])
+        self.croppedVolumeNode.SetIJKToRASMatrix(ijkToRas)
+        self.croppedVolumeNode.SetOrigin(origin[:3])
+        self.croppedVolumeNode.SetAndObserveTransformNodeID(self.volumeNode.GetTransformNodeID())
+
+        croppedArray = np.ascontiguousarray(slicer.util.arrayFromVolume(self.volumeNode)[self.boundingBox])
+        slicer.util.updateVolumeFromArray(self.croppedVolumeNode, croppedArray)
+        return self.croppedVolumeNode
+
+    def checkCroppedLabelArray(self, result: LabelArrayResult):
+        """
+        :raises RuntimeError: if the label array doesn't match the cropped volume.
+        """
+        if tuple(result.labelArray.shape) != self.croppedShape:
+            raise RuntimeError(
+                f"Segmentation shape {tuple(result.labelArray.shape)} doesn't match the cropped volume "
+                f"{self.croppedShape}."
+            )
+
+    def pasteLabelArray(self, result: LabelArrayResult) -> LabelArrayResult:
+        """
+        :returns: Label array inferred on the cropped volume pasted into the original volume geometry.
+        :raises RuntimeError: if the label array doesn't match the cropped volume.
+        """
+        import numpy as np
+
+        self.checkCroppedLabelArray(result)
+        labelArray = np.zeros(self.originalShape, dtype=result.labelArray.dtype)
+        labelArray[self.boundingBox] = result.labelArray
+
+        return LabelArrayResult(labelArray=labelArray, ijkToRas=self.originalIjkToRas())
+
+    def originalIjkToRas(self):
+        """
+        :returns: IJK to RAS matrix of the original volume as a numpy array.
+        """
+        import numpy as np
+
+        ijkToRas = vtk.vtkMatrix4x4()
+        self.volumeNode.GetIJKToRASMatrix(ijkToRas)
+        return np.array([[ijkToRas.GetElement(i, j) for j in range(4)] for i in range(4)])
+
+    def cleanup(self):
+        """
+        Remove the cropped volume node from the scene if any.
+        """
+        if self.croppedVolumeNode is not None and slicer.mrmlScene.IsNodePresent(self.croppedVolumeNode):
+            slicer.mrmlScene.RemoveNode(self.croppedVolumeNode)
+        self.croppedVolumeNode = None
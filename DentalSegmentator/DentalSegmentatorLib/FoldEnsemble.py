@@ -0,0 +1,317 @@
+import os
+import shutil
+from contextlib import contextmanager
+from copy import copy
+from pathlib import Path
+from tempfile import mkdtemp
+from typing import List, Optional, Set
+
+import slicer
+
+from .SegmentationLoading import (
+    LabelArrayResult,
+    inferenceProbabilitiesPath,
+    inferenceResultPath,
+    readLabelArray,
+    readProbabilities,
+    writeLabelArray,
+)
+from .Signal import Signal
+
+
+def availableFolds(modelPath) -> List[str]:
+    """
+    :returns: Names of the folds available in the nnU-Net model folder.
+    """
+    if modelPath is None or not Path(modelPath).exists():
+        return []
+    return sorted({path.name[len("fold_"):] for path in Path(modelPath).rglob("fold_*") if path.is_dir()})
+
+
+def parseFolds(foldsText: str) -> List[str]:
+    """
+    :returns: Unique fold names of the input comma separated fold list in input order.
+    """
+    folds = [fold.strip() for fold in foldsText.split(",") if fold.strip()]
+    return list(dict.fromkeys(folds))
+
+
+def availableCpus() -> List[int]:
+    """
+    :returns: CPUs available to the process.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def workerCpuSets(nWorkers) -> List[Set[int]]:
+    """
+    :returns: Disjoint sets of the CPUs available to the process, one per worker.
+    """
+    cpus = availableCpus()
+    nCpusPerWorker = max(1, len(cpus) // nWorkers)
+    return [set(cpus[i * nCpusPerWorker:(i + 1) * nCpusPerWorker]) or set(cpus) for i in range(nWorkers)]
+
+
+@contextmanager
+def cappedThreads(cpuSet: Set[int]):
+    """
+    Limit the threads and CPUs of the processes started in the context to the input CPU set.
+    The thread count environment variables are inherited by the started processes. On Linux, the processes are also
+    pinned to the CPU set as they inherit the CPU affinity of the thread starting them.
+    """
+    names = ["OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"]
+    previousValues = {name: os.environ.get(name) for name in names}
+    previousAffinity = os.sched_getaffinity(0) if hasattr(os, "sched_setaffinity") else None
+    try:
+        for name in names:
+            os.environ[name] = str(len(cpuSet))
+        if previousAffinity is not None:
+            os.sched_setaffinity(0, cpuSet)
+        yield
+    finally:
+        for name, value in previousValues.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        if previousAffinity is not None:
+            os.sched_setaffinity(0, previousAffinity)
+
+
+def isLabelVotingReliable(nFolds) -> bool:
+    """
+    Majority voting of an even number of fold labels ties whenever the folds disagree on a foreground voxel, which
+    erodes the thin structures such as the mandibular canals. Such ensembles need the fold probabilities.
+    """
+    return nFolds % 2 == 1
+
+
+def mergeFoldProbabilities(probabilityPaths, ijkToRas) -> LabelArrayResult:
+    """
+    Average the class probabilities of each fold and take their argmax, as the nnU-Net ensemble of several folds.
+    Class indices are the label values of the DentalSegmentator dataset.
+
+    :raises RuntimeError: if the fold probabilities can't be read or don't have the same shape.
+    """
+    import numpy as np
+
+    probabilitySum = None
+    for probabilityPath in probabilityPaths:
+        probabilities = readProbabilities(probabilityPath)
+        if probabilitySum is None:
+            probabilitySum = probabilities.astype(np.float32, copy=True)
+        elif probabilities.shape != probabilitySum.shape:
+            raise RuntimeError(
+                f"Fold probabilities don't have the same shape : {probabilities.shape} != {probabilitySum.shape}."
+            )
+        else:
+            probabilitySum += probabilities
+
+    labelArray = np.argmax(probabilitySum, axis=0).astype(np.uint8)
+    return LabelArrayResult(labelArray=labelArray, ijkToRas=ijkToRas)
+
+
+def mergeFoldLabels(results: List[LabelArrayResult]) -> LabelArrayResult:
+    """
+    Average the one-hot encoded labels of each fold and take their argmax. Ties between foreground labels are resolved
+    to the lowest label and background only wins with a strict majority, to avoid eroding the segments.
+
+    Label voting is only used when the fold probabilities are not available. See isLabelVotingReliable.
+
+    :raises RuntimeError: if the fold labels don't have the same shape.
+    """
+    import numpy as np
+
+    labelArrays = [np.asarray(result.labelArray) for result in results]
+    shape = labelArrays[0].shape
+    if any(labelArray.shape != shape for labelArray in labelArrays):
+        raise RuntimeError(f"Fold segmentations don't have the same shape : {[a.shape for a in labelArrays]}.")
+
+    labelValues = sorted(set().union(*(result.presentLabelValues() for result in results))) + [0]
+    merged = np.zeros(shape, dtype=labelArrays[0].dtype)
+    bestVotes = np.zeros(shape, dtype=np.uint8)
+    votes = np.empty(shape, dtype=np.uint8)
+    for labelValue in labelValues:
+        votes[...] = 0
+        for labelArray in labelArrays:
+            votes += labelArray == labelValue
+        isBetter = votes > bestVotes
+        merged[isBetter] = labelValue
+        bestVotes[isBetter] = votes[isBetter]
+    return LabelArrayResult(labelArray=merged, ijkToRas=results[0].ijkToRas)
+
+
+class FoldEnsembleLogic:
+    """
+    Segmentation logic running each fold of the parameter in its own nnU-Net worker process, with at most nWorkers
+    processes in parallel and their threads capped to a disjoint CPU set. The fold segmentations are merged once all
+    folds are finished, by averaging their class probabilities if the workers provide them. Otherwise, the fold labels
+    are merged by majority voting, which is refused for an even number of folds.
+
+    Provides the same interface as the nnU-Net segmentation logic.
+    """
+
+    def __init__(self, createLogicF, nWorkers=2):
+        """
+        :param createLogicF: Function creating a worker nnU-Net segmentation logic.
+        :param nWorkers: Maximum number of folds segmented in parallel.
+        """
+        self.inferenceFinished = Signal()
+        self.errorOccurred = Signal("str")
+        self.progressInfo = Signal("str")
+        self.nWorkers = nWorkers
+        self._createLogicF = createLogicF
+        self._idleWorkers = []
+        self._running = {}
+        self._pendingFolds = []
+        self._foldResults = {}
+        self._foldProbabilities = {}
+        self._folds = []
+        self._parameter = None
+        self._volumeNode = None
+        self._isStopping = False
+        self._outDir = None
+
+    def resultPath(self) -> Optional[Path]:
+        """
+        :returns: Merged segmentation file or None if the fold results were not merged.
+        """
+        outFile = self._outDir.joinpath("ensemble.nii.gz") if self._outDir is not None else None
+        return outFile if outFile is not None and outFile.exists() else None
+
+    def setParameter(self, parameter):
+        self._parameter = parameter
+
+    def startSegmentation(self, volumeNode):
+        self._isStopping = False
+        self._volumeNode = volumeNode
+        self._foldResults = {}
+        self._foldProbabilities = {}
+        self._folds = parseFolds(self._parameter.folds)
+        self._resetOutDir()
+
+        nWorkers = max(1, min(self.nWorkers, len(self._folds)))
+        self._pendingFolds = self._folds[nWorkers:]
+        for fold, cpuSet in zip(self._folds, workerCpuSets(nWorkers)):
+            self._startFold(fold, cpuSet)
+
+    def _resetOutDir(self):
+        if self._outDir is not None:
+            shutil.rmtree(self._outDir, ignore_errors=True)
+        self._outDir = Path(mkdtemp(prefix="DentalSegmentator_Ensemble_"))
+
+    def _startFold(self, fold, cpuSet):
+        worker = self._idleWorkers.pop() if self._idleWorkers else self._createWorker()
+        parameter = copy(self._parameter)
+        parameter.folds = fold
+        for name in ["nProcessPreprocessing", "nProcessSegmentationExport"]:
+            if hasattr(parameter, name):
+                setattr(parameter, name, 1)
+
+        worker.setParameter(parameter)
+        self._running[worker] = (fold, cpuSet)
+        self.progressInfo(f"Starting fold {fold} inference on {len(cpuSet)} CPU threads...")
+        with cappedThreads(cpuSet):
+            worker.startSegmentation(self._volumeNode)
+
+    def _createWorker(self):
+        worker = self._createLogicF()
+        worker.inferenceFinished.connect(lambda *_: self._onWorkerFinished(worker))
+        worker.errorOccurred.connect(lambda errorMsg: self._onWorkerError(worker, errorMsg))
+        worker.progressInfo.connect(lambda msg: self._onWorkerProgress(worker, msg))
+        return worker
+
+    def _onWorkerProgress(self, worker, msg):
+        if worker in self._running:
+            self.progressInfo(f"[Fold {self._running[worker][0]}] {msg}")
+
+    def _onWorkerError(self, worker, errorMsg):
+        if worker not in self._running or self._isStopping:
+            return
+
+        fold, _ = self._running.pop(worker)
+        self._idleWorkers.append(worker)
+        self.stopSegmentation()
+        self.waitForSegmentationFinished()
+        self.errorOccurred(f"Fold {fold} : {errorMsg}")
+
+    def _onWorkerFinished(self, worker):
+        # Error and finished signals may both be emitted for the same worker run
+        if worker not in self._running or self._isStopping:
+            return
+
+        fold, cpuSet = self._running.pop(worker)
+        self._idleWorkers.append(worker)
+        resultPath = inferenceResultPath(worker)
+        if resultPath is None or not resultPath.exists():
+            self.stopSegmentation()
+            self.waitForSegmentationFinished()
+            self.errorOccurred(f"Fold {fold} : segmentation results not found.")
+            return
+
+        # Keep a copy of the fold results as the worker may be reused for the next fold
+        foldPath = self._outDir.joinpath(f"fold_{fold}.nii.gz")
+        shutil.copyfile(resultPath, foldPath)
+        self._foldResults[fold] = foldPath
+        probabilitiesPath = inferenceProbabilitiesPath(worker)
+        if probabilitiesPath is not None and probabilitiesPath.exists():
+            self._foldProbabilities[fold] = self._outDir.joinpath(f"fold_{fold}.npz")
+            shutil.copyfile(probabilitiesPath, self._foldProbabilities[fold])
+        self.progressInfo(f"Fold {fold} inference finished ({len(self._foldResults)} / {len(self._folds)}).")
+
+        if self._pendingFolds:
+            self._startFold(self._pendingFolds.pop(0), cpuSet)
+        elif not self._running:
+            self._mergeFoldResults()
+
+    def _mergeFoldResults(self):
+        self.progressInfo(f"Merging the segmentations of folds {', '.join(self._folds)}...")
+        try:
+            writeLabelArray(self._outDir.joinpath("ensemble.nii.gz"), self._mergedFoldResults())
+        except RuntimeError as e:
+            self.errorOccurred(str(e))
+            return
+        self.inferenceFinished()
+
+    def _mergedFoldResults(self) -> LabelArrayResult:
+        """
+        :raises RuntimeError: if the fold results can't be merged.
+        """
+        if all(fold in self._foldProbabilities for fold in self._folds):
+            firstResult = readLabelArray(self._foldResults[self._folds[0]])
+            probabilityPaths = [self._foldProbabilities[fold] for fold in self._folds]
+            merged = mergeFoldProbabilities(probabilityPaths, firstResult.ijkToRas)
+            if merged.labelArray.shape != firstResult.labelArray.shape:
+                raise RuntimeError(
+                    f"Fold probabilities shape {merged.labelArray.shape} doesn't match the segmentation shape "
+                    f"{firstResult.labelArray.shape}."
+                )
+            return merged
+
+        if not isLabelVotingReliable(len(self._folds)):
+            raise RuntimeError(
+                f"The segmentations of an even number of folds ({len(self._folds)}) can't be merged without their "
+                "probabilities. Segment the folds with a single worker."
+            )
+        return mergeFoldLabels([readLabelArray(self._foldResults[fold]) for fold in self._folds])
+
+    def stopSegmentation(self):
+        self._isStopping = True
+        self._pendingFolds = []
+        for worker in list(self._running):
+            worker.stopSegmentation()
+
+    def waitForSegmentationFinished(self):
+        while self._running:
+            for worker in list(self._running):
+                worker.waitForSegmentationFinished()
+            if self._isStopping:
+                self._idleWorkers += list(self._running)
+                self._running.clear()
+            slicer.app.processEvents()
+
+    def loadSegmentation(self):
+        resultPath = self.resultPath()
+        return slicer.util.loadSegmentation(resultPath.as_posix()) if resultPath is not None else None
@@ -0,0 +1,62 @@
+from dataclasses import dataclass
+from typing import Dict, List
+
+
+@dataclass(frozen=True)
+class InferenceProfile:
+    """
+    nnU-Net inference settings trading accuracy for speed.
+
+    The sliding window step size is relative to the tile size : 0.5 overlaps the tiles by half, 1.0 doesn't overlap
+    them. The test time augmentation runs the network on each mirrored version of the tiles, which multiplies the
+    inference time by up to 8.
+    """
+    name: str
+    stepSize: float
+    disableTta: bool
+    description: str
+
+    def applyTo(self, parameter) -> List[str]:
+        """
+        Set the profile settings on the nnU-Net parameter.
+
+        :returns: Names of the settings not supported by the installed nnU-Net parameter.
+        """
+        unsupportedNames = []
+        for name in ["stepSize", "disableTta"]:
+            if hasattr(parameter, name):
+                setattr(parameter, name, getattr(self, name))
+            else:
+                unsupportedNames.append(name)
+        return unsupportedNames
+
+
+inferenceProfiles: Dict[str, InferenceProfile] = {
+    profile.name: profile for profile in [
+        InferenceProfile(
+            "Accurate", stepSize=0.5, disableTta=False,
+            description="Half overlapping tiles with test time augmentation. Up to 8 times slower than Balanced."
+        ),
+        InferenceProfile(
+            "Balanced", stepSize=0.5, disableTta=True,
+            description="Default settings : half overlapping tiles without test time augmentation."
+        ),
+        InferenceProfile(
+            "Fast", stepSize=1.0, disableTta=True,
+            description="Non overlapping tiles without test time augmentation."
+        ),
+    ]
+}
+
+# Same settings as the SlicerNNUNet parameter defaults used before the profiles were introduced
+defaultInferenceProfile = "Balanced"
+
+
+def getInferenceProfile(name: str) -> InferenceProfile:
+    """
+    :raises ValueError: if the profile doesn't exist.
+    """
+    try:
+        return inferenceProfiles[name]
+    except KeyError:
+        raise ValueError(f"Unknown inference profile {name}. Available profiles : {', '.join(inferenceProfiles)}.")
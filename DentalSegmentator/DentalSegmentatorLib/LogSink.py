@@ -0,0 +1,88 @@
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Tuple
+
+import qt
+
+
+class BufferedLogSink:
+    """
+    Collects the progress messages and writes them to the log widgets in batches at a capped rate.
+
+    Appending a message only stores it with its timestamp. The pending messages are filtered and written by the write
+    function at most maxRate_Hz times per second : immediately if the previous write is old enough, otherwise when the
+    flush timer expires. The write function is responsible for refreshing the display if needed, which then happens
+    once per batch instead of once per message.
+
+    The flush timer can't expire while the main thread is blocked. Messages appended during a blocking stage are still
+    written by the next append once the batch is overdue, and the blockingStage context manager writes the pending
+    messages when a blocking stage starts and ends.
+
+    Messages must be appended from the main thread.
+    """
+
+    def __init__(
+            self,
+            writeF: Callable[[List[Tuple[float, str]]], None],
+            filterF: Optional[Callable[[str], str]] = None,
+            maxRate_Hz: float = 10
+    ):
+        """
+        :param writeF: Function called with the list of (timestamp, line) of the pending messages lines.
+        :param filterF: Optional function called on each pending message when flushing, returning the text to write.
+        :param maxRate_Hz: Maximum number of writes per second.
+        """
+        self.writeF = writeF
+        self.filterF = filterF or (lambda text: text)
+        self.flushInterval_s = 1.0 / maxRate_Hz
+        self._pending = []
+        self._lastFlushTime = 0
+        self._isFlushing = False
+
+        self._flushTimer = qt.QTimer()
+        self._flushTimer.setSingleShot(True)
+        self._flushTimer.timeout.connect(self.flush)
+
+    def append(self, msg: str):
+        self._pending.append((time.time(), msg))
+        elapsed_s = time.monotonic() - self._lastFlushTime
+        if elapsed_s >= self.flushInterval_s and not self._isFlushing:
+            self.flush()
+        elif not self._flushTimer.isActive():
+            self._flushTimer.start(int(max(self.flushInterval_s - elapsed_s, 0) * 1000) + 1)
+
+    @contextmanager
+    def blockingStage(self):
+        """
+        Context manager writing the pending messages before and after a stage blocking the main thread.
+        """
+        self.flush()
+        try:
+            yield
+        finally:
+            self.flush()
+
+    def hasPendingMessages(self) -> bool:
+        return bool(self._pending)
+
+    def flush(self):
+        """
+        Filter and write all the pending messages.
+        """
+        if self._isFlushing or not self._pending:
+            return
+
+        self._isFlushing = True
+        try:
+            self._flushTimer.stop()
+            pending, self._pending = self._pending, []
+            self._lastFlushTime = time.monotonic()
+            lines = [
+                (timestamp, line)
+                for timestamp, msg in pending
+                for line in self.filterF(msg).splitlines()
+            ]
+            if lines:
+                self.writeF(lines)
+        finally:
+            self._isFlushing = False
@@ -0,0 +1,222 @@
+import os
+import time
+from collections import deque
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import qt
+
+
+class LogStore:
+    """
+    Bounded store of the session progress logs.
+
+    The last maxRecords log lines are kept in memory. Older lines are spilled to a log file in the log folder, which
+    is rotated once larger than maxFileSize_MB, keeping backupCount previous files. Lines are classified by severity
+    when stored to allow filtering them.
+    """
+
+    severities = ["INFO", "WARNING", "ERROR"]
+    fileName = "DentalSegmentator.log"
+    separator = " :: "
+
+    def __init__(self, logFolder=None, maxRecords=10000, maxFileSize_MB=5, backupCount=3):
+        """
+        :param logFolder: Optional folder of the spilled log files. If None, the oldest lines are discarded.
+        :param maxRecords: Maximum number of lines kept in memory.
+        :param maxFileSize_MB: Size above which the log file is rotated.
+        :param backupCount: Number of rotated log files kept.
+        """
+        self.logFolder = Path(logFolder) if logFolder is not None else None
+        self.maxFileSize_MB = maxFileSize_MB
+        self.backupCount = backupCount
+        self._records = deque(maxlen=maxRecords)
+
+    @property
+    def logPath(self) -> Optional[Path]:
+        return self.logFolder.joinpath(self.fileName) if self.logFolder is not None else None
+
+    def __len__(self):
+        return len(self._records)
+
+    @classmethod
+    def severityOf(cls, line: str) -> str:
+        lowerLine = line.lower()
+        if any(keyword in lowerLine for keyword in ["error", "exception", "traceback", "failed"]):
+            return "ERROR"
+        if "warning" in lowerLine:
+            return "WARNING"
+        return "INFO"
+
+    @classmethod
+    def formatRecord(cls, record: Tuple[float, str, str]) -> str:
+        timestamp, severity, line = record
+        timeString = time.strftime("%Y/%m/%d %H:%M:%S", time.localtime(timestamp))
+        return cls.separator.join([f"{timeString}.{int(timestamp * 1000) % 1000:03d}", severity, line])
+
+    @classmethod
+    def _parseSeverity(cls, formattedLine: str) -> str:
+        parts = formattedLine.split(cls.separator, 2)
+        return parts[1] if len(parts) == 3 and parts[1] in cls.severities else "INFO"
+
+    def append(self, timedLines: Iterable[Tuple[float, str]]):
+        """
+        Store the input (timestamp, line) log lines. Spills the lines evicted from memory to the log file.
+        """
+        evicted = []
+        for timestamp, line in timedLines:
+            if len(self._records) == self._records.maxlen:
+                evicted.append(self._records.popleft())
+            self._records.append((timestamp, self.severityOf(line), line))
+        self._spill(evicted)
+
+    def _spill(self, records):
+        if not records or self.logPath is None:
+            return
+
+        # Logs are kept on a best effort basis and failing to write them should never stop the processing
+        try:
+            self.logFolder.mkdir(parents=True, exist_ok=True)
+            if self.logPath.exists() and self.logPath.stat().st_size > self.maxFileSize_MB * 1024 * 1024:
+                self._rotate()
+            with open(self.logPath, "a", encoding="utf-8") as f:
+                f.writelines(f"{self.formatRecord(record)}\n" for record in records)
+        except OSError:
+            pass
+
+    def _backupPath(self, i) -> Path:
+        return self.logPath.with_name(f"{self.fileName}.{i}")
+
+    def _rotate(self):
+        if self.backupCount < 1:
+            self.logPath.unlink()
+            return
+
+        for i in range(self.backupCount - 1, 0, -1):
+            if self._backupPath(i).exists():
+                os.replace(self._backupPath(i), self._backupPath(i + 1))
+        os.replace(self.logPath, self._backupPath(1))
+
+    def spillLogFiles(self) -> List[Path]:
+        """
+        :returns: Existing spilled log files, from the oldest to the most recent.
+        """
+        if self.logPath is None:
+            return []
+
+        paths = [self._backupPath(i) for i in range(self.backupCount, 0, -1)] + [self.logPath]
+        return [path for path in paths if path.exists()]
+
+    def _spilledLines(self) -> Iterator[str]:
+        for path in self.spillLogFiles():
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    yield line.rstrip("\n")
+
+    def lines(self, minimumSeverity=None, searchText="", includeSpilled=False) -> List[str]:
+        """
+        :param minimumSeverity: Optional minimum severity of the returned lines.
+        :param searchText: Optional case-insensitive text the returned lines need to contain.
+        :param includeSpilled: If True, the lines spilled to the log files are returned before the in-memory lines.
+        :returns: Formatted log lines matching the filters, from the oldest to the most recent.
+        """
+        minimumLevel = self.severities.index(minimumSeverity) if minimumSeverity else 0
+        searchText = searchText.lower()
+
+        def isMatching(formattedLine, severity):
+            return (
+                self.severities.index(severity) >= minimumLevel
+                and (not searchText or searchText in formattedLine.lower())
+            )
+
+        matching = []
+        if includeSpilled:
+            matching += [line for line in self._spilledLines() if isMatching(line, self._parseSeverity(line))]
+
+        for record in list(self._records):
+            formattedLine = self.formatRecord(record)
+            if isMatching(formattedLine, record[1]):
+                matching.append(formattedLine)
+        return matching
+
+
+class LogViewerWidget(qt.QWidget):
+    """
+    Paged viewer of a LogStore with search and severity filtering. Only the displayed page is loaded in the text view
+    and the spilled log files are only read when requested.
+    """
+
+    pageSize = 1000
+
+    def __init__(self, logStore: LogStore, parent=None):
+        super().__init__(parent)
+        self.logStore = logStore
+        self._lines = []
+        self._page = 0
+
+        self.searchLineEdit = qt.QLineEdit(self)
+        self.searchLineEdit.setPlaceholderText("Search...")
+        self.severityComboBox = qt.QComboBox(self)
+        self.severityComboBox.addItems(["All", "Warnings and errors", "Errors"])
+        self.includeSpilledCheckBox = qt.QCheckBox("Include older logs", self)
+        self.includeSpilledCheckBox.setToolTip("Also search the older logs written to the log files.")
+
+        self.textEdit = qt.QPlainTextEdit(self)
+        self.textEdit.setReadOnly(True)
+        self.textEdit.setLineWrapMode(qt.QPlainTextEdit.NoWrap)
+
+        self.previousButton = qt.QPushButton("Previous", self)
+        self.nextButton = qt.QPushButton("Next", self)
+        self.pageLabel = qt.QLabel(self)
+        self.previousButton.clicked.connect(lambda: self.showPage(self._page - 1))
+        self.nextButton.clicked.connect(lambda: self.showPage(self._page + 1))
+
+        # Wait for the user to stop typing before filtering the logs
+        self._searchTimer = qt.QTimer(self)
+        self._searchTimer.setSingleShot(True)
+        self._searchTimer.setInterval(300)
+        self._searchTimer.timeout.connect(self.refresh)
+        self.searchLineEdit.textChanged.connect(lambda *_: self._searchTimer.start())
+        self.severityComboBox.currentIndexChanged.connect(lambda *_: self.refresh())
+        self.includeSpilledCheckBox.toggled.connect(lambda *_: self.refresh())
+
+        filterLayout = qt.QHBoxLayout()
+        filterLayout.addWidget(self.searchLineEdit, 1)
+        filterLayout.addWidget(self.severityComboBox)
+        filterLayout.addWidget(self.includeSpilledCheckBox)
+
+        pageLayout = qt.QHBoxLayout()
+        pageLayout.addWidget(self.previousButton)
+        pageLayout.addWidget(self.pageLabel, 1)
+        pageLayout.addWidget(self.nextButton)
+        self.pageLabel.setAlignment(qt.Qt.AlignCenter)
+
+        layout = qt.QVBoxLayout(self)
+        layout.addLayout(filterLayout)
+        layout.addWidget(self.textEdit)
+        layout.addLayout(pageLayout)
+        self.refresh()
+
+    @property
+    def nPages(self):
+        return max(1, (len(self._lines) + self.pageSize - 1) // self.pageSize)
+
+    def minimumSeverity(self):
+        return [None, "WARNING", "ERROR"][self.severityComboBox.currentIndex]
+
+    def refresh(self):
+        """
+        Filter the logs and display the most recent page.
+        """
+        self._lines = self.logStore.lines(
+            self.minimumSeverity(), self.searchLineEdit.text, self.includeSpilledCheckBox.isChecked()
+        )
+        self.showPage(self.nPages - 1)
+
+    def showPage(self, page):
+        self._page = min(max(page, 0), self.nPages - 1)
+        self.textEdit.setPlainText("\n".join(self._lines[self._page * self.pageSize:(self._page + 1) * self.pageSize]))
+        self.textEdit.verticalScrollBar().setValue(self.textEdit.verticalScrollBar().maximum)
+        self.pageLabel.setText(f"Page {self._page + 1} / {self.nPages} ({len(self._lines)} lines)")
+        self.previousButton.setEnabled(self._page > 0)
+        self.nextButton.setEnabled(self._page < self.nPages - 1)
@@ -0,0 +1,276 @@
+import json
+import math
+import os
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from tempfile import mkdtemp
+from typing import List, Optional, Tuple
+
+import qt
+
+from .FieldOfViewCropping import FieldOfViewCrop
+from .SegmentationLoading import LabelArrayResult
+
+
+class MemoryBudget:
+    """
+    Persisted CPU memory budget of the inference. A budget of 0 GB uses a fraction of the machine physical memory.
+    """
+
+    settingsGroup = "DentalSegmentator/Inference"
+    automaticMemoryRatio = 0.75
+
+    @property
+    def budget_GB(self) -> float:
+        return float(qt.QSettings().value(f"{self.settingsGroup}/MemoryBudgetGB", 0))
+
+    @budget_GB.setter
+    def budget_GB(self, budget_GB):
+        qt.QSettings().setValue(f"{self.settingsGroup}/MemoryBudgetGB", float(budget_GB))
+
+    def effectiveBudget_GB(self) -> Optional[float]:
+        """
+        :returns: Configured budget, automatic budget if not configured or None if the physical memory is unknown.
+        """
+        if self.budget_GB > 0:
+            return self.budget_GB
+
+        totalMemory_GB = physicalMemory_GB()
+        return totalMemory_GB * self.automaticMemoryRatio if totalMemory_GB is not None else None
+
+
+def physicalMemory_GB() -> Optional[float]:
+    """
+    :returns: Physical memory of the machine or None if it cannot be determined.
+    """
+    try:
+        import psutil
+        return psutil.virtual_memory().total / 1024 ** 3
+    except ImportError:
+        pass
+
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024 ** 3
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def readTargetSpacing(modelPath) -> Optional[List[float]]:
+    """
+    :returns: Spacing the nnU-Net model resamples its inputs to or None if the model plans cannot be read.
+    """
+    if modelPath is None:
+        return None
+
+    for plansPath in sorted(Path(modelPath).rglob("plans.json")):
+        try:
+            configurations = json.loads(plansPath.read_text())["configurations"]
+            return [float(s) for s in configurations["3d_fullres"]["spacing"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            continue
+    return None
+
+
+# Rough conservative model of the nnU-Net CPU inference memory usage. The preprocessed input, logits accumulator and
+# prediction count are stored at the model spacing. The export resamples the logits to the input spacing.
+baselineMemory_GB = 1.5
+
+
+def _bytesPerResampledVoxel(nClasses):
+    return 4 * (2 + nClasses)
+
+
+def _bytesPerInputVoxel(nClasses):
+    return 4 * (2 + nClasses) + 1
+
+
+def estimateInferencePeak_GB(nVoxels, resamplingRatio=1.0, nClasses=6) -> float:
+    """
+    :param nVoxels: Number of voxels of the inference input.
+    :param resamplingRatio: Ratio of the number of voxels at the model spacing over the number of input voxels.
+    :param nClasses: Number of output classes including the background.
+    :returns: Estimated peak memory of the inference.
+    """
+    nBytes = nVoxels * (resamplingRatio * _bytesPerResampledVoxel(nClasses) + _bytesPerInputVoxel(nClasses))
+    return baselineMemory_GB + nBytes / 1024 ** 3
+
+
+@dataclass
+class InferenceMemoryPlan:
+    """
+    Inference strategy fitting the memory budget. The volume is split along its K axis in overlapping slabs, the labels
+    of each slab core region are kept. The peak estimates include all the parallel workers.
+    """
+    budget_GB: float
+    wholeVolumePeak_GB: float
+    estimatedPeak_GB: float
+    slabBoundingBoxes: List[Tuple[slice, slice, slice]]
+    slabCores: List[slice]
+    nWorkers: int = 1
+
+    @property
+    def nSlabs(self) -> int:
+        return len(self.slabBoundingBoxes)
+
+    @property
+    def isWithinBudget(self) -> bool:
+        return self.estimatedPeak_GB <= self.budget_GB
+
+    def describe(self) -> str:
+        msg = f"CPU memory budget {self.budget_GB:.1f} GB"
+        if self.nWorkers > 1:
+            msg += f" shared by {self.nWorkers} parallel fold workers ({self.budget_GB / self.nWorkers:.1f} GB each)"
+        msg += f", estimated whole volume inference peak {self.wholeVolumePeak_GB:.1f} GB : "
+        if self.nSlabs == 1:
+            return msg + "running the inference on the whole volume."
+
+        msg += (
+            f"running the inference in {self.nSlabs} overlapping slabs (estimated peak {self.estimatedPeak_GB:.1f} GB) "
+            f"and accumulating the labels in a memory mapped buffer."
+        )
+        if not self.isWithinBudget:
+            msg += " Warning : the budget cannot be met with the thinnest slabs."
+        return msg
+
+
+def planInference(
+        shape_kji,
+        spacing_kji,
+        budget_GB: float,
+        targetSpacing=None,
+        nClasses: int = 6,
+        overlap_mm: float = 20,
+        nWorkers: int = 1
+) -> InferenceMemoryPlan:
+    """
+    Choose the number of slabs the inference is split in so that its estimated peak memory fits in the budget.
+
+    :param shape_kji: Shape of the inference input volume in KJI order.
+    :param spacing_kji: Spacing of the inference input volume in KJI order.
+    :param budget_GB: Memory budget of the inference.
+    :param targetSpacing: Optional spacing of the model. Defaults to the input spacing.
+    :param nClasses: Number of output classes including the background.
+    :param overlap_mm: Overlap between consecutive slabs on each side, providing context to the network at the slab
+        boundaries.
+    :param nWorkers: Number of inference processes running at the same time on the volume or slab, such as the
+        parallel fold workers. Each process gets an equal share of the budget.
+    """
+    nWorkers = max(nWorkers, 1)
+    workerBudget_GB = budget_GB / nWorkers
+    resamplingRatio = 1.0
+    if targetSpacing is not None:
+        resamplingRatio = math.prod(spacing_kji) / math.prod(targetSpacing)
+
+    nK, nJ, nI = shape_kji
+    wholeVolumePeak_GB = estimateInferencePeak_GB(nK * nJ * nI, resamplingRatio, nClasses)
+    if wholeVolumePeak_GB <= workerBudget_GB:
+        return InferenceMemoryPlan(
+            budget_GB,
+            wholeVolumePeak_GB * nWorkers,
+            wholeVolumePeak_GB * nWorkers,
+            [tuple(slice(0, s) for s in shape_kji)],
+            [slice(0, nK)],
+            nWorkers
+        )
+
+    overlap = int(math.ceil(overlap_mm / spacing_kji[0]))
+    nSlabs, coreSize, slabPeak_GB = 1, nK, wholeVolumePeak_GB
+    while slabPeak_GB > workerBudget_GB and coreSize > max(overlap, 1):
+        nSlabs += 1
+        coreSize = int(math.ceil(nK / nSlabs))
+        slabSize = min(coreSize + 2 * overlap, nK)
+        slabPeak_GB = estimateInferencePeak_GB(slabSize * nJ * nI, resamplingRatio, nClasses)
+
+    slabCores = [slice(start, min(start + coreSize, nK)) for start in range(0, nK, coreSize)]
+    slabBoundingBoxes = [
+        (slice(max(core.start - overlap, 0), min(core.stop + overlap, nK)), slice(0, nJ), slice(0, nI))
+        for core in slabCores
+    ]
+    return InferenceMemoryPlan(
+        budget_GB, wholeVolumePeak_GB * nWorkers, slabPeak_GB * nWorkers, slabBoundingBoxes, slabCores, nWorkers
+    )
+
+
+class SlabbedInference:
+    """
+    Runs the inference slab by slab and accumulates the slab labels in a memory mapped label buffer, to keep the
+    memory usage independent of the volume size.
+    """
+
+    def __init__(self, volumeNode, plan: InferenceMemoryPlan):
+        self.plan = plan
+        self._slabs = [FieldOfViewCrop(volumeNode, boundingBox) for boundingBox in plan.slabBoundingBoxes]
+        self._iSlab = -1
+        self._nAccumulated = 0
+        self._bufferFolder = None
+        self._labelBuffer = None
+
+    @property
+    def iSlab(self) -> int:
+        return self._iSlab
+
+    @property
+    def nSlabs(self) -> int:
+        return len(self._slabs)
+
+    def hasNextSlab(self) -> bool:
+        return self._iSlab + 1 < self.nSlabs
+
+    def startNextSlab(self):
+        """
+        Remove the previous slab volume from the scene and create the next one.
+
+        :returns: Next slab volume node.
+        """
+        if self._iSlab >= 0:
+            self._slabs[self._iSlab].cleanup()
+        self._iSlab += 1
+        return self._slabs[self._iSlab].createCroppedVolumeNode()
+
+    def addSlabResult(self, result: LabelArrayResult):
+        """
+        Copy the current slab core labels to the label buffer.
+
+        :raises RuntimeError: if the labels don't match the current slab.
+        """
+        import numpy as np
+
+        slab = self._slabs[self._iSlab]
+        slab.checkCroppedLabelArray(result)
+        if self._labelBuffer is None:
+            self._bufferFolder = Path(mkdtemp(prefix="DentalSegmentator_"))
+            self._labelBuffer = np.memmap(
+                self._bufferFolder.joinpath("labels.dat"),
+                dtype=result.labelArray.dtype,
+                mode="w+",
+                shape=slab.originalShape
+            )
+
+        core = self.plan.slabCores[self._iSlab]
+        slabStart = slab.boundingBox[0].start
+        self._labelBuffer[core] = result.labelArray[core.start - slabStart:core.stop - slabStart]
+        self._nAccumulated += 1
+
+    def result(self) -> LabelArrayResult:
+        """
+        :returns: Accumulated labels in the input volume geometry.
+        :raises RuntimeError: if some slab results are missing.
+        """
+        if self._labelBuffer is None or self._nAccumulated != self.nSlabs:
+            raise RuntimeError(f"Only {self._nAccumulated} / {self.nSlabs} slab segmentations are available.")
+
+        self._labelBuffer.flush()
+        return LabelArrayResult(labelArray=self._labelBuffer, ijkToRas=self._slabs[0].originalIjkToRas())
+
+    def cleanup(self):
+        """
+        Remove the slab volumes from the scene and the label buffer file.
+        """
+        for slab in self._slabs:
+            slab.cleanup()
+
+        self._labelBuffer = None
+        if self._bufferFolder is not None:
+            shutil.rmtree(self._bufferFolder, ignore_errors=True)
+        self._bufferFolder = None
@@ -0,0 +1,429 @@
+"""
+nnU-Net inference worker running the DentalSegmentator network with ONNX Runtime on CPU.
+
+Started in a PythonSlicer process by the OnnxSegmentationLogic and doesn't depend on Slicer :
+
+    PythonSlicer OnnxInferenceWorker.py -i input_folder -o output_folder -m model_folder -f 0
+
+The network of each fold is exported once to ONNX next to its PyTorch checkpoint. The nnU-Net preprocessing, sliding
+window, test time augmentation and export are reused as is, only the network forward passes run in ONNX Runtime.
+
+An INT8 variant of the exported networks is generated with the --quantize option, using static post-training
+quantization calibrated on tiles of a representative volume :
+
+    PythonSlicer OnnxInferenceWorker.py --quantize -m model_folder -f 0 --calibration_volume volume_0000.nii.gz
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+from tempfile import mkdtemp
+from typing import List, Optional
+
+checkpointName = "checkpoint_final.pth"
+
+
+def trainedModelFolder(modelPath) -> Optional[Path]:
+    """
+    :returns: nnU-Net trained model folder of the weights folder, containing the plans, dataset and fold folders.
+    """
+    for plansPath in sorted(Path(modelPath).rglob("plans.json")):
+        if plansPath.parent.joinpath("dataset.json").is_file() and any(plansPath.parent.glob("fold_*")):
+            return plansPath.parent
+    return None
+
+
+precisions = ["float32", "int8"]
+
+
+def onnxModelPath(modelFolder, fold, precision="float32") -> Path:
+    suffix = ".onnx" if precision == "float32" else f".{precision}.onnx"
+    return Path(modelFolder).joinpath(f"fold_{fold}", Path(checkpointName).stem + suffix)
+
+
+def onnxMetadataPath(onnxPath) -> Path:
+    return Path(onnxPath).with_name(Path(onnxPath).name + ".json")
+
+
+def _checkpointStat(checkpointPath) -> List[int]:
+    stat = Path(checkpointPath).stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def readOnnxMetadata(modelFolder, fold, precision="float32") -> Optional[dict]:
+    """
+    :returns: Metadata of the fold ONNX export or None if the export is missing or older than the fold checkpoint.
+    """
+    onnxPath = onnxModelPath(modelFolder, fold, precision)
+    try:
+        metadata = json.loads(onnxMetadataPath(onnxPath).read_text())
+        checkpointPath = Path(modelFolder).joinpath(f"fold_{fold}", checkpointName)
+        if not onnxPath.is_file() or metadata["checkpoint"] != _checkpointStat(checkpointPath):
+            return None
+        return metadata
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def exportOnnxModel(modelFolder, fold) -> dict:
+    """
+    Export the network of the fold to ONNX with a dynamic batch size and the fold patch size.
+
+    :returns: Written export metadata.
+    """
+    import torch
+    from nnunetv2.inference.predict_from_raw_data import nnUNetPredictor
+
+    modelFolder = Path(modelFolder)
+    predictor = nnUNetPredictor(device=torch.device("cpu"))
+    predictor.initialize_from_trained_model_folder(modelFolder.as_posix(), (fold,), checkpoint_name=checkpointName)
+    network = predictor.network
+    network.load_state_dict(predictor.list_of_parameters[0])
+    network.eval()
+
+    patchSize = [int(s) for s in predictor.configuration_manager.patch_size]
+    nChannels = len(predictor.dataset_json.get("channel_names", predictor.dataset_json.get("modality", {"0": ""})))
+    onnxPath = onnxModelPath(modelFolder, fold)
+    tmpPath = onnxPath.with_suffix(".tmp")
+    with torch.no_grad():
+        torch.onnx.export(
+            network,
+            torch.zeros((1, nChannels, *patchSize), dtype=torch.float32),
+            tmpPath.as_posix(),
+            input_names=["input"],
+            output_names=["logits"],
+            dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+            opset_version=17
+        )
+    os.replace(tmpPath, onnxPath)
+
+    trainerName, _, configurationName = modelFolder.name.split("__")
+    metadata = {
+        "checkpoint": _checkpointStat(modelFolder.joinpath(f"fold_{fold}", checkpointName)),
+        "trainerName": trainerName,
+        "configurationName": configurationName,
+        "patchSize": patchSize,
+        "inferenceAllowedMirroringAxes": list(predictor.allowed_mirroring_axes or []),
+    }
+    onnxMetadataPath(onnxPath).write_text(json.dumps(metadata, indent=2))
+    return metadata
+
+
+def createOnnxSession(onnxPath):
+    """
+    :returns: ONNX Runtime CPU session using the thread count of the OMP_NUM_THREADS environment variable if set.
+    """
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    nThreads = os.environ.get("OMP_NUM_THREADS", "")
+    if nThreads.isdigit():
+        options.intra_op_num_threads = int(nThreads)
+    return onnxruntime.InferenceSession(Path(onnxPath).as_posix(), options, providers=["CPUExecutionProvider"])
+
+
+def createOnnxNetwork(sessions):
+    """
+    :returns: Module running the forward passes in the ONNX Runtime sessions. nnU-Net selects the fold to run by
+        loading its parameters, which are the session indices.
+    """
+    import torch
+
+    class OnnxNetwork(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.session = sessions[0]
+
+        def load_state_dict(self, iSession, *_, **__):
+            self.session = sessions[iSession]
+
+        def forward(self, x):
+            logits = self.session.run(None, {"input": x.detach().cpu().numpy()})[0]
+            return torch.from_numpy(logits).to(x.device)
+
+    return OnnxNetwork()
+
+
+def ensureOnnxModel(modelFolder, fold) -> dict:
+    """
+    Export the fold network to ONNX if its export is missing or outdated.
+
+    :returns: Export metadata.
+    """
+    metadata = readOnnxMetadata(modelFolder, fold)
+    if metadata is None:
+        print(f"Exporting fold {fold} network to ONNX...", flush=True)
+        metadata = exportOnnxModel(modelFolder, fold)
+    return metadata
+
+
+def createPredictor(modelFolder, folds, stepSize=0.5, disableTta=False, precision="float32"):
+    """
+    :returns: nnU-Net predictor running the fold networks with ONNX Runtime.
+    :raises RuntimeError: if the INT8 networks were not generated.
+    """
+    import torch
+    from nnunetv2.inference.predict_from_raw_data import nnUNetPredictor
+    from nnunetv2.utilities.plans_handling.plans_handler import PlansManager
+
+    sessions, metadata = [], None
+    for fold in folds:
+        metadata = ensureOnnxModel(modelFolder, fold)
+        if precision != "float32" and readOnnxMetadata(modelFolder, fold, precision) is None:
+            raise RuntimeError(f"The {precision} network of fold {fold} was not generated or is outdated.")
+        sessions.append(createOnnxSession(onnxModelPath(modelFolder, fold, precision)))
+
+    plansManager = PlansManager(json.loads(modelFolder.joinpath("plans.json").read_text()))
+    predictor = nnUNetPredictor(tile_step_size=stepSize, use_mirroring=not disableTta, device=torch.device("cpu"))
+    predictor.manual_initialization(
+        createOnnxNetwork(sessions),
+        plansManager,
+        plansManager.get_configuration(metadata["configurationName"]),
+        list(range(len(sessions))),
+        json.loads(modelFolder.joinpath("dataset.json").read_text()),
+        metadata["trainerName"],
+        tuple(metadata["inferenceAllowedMirroringAxes"]) or None
+    )
+    return predictor
+
+
+def predict(args):
+    modelFolder = _trainedModelFolderOrRaise(args.model)
+    if args.input is None or args.output is None:
+        raise RuntimeError("The input and output folders are required.")
+
+    predictor = createPredictor(modelFolder, args.folds, args.step_size, args.disable_tta, args.precision)
+    print(f"Running ONNX Runtime {args.precision} inference of folds {', '.join(args.folds)}...", flush=True)
+    predictor.predict_from_files(
+        args.input,
+        args.output,
+        save_probabilities=args.save_probabilities,
+        overwrite=True,
+        num_processes_preprocessing=args.npp,
+        num_processes_segmentation_export=args.nps
+    )
+
+
+def _trainedModelFolderOrRaise(modelPath) -> Path:
+    modelFolder = trainedModelFolder(modelPath)
+    if modelFolder is None:
+        raise RuntimeError(f"No nnU-Net trained model found in {modelPath}.")
+    return modelFolder
+
+
+def calibrationTiles(modelFolder, fold, calibrationVolumePath, nTiles):
+    """
+    Preprocess the calibration volume as nnU-Net does and take evenly spaced sliding window tiles of it.
+
+    :returns: List of network input arrays.
+    """
+    import numpy as np
+    from nnunetv2.inference.sliding_window_prediction import compute_steps_for_sliding_window
+
+    predictor = createPredictor(modelFolder, [fold])
+    preprocessor = predictor.configuration_manager.preprocessor_class(verbose=False)
+    data, _, _ = preprocessor.run_case(
+        [Path(calibrationVolumePath).as_posix()],
+        None,
+        predictor.plans_manager,
+        predictor.configuration_manager,
+        predictor.dataset_json
+    )
+
+    patchSize = list(predictor.configuration_manager.patch_size)
+    padding = [(0, 0)] + [(0, max(0, p - s)) for p, s in zip(patchSize, data.shape[1:])]
+    data = np.pad(data, padding).astype(np.float32)
+    steps = compute_steps_for_sliding_window(data.shape[1:], patchSize, 0.5)
+    starts = [(k, j, i) for k in steps[0] for j in steps[1] for i in steps[2]]
+    iTiles = np.unique(np.linspace(0, len(starts) - 1, min(nTiles, len(starts))).astype(int))
+    return [
+        data[(slice(None), *(slice(start, start + size) for start, size in zip(starts[iTile], patchSize)))][None]
+        for iTile in iTiles
+    ]
+
+
+def quantizeOnnxModel(modelFolder, fold, calibrationVolumePath, nCalibrationTiles=16) -> dict:
+    """
+    Generate the INT8 network of the fold with static post-training quantization. The activation ranges are
+    calibrated on tiles of the calibration volume. The weights are quantized per channel.
+
+    :returns: Written INT8 network metadata.
+    """
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    metadata = ensureOnnxModel(modelFolder, fold)
+    print(f"Preparing {nCalibrationTiles} calibration tiles of fold {fold}...", flush=True)
+    tiles = calibrationTiles(modelFolder, fold, calibrationVolumePath, nCalibrationTiles)
+
+    class TileReader(CalibrationDataReader):
+        def __init__(self):
+            self.iTile = 0
+
+        def get_next(self):
+            if self.iTile >= len(tiles):
+                return None
+            self.iTile += 1
+            print(f"Calibrating on tile {self.iTile} / {len(tiles)}...", flush=True)
+            return {"input": tiles[self.iTile - 1]}
+
+    int8Path = onnxModelPath(modelFolder, fold, "int8")
+    tmpDir = Path(mkdtemp(prefix="DentalSegmentator_Quantization_"))
+    try:
+        preprocessedPath = tmpDir.joinpath("preprocessed.onnx")
+        quant_pre_process(onnxModelPath(modelFolder, fold).as_posix(), preprocessedPath.as_posix())
+        quantize_static(
+            preprocessedPath.as_posix(),
+            tmpDir.joinpath("int8.onnx").as_posix(),
+            TileReader(),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True
+        )
+        os.replace(tmpDir.joinpath("int8.onnx"), int8Path)
+    finally:
+        shutil.rmtree(tmpDir, ignore_errors=True)
+
+    int8Metadata = {
+        **metadata,
+        "calibrationVolume": Path(calibrationVolumePath).name,
+        "nCalibrationTiles": len(tiles),
+        "float32Size_MB": round(onnxModelPath(modelFolder, fold).stat().st_size / 1024 ** 2, 1),
+        "int8Size_MB": round(int8Path.stat().st_size / 1024 ** 2, 1),
+    }
+    onnxMetadataPath(int8Path).write_text(json.dumps(int8Metadata, indent=2))
+    return int8Metadata
+
+
+def labelDiceScores(labelArray, referenceArray, labels) -> dict:
+    """
+    :param labels: Dictionary of the label names and values, the background excluded.
+    :returns: Dice score of each label name.
+    :raises RuntimeError: if the label arrays don't have the same shape.
+    """
+    import numpy as np
+
+    if labelArray.shape != referenceArray.shape:
+        raise RuntimeError(f"Segmentation shape {labelArray.shape} doesn't match reference {referenceArray.shape}.")
+
+    scores = {}
+    for name, labelValue in labels.items():
+        isLabel, isReference = labelArray == labelValue, referenceArray == labelValue
+        nVoxels = isLabel.sum() + isReference.sum()
+        scores[name] = round(float(2 * np.logical_and(isLabel, isReference).sum() / nVoxels), 4) if nVoxels else 1.0
+    return scores
+
+
+def evaluateQuantization(modelFolder, folds, calibrationVolumePath, referencePath) -> dict:
+    """
+    Segment the calibration volume with the float32 and INT8 networks, without test time augmentation, and compare
+    both segmentations to the reference segmentation. The results are stored in the INT8 network metadata.
+
+    :returns: Dice scores of each precision against the reference.
+    """
+    import nibabel
+    import numpy as np
+
+    referenceArray = np.asarray(nibabel.load(Path(referencePath).as_posix()).dataobj)
+    labels = {
+        name: value for name, value in json.loads(modelFolder.joinpath("dataset.json").read_text())["labels"].items()
+        if value != 0
+    }
+
+    evaluation = {}
+    tmpDir = Path(mkdtemp(prefix="DentalSegmentator_Quantization_"))
+    try:
+        inputFolder = tmpDir.joinpath("input")
+        inputFolder.mkdir()
+        shutil.copyfile(calibrationVolumePath, inputFolder.joinpath("volume_0000.nii.gz"))
+        for precision in precisions:
+            print(f"Segmenting the reference volume with the {precision} networks...", flush=True)
+            outputFolder = tmpDir.joinpath(precision)
+            predictor = createPredictor(modelFolder, folds, disableTta=True, precision=precision)
+            predictor.predict_from_files(
+                inputFolder.as_posix(),
+                outputFolder.as_posix(),
+                save_probabilities=False,
+                overwrite=True,
+                num_processes_preprocessing=1,
+                num_processes_segmentation_export=1
+            )
+            labelArray = np.asarray(nibabel.load(outputFolder.joinpath("volume.nii.gz").as_posix()).dataobj)
+            dice = labelDiceScores(labelArray, referenceArray, labels)
+            evaluation[precision] = {"dice": dice, "meanDice": round(float(np.mean(list(dice.values()))), 4)}
+    finally:
+        shutil.rmtree(tmpDir, ignore_errors=True)
+
+    for fold in folds:
+        int8Path = onnxModelPath(modelFolder, fold, "int8")
+        metadata = json.loads(onnxMetadataPath(int8Path).read_text())
+        metadata["evaluation"] = {"folds": list(folds), **evaluation}
+        onnxMetadataPath(int8Path).write_text(json.dumps(metadata, indent=2))
+    return evaluation
+
+
+def quantize(args):
+    modelFolder = _trainedModelFolderOrRaise(args.model)
+    if args.calibration_volume is None:
+        raise RuntimeError("The calibration volume is required to quantize the networks.")
+
+    for fold in args.folds:
+        metadata = quantizeOnnxModel(modelFolder, fold, args.calibration_volume, args.n_calibration_tiles)
+        print(
+            f"Fold {fold} INT8 network generated ({metadata['float32Size_MB']} MB float32, "
+            f"{metadata['int8Size_MB']} MB INT8).",
+            flush=True
+        )
+
+    if args.reference is not None:
+        evaluation = evaluateQuantization(modelFolder, args.folds, args.calibration_volume, args.reference)
+        for precision, result in evaluation.items():
+            print(f"{precision} mean Dice against the reference segmentation : {result['meanDice']:.4f}", flush=True)
+
+
+def parseArgs(argv):
+    parser = argparse.ArgumentParser(description="DentalSegmentator ONNX Runtime inference worker.")
+    parser.add_argument("-i", "--input", help="Input folder of the nnU-Net named volume files.")
+    parser.add_argument("-o", "--output", help="Output folder of the segmentations.")
+    parser.add_argument("-m", "--model", required=True, help="DentalSegmentator weights folder.")
+    parser.add_argument("-f", "--folds", nargs="+", default=["0"], help="Folds to ensemble.")
+    parser.add_argument("--step_size", type=float, default=0.5, help="Sliding window step size.")
+    parser.add_argument("--disable_tta", action="store_true", help="Disable the mirroring test time augmentation.")
+    parser.add_argument("--precision", default="float32", choices=precisions, help="Precision of the networks.")
+    parser.add_argument(
+        "--save_probabilities", action="store_true", help="Also write the class probabilities of the segmentation."
+    )
+    parser.add_argument("-npp", type=int, default=1, help="Number of preprocessing processes.")
+    parser.add_argument("-nps", type=int, default=1, help="Number of segmentation export processes.")
+    parser.add_argument("--quantize", action="store_true", help="Generate the INT8 networks instead of predicting.")
+    parser.add_argument("--calibration_volume", help="Volume file the INT8 quantization is calibrated on.")
+    parser.add_argument("--n_calibration_tiles", type=int, default=16, help="Number of calibration tiles.")
+    parser.add_argument(
+        "--reference",
+        help="Optional reference segmentation of the calibration volume the INT8 accuracy is evaluated against."
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv) -> int:
+    args = parseArgs(argv)
+    try:
+        if args.quantize:
+            quantize(args)
+        else:
+            predict(args)
+    except Exception as e:  # noqa
+        import traceback
+        action = "quantization" if args.quantize else "inference"
+        print(f"ONNX Runtime {action} failed : {e}\n{traceback.format_exc()}", flush=True)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,177 @@
+import importlib.util
+import shutil
+import sys
+from pathlib import Path
+from tempfile import mkdtemp
+from typing import List, Optional
+
+import qt
+import slicer
+
+from .FoldEnsemble import parseFolds
+from .Signal import Signal
+
+
+def _missingPackages(isQuantizationNeeded=False) -> List[str]:
+    packages = ["onnxruntime", "onnx"] if isQuantizationNeeded else ["onnxruntime"]
+    return [package for package in packages if importlib.util.find_spec(package) is None]
+
+
+def isOnnxRuntimeAvailable(isQuantizationNeeded=False) -> bool:
+    """
+    :param isQuantizationNeeded: If True, also check the ONNX package required by the quantization tools.
+    """
+    return not _missingPackages(isQuantizationNeeded)
+
+
+def installOnnxRuntime(progressCallback=None, isQuantizationNeeded=False) -> bool:
+    """
+    Install ONNX Runtime in the Slicer Python environment, shared by the PythonSlicer worker processes.
+
+    :param progressCallback: Optional function called with progress information.
+    :param isQuantizationNeeded: If True, also install the ONNX package required by the quantization tools.
+    :returns: True if ONNX Runtime is available after the install, False otherwise.
+    """
+    missingPackages = _missingPackages(isQuantizationNeeded)
+    if not missingPackages:
+        return True
+
+    if progressCallback is not None:
+        progressCallback(f"Installing {', '.join(missingPackages)}...")
+    try:
+        slicer.util.pip_install(" ".join(missingPackages))
+    except Exception as e:  # noqa
+        if progressCallback is not None:
+            progressCallback(f"Failed to install ONNX Runtime :\n{e}")
+        return False
+
+    importlib.invalidate_caches()
+    return isOnnxRuntimeAvailable(isQuantizationNeeded)
+
+
+def pythonSlicerExecutable() -> str:
+    return shutil.which("PythonSlicer") or sys.executable
+
+
+class OnnxSegmentationLogic:
+    """
+    Segmentation logic running the DentalSegmentator network with ONNX Runtime on CPU in a PythonSlicer worker process.
+    The network is exported to ONNX on its first run. The nnU-Net preprocessing and export are the same as for the
+    PyTorch inference. INT8 networks have to be generated beforehand by the PythonDependencyChecker.
+
+    Provides the same interface as the nnU-Net segmentation logic.
+    """
+
+    workerPath = Path(__file__).parent.joinpath("OnnxInferenceWorker.py")
+
+    def __init__(self, precision="float32", saveProbabilities=False):
+        """
+        :param precision: Precision of the networks, float32 or int8.
+        :param saveProbabilities: If True, the worker also writes the class probabilities of the segmentation.
+        """
+        self.precision = precision
+        self.saveProbabilities = saveProbabilities
+        self.inferenceFinished = Signal()
+        self.errorOccurred = Signal("str")
+        self.progressInfo = Signal("str")
+        self._parameter = None
+        self._process = None
+        self._tmpDir = None
+        self._isStopping = False
+        self._outputLines = []
+
+    def resultPath(self) -> Optional[Path]:
+        """
+        :returns: Segmentation file written by the inference worker or None if the inference didn't write it.
+        """
+        outFile = self._tmpDir.joinpath("output", "volume.nii.gz") if self._tmpDir is not None else None
+        return outFile if outFile is not None and outFile.exists() else None
+
+    def probabilitiesPath(self) -> Optional[Path]:
+        """
+        :returns: Class probabilities file written by nnU-Net next to the segmentation if saveProbabilities is enabled.
+        """
+        probabilitiesPath = self._tmpDir.joinpath("output", "volume.npz") if self._tmpDir is not None else None
+        return probabilitiesPath if probabilitiesPath is not None and probabilitiesPath.exists() else None
+
+    def setParameter(self, parameter):
+        self._parameter = parameter
+
+    def workerArguments(self, inputFolder, outputFolder) -> List[str]:
+        """
+        :returns: Command line arguments of the worker process for the current parameter.
+        """
+        parameter = self._parameter
+        return [
+            self.workerPath.as_posix(),
+            "-i", Path(inputFolder).as_posix(),
+            "-o", Path(outputFolder).as_posix(),
+            "-m", Path(parameter.modelPath).as_posix(),
+            "-f", *parseFolds(str(parameter.folds)),
+            "--step_size", str(getattr(parameter, "stepSize", 0.5)),
+            "--precision", self.precision,
+            *(["--save_probabilities"] if self.saveProbabilities else []),
+            *(["--disable_tta"] if getattr(parameter, "disableTta", False) else []),
+            "-npp", str(getattr(parameter, "nProcessPreprocessing", 1)),
+            "-nps", str(getattr(parameter, "nProcessSegmentationExport", 1)),
+        ]
+
+    def startSegmentation(self, volumeNode):
+        self.stopSegmentation()
+        self.waitForSegmentationFinished()
+        self._isStopping = False
+        self._outputLines = []
+        self._resetTmpDir()
+
+        inputFolder = self._tmpDir.joinpath("input")
+        inputFolder.mkdir()
+        self.progressInfo("Writing the inference input volume...")
+        if not slicer.util.exportNode(volumeNode, inputFolder.joinpath("volume_0000.nii.gz").as_posix()):
+            self.errorOccurred("Failed to write the inference input volume.")
+            return
+
+        self._process = qt.QProcess()
+        self._process.setProcessChannelMode(qt.QProcess.MergedChannels)
+        self._process.readyReadStandardOutput.connect(self._onOutputAvailable)
+        self._process.finished.connect(self._onProcessFinished)
+        self.progressInfo(f"Starting ONNX Runtime {self.precision} inference...")
+        self._process.start(
+            pythonSlicerExecutable(), self.workerArguments(inputFolder, self._tmpDir.joinpath("output"))
+        )
+
+    def _resetTmpDir(self):
+        if self._tmpDir is not None:
+            shutil.rmtree(self._tmpDir, ignore_errors=True)
+        self._tmpDir = Path(mkdtemp(prefix="DentalSegmentator_Onnx_"))
+
+    def _onOutputAvailable(self, *_):
+        output = self._process.readAllStandardOutput().data().decode(errors="replace")
+        for line in output.splitlines():
+            if line.strip():
+                self._outputLines.append(line)
+                self.progressInfo(line)
+
+    def _onProcessFinished(self, exitCode, *_):
+        self._onOutputAvailable()
+        if self._isStopping:
+            return
+
+        if exitCode != 0 or self.resultPath() is None:
+            self.errorOccurred("\n".join(self._outputLines[-20:]) or "ONNX Runtime inference failed.")
+            return
+        self.inferenceFinished()
+
+    def stopSegmentation(self):
+        if self._process is None or self._process.state() == qt.QProcess.NotRunning:
+            return
+        self._isStopping = True
+        self._process.kill()
+
+    def waitForSegmentationFinished(self):
+        if self._process is not None and self._process.state() != qt.QProcess.NotRunning:
+            self._process.waitForFinished(-1)
+        slicer.app.processEvents()
+
+    def loadSegmentation(self):
+        resultPath = self.resultPath()
+        return slicer.util.loadSegmentation(resultPath.as_posix()) if resultPath is not None else None
@@ -1,11 +1,20 @@
 import json
+import logging
+import os
+import re
+import shutil
+import subprocess
 import zipfile
 from pathlib import Path
 from typing import Optional, Callable
 
 import qt
 import slicer
-from github import Github, GithubException
+
+from .OnnxInferenceWorker import readOnnxMetadata, trainedModelFolder
+from .OnnxSegmentation import OnnxSegmentationLogic, installOnnxRuntime, pythonSlicerExecutable
+from .ReleaseMetadataCache import ReleaseMetadataCache
+from .WeightsDownloader import ChunkedDownloader
 
 
 def hasInternetConnection(timeOut_sec=2) -> bool:
@@ -23,14 +32,33 @@ def hasInternetConnection(timeOut_sec=2) -> bool:
 class PythonDependencyChecker:
     """
     Class responsible for installing the Modules dependencies and downloading the model weights.
+
+    Each downloaded weights release is extracted in its own version folder of the weights folder. A new version is
+    activated by atomically replacing the active version pointer file once its extraction is complete and verified.
+    Previous versions are kept until garbage collected and can be activated again without downloading them.
+    Weights manually extracted in the weights folder are used when no downloaded version is active. Once a downloaded
+    version is activated, they are moved to their own version folder and can be activated again.
+
+    INT8 quantized variants of the networks can be generated locally for the ONNX Runtime CPU inference. They are
+    stored next to the checkpoints of the active version.
     """
 
+    activePointerName = "active_weights.json"
+    pinnedMarkerName = ".pinned"
+    weightsManifestName = "weights_manifest.json"
+
+    # SHA-256 digests of the weights release assets by download URL, for the releases published before GitHub provided
+    # the asset digests. Add the digest of each release asset without a GitHub digest here, computed from a copy of the
+    # asset verified with the release authors.
+    knownWeightsSha256 = {}
+
     def __init__(
             self,
             repoPath: Optional[str] = None,
             destWeightFolder: Optional[Path] = None,
             hasInternetConnectionF: Optional[Callable[[], bool]] = None,
-            errorDisplayF=None
+            errorDisplayF=None,
+            confirmUnverifiedDownloadF: Optional[Callable[[str], bool]] = None
     ):
         """
         :param repoPath: Optional path to the github repository from which the weights will be downloaded from.
@@ -38,13 +66,26 @@ class PythonDependencyChecker:
         :param hasInternetConnectionF: Optional function returning True when internet connection is available, False
             otherwise.
         :param errorDisplayF: Optional function used to display error information.
+        :param confirmUnverifiedDownloadF: Optional function called with the download URL when no SHA-256 digest is
+            available to verify the weights, returning True to download them anyway. Unverified downloads are refused
+            if not provided.
         """
-        from .SegmentationWidget import SegmentationWidget
         self.dependencyChecked = False
-        self.destWeightFolder = Path(destWeightFolder or SegmentationWidget.nnUnetFolder())
+        self.destWeightFolder = Path(destWeightFolder or self.nnUnetFolder())
         self.repo_path = repoPath or "gaudot/SlicerDentalSegmentator"
         self.hasInternetConnectionF = hasInternetConnectionF or hasInternetConnection
         self.errorDisplay = errorDisplayF or slicer.util.errorDisplay
+        self.confirmUnverifiedDownload = confirmUnverifiedDownloadF or (lambda download_url: False)
+        self.releaseMetadata = ReleaseMetadataCache(
+            self.destWeightFolder / "release_metadata.json",
+            self.repo_path,
+            hasInternetConnectionF=lambda: self.hasInternetConnectionF()
+        )
+
+    @classmethod
+    def nnUnetFolder(cls) -> Path:
+        fileDir = Path(__file__).parent
+        return fileDir.joinpath("..", "Resources", "ML").resolve()
 
     @classmethod
     def areDependenciesSatisfied(cls):
@@ -72,38 +113,228 @@ class PythonDependencyChecker:
         return self.getDatasetPath() is None
 
     def getLatestReleaseUrl(self):
-        g = Github()
-        repo = g.get_repo(self.repo_path)
-        assets = [asset for release in repo.get_releases() for asset in release.get_assets()]
-        return assets[0].browser_download_url
+        return self.getLatestReleaseInfo()["download_url"]
+
+    def getLatestReleaseInfo(self, forceRevalidate=False) -> dict:
+        """
+        :param forceRevalidate: If True, revalidates the cached release metadata even if it didn't expire.
+        :returns: dict containing the download_url of the latest weights release asset and its sha256 digest if it is
+            published by GitHub, None otherwise.
+        :raises RuntimeError: if the release metadata couldn't be fetched.
+        """
+        return self.releaseMetadata.latestRelease(forceRevalidate)
 
     def areWeightsOutdated(self) -> bool:
         """
+        Doesn't access the network if the cached release metadata is fresh and matches the downloaded weights.
+
         :returns: True if weights information are missing or internet connection is available and weights information
             don't match the ones on the GitHub page. False otherwise.
         """
         if not self.getWeightDownloadInfoPath().exists():
             return self.areWeightsMissing()
 
-        if not self.hasInternetConnectionF():
+        lastDownloadedWeights = self.getLastDownloadedWeights()
+        cachedRelease = self.releaseMetadata.cachedRelease()
+        if self.releaseMetadata.isFresh() and cachedRelease["download_url"] == lastDownloadedWeights:
+            return False
+
+        if not self.releaseMetadata.hasInternetConnection():
             return False
 
         try:
-            return self.getLastDownloadedWeights() != self.getLatestReleaseUrl()
-        except GithubException:
+            return lastDownloadedWeights != self.getLatestReleaseUrl()
+        except RuntimeError:
             return False
 
     def getDestWeightFolder(self):
         return self.destWeightFolder
 
     def getDatasetPath(self):
+        """
+        Reads the dataset path from the weights manifest of the active weights folder. Scans the weights folder and
+        writes the manifest if the manifest is missing or stale.
+        """
+        weightsFolder = self.getActiveWeightsFolder()
+        manifest = self.readWeightsManifest(weightsFolder)
+        if manifest is None:
+            manifest = self.writeWeightsManifest(weightsFolder)
+        return weightsFolder / manifest["dataset"] if manifest is not None else None
+
+    def readWeightsManifest(self, weightsFolder) -> Optional[dict]:
+        """
+        :returns: Weights manifest of the input folder or None if the manifest is missing or doesn't match the
+            dataset and checkpoint files anymore.
+        """
+        weightsFolder = Path(weightsFolder)
+        try:
+            manifest = json.loads(weightsFolder.joinpath(self.weightsManifestName).read_text())
+            if not weightsFolder.joinpath(manifest["dataset"]).is_file():
+                return None
+
+            for checkpoint in manifest["checkpoints"]:
+                stat = weightsFolder.joinpath(checkpoint["path"]).stat()
+                if (stat.st_size, stat.st_mtime_ns) != (checkpoint["size"], checkpoint["mtime_ns"]):
+                    return None
+            return manifest
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def writeWeightsManifest(self, weightsFolder) -> Optional[dict]:
+        """
+        Scan the input weights folder and write the manifest listing its dataset, plans, folds and checkpoints.
+        The versions and downloads folders are ignored when scanning the root weights folder.
+
+        :returns: Written manifest or None if the folder doesn't contain any dataset.
+        """
+        weightsFolder = Path(weightsFolder)
+        ignoredFolders = {
+            folder for folder in [self.getVersionsFolder(), self.getDownloadFolder()] if weightsFolder in folder.parents
+        }
+        datasetPaths, planPaths, checkpointPaths = [], [], []
+        for path in sorted(weightsFolder.rglob("*")):
+            if ignoredFolders.intersection(path.parents) or not path.is_file():
+                continue
+            if path.name == "dataset.json":
+                datasetPaths.append(path)
+            elif path.name == "plans.json":
+                planPaths.append(path)
+            elif path.suffix == ".pth":
+                checkpointPaths.append(path)
+
+        if not datasetPaths:
+            return None
+
+        def relative(path):
+            return path.relative_to(weightsFolder).as_posix()
+
+        foldFolders = {path.parent for path in checkpointPaths if path.parent.name.startswith("fold_")}
+        manifest = {
+            "dataset": relative(datasetPaths[0]),
+            "plans": [relative(path) for path in planPaths],
+            "folds": sorted(relative(path) for path in foldFolders),
+            "checkpoints": [
+                {"path": relative(path), "size": path.stat().st_size, "mtime_ns": path.stat().st_mtime_ns}
+                for path in checkpointPaths
+            ],
+        }
+
+        try:
+            manifestPath = weightsFolder / self.weightsManifestName
+            tmpPath = manifestPath.with_suffix(".tmp")
+            tmpPath.write_text(json.dumps(manifest, indent=2))
+            os.replace(tmpPath, manifestPath)
+        except OSError:
+            pass
+        return manifest
+
+    def getVersionsFolder(self):
+        return self.destWeightFolder / "versions"
+
+    def getActivePointerPath(self):
+        return self.destWeightFolder / self.activePointerName
+
+    def getActiveWeightsVersion(self) -> Optional[str]:
+        """
+        :returns: Name of the active weights version or None if no downloaded version is active.
+        """
         try:
-            return next(self.destWeightFolder.rglob("dataset.json"))
-        except StopIteration:
+            version = json.loads(self.getActivePointerPath().read_text()).get("version")
+        except (OSError, ValueError):
             return None
+        return version if version and self.getVersionsFolder().joinpath(version).is_dir() else None
+
+    def getActiveWeightsFolder(self) -> Path:
+        """
+        :returns: Folder of the active weights version or the weights folder itself if no downloaded version is active.
+        """
+        version = self.getActiveWeightsVersion()
+        return self.getVersionsFolder() / version if version else self.destWeightFolder
+
+    def listWeightsVersions(self):
+        """
+        :returns: Installed weights versions sorted from oldest to newest install.
+        """
+        if not self.getVersionsFolder().exists():
+            return []
+
+        def installTime(versionFolder):
+            infoPath = versionFolder / "download_info.json"
+            return (infoPath if infoPath.exists() else versionFolder).stat().st_mtime
+
+        versionFolders = [p for p in self.getVersionsFolder().iterdir() if p.is_dir() and not p.name.startswith(".")]
+        return [p.name for p in sorted(versionFolders, key=installTime)]
+
+    def activateWeightsVersion(self, version):
+        """
+        Make the input installed version the active weights version.
+
+        :raises ValueError: if the version is not installed.
+        """
+        if version not in self.listWeightsVersions():
+            raise ValueError(f"Weights version {version} is not installed.")
+
+        pointerPath = self.getActivePointerPath()
+        tmpPath = pointerPath.with_suffix(".tmp")
+        tmpPath.write_text(json.dumps({"version": version}))
+        os.replace(tmpPath, pointerPath)
+
+    def pinWeightsVersion(self, version, isPinned=True):
+        """
+        Pinned versions are never removed by the garbage collection.
+        """
+        markerPath = self.getVersionsFolder().joinpath(version, self.pinnedMarkerName)
+        if isPinned:
+            markerPath.touch()
+        else:
+            markerPath.unlink(missing_ok=True)
+
+    def isWeightsVersionPinned(self, version) -> bool:
+        return self.getVersionsFolder().joinpath(version, self.pinnedMarkerName).exists()
+
+    def garbageCollectWeightsVersions(self, keepCount=2):
+        """
+        Remove the installed versions except the active version, the pinned versions and the keepCount most recently
+        installed versions. Removes the leftovers of interrupted installs.
+
+        :returns: List of the removed versions.
+        """
+        if not self.getVersionsFolder().exists():
+            return []
+
+        for leftoverFolder in self.getVersionsFolder().glob(".*"):
+            shutil.rmtree(leftoverFolder, ignore_errors=True)
+
+        versions = self.listWeightsVersions()
+        keptVersions = set(versions[-keepCount:] if keepCount > 0 else [])
+        keptVersions.add(self.getActiveWeightsVersion())
+
+        removedVersions = []
+        for version in versions:
+            if version in keptVersions or self.isWeightsVersionPinned(version):
+                continue
+            shutil.rmtree(self.getVersionsFolder() / version)
+            removedVersions.append(version)
+        return removedVersions
+
+    @staticmethod
+    def weightsVersionName(download_url) -> str:
+        """
+        :returns: Version name of the input release download URL. Uses the release tag if present in the URL and the
+            file name otherwise.
+        """
+        parts = download_url.rstrip("/").split("/")
+        version = parts[-2] if len(parts) > 2 and parts[-3] == "download" else Path(parts[-1]).stem
+        return re.sub(r"[^A-Za-z0-9._-]", "_", version).lstrip(".") or "weights"
+
+    def getDownloadFolder(self):
+        """
+        Folder where the partial downloads and their journal are kept until the download is complete.
+        """
+        return self.destWeightFolder / ".downloads"
 
     def getWeightDownloadInfoPath(self):
-        return self.destWeightFolder / "download_info.json"
+        return self.getActiveWeightsFolder() / "download_info.json"
 
     def getLastDownloadedWeights(self):
         if not self.getWeightDownloadInfoPath().exists():
@@ -114,14 +345,13 @@ class PythonDependencyChecker:
 
     def downloadWeights(self, progressCallback) -> bool:
         """
-        Removes the weight folder and tries to download the weights from the GitHub page.
-        If an internet connection is not available, keeps the current weights unchanged.
+        Tries to download the weights from the GitHub page and activates them once the download is complete, its
+        SHA-256 digest verified and the weights extracted in their version folder.
+        The download uses parallel range requests and is resumed where it stopped if interrupted.
+        If an internet connection is not available or the download fails, keeps the current weights active.
 
         :returns: True if download was successful. False in case of no internet or failure during download.
         """
-        import shutil
-        import requests
-
         progressCallback("Downloading model weights...")
         if not self.hasInternetConnectionF():
             self.errorDisplay(
@@ -132,24 +362,35 @@ class PythonDependencyChecker:
             )
             return False
 
-        if self.destWeightFolder.exists():
-            shutil.rmtree(self.destWeightFolder)
-        self.destWeightFolder.mkdir(parents=True, exist_ok=True)
-
         try:
-            download_url = self.getLatestReleaseUrl()
-            session = requests.Session()
-            response = session.get(download_url, stream=True)
-            response.raise_for_status()
+            releaseInfo = self.getLatestReleaseInfo(forceRevalidate=True)
+            download_url = releaseInfo["download_url"]
+            expectedSha256 = self.expectedWeightsSha256(releaseInfo)
+            if expectedSha256 is None and not self.confirmUnverifiedDownload(download_url):
+                self.errorDisplay(
+                    "Weights download cancelled : no SHA-256 digest is available to verify the weights downloaded "
+                    f"from {download_url}.\n"
+                    "To manually install the weights, please refer to the documentation here :\n"
+                    "https://github.com/gaudot/SlicerDentalSegmentator",
+                )
+                return False
 
             file_name = download_url.split("/")[-1]
-            destZipPath = self.destWeightFolder / file_name
-            with open(destZipPath, "wb") as f:
-                for chunk in response.iter_content(1024 * 1024):
-                    f.write(chunk)
+            destZipPath = ChunkedDownloader(
+                download_url,
+                self.getDownloadFolder() / file_name,
+                expectedSha256=expectedSha256,
+                progressCallback=self._downloadProgressCallback(progressCallback)
+            ).download()
 
-            self.extractWeightsToWeightsFolder(destZipPath)
-            self.writeDownloadInfoURL(download_url)
+            self.verifyWeightsArchive(destZipPath)
+            version = self.weightsVersionName(download_url)
+            # Only the verified digests are recorded
+            self.installWeightsVersion(destZipPath, version, download_url, expectedSha256)
+            self.activateWeightsVersion(version)
+            destZipPath.unlink()
+            self._migrateManuallyInstalledWeights()
+            self.garbageCollectWeightsVersions()
             return True
         except Exception:  # noqa
             import traceback
@@ -161,9 +402,244 @@ class PythonDependencyChecker:
             )
             return False
 
-    def extractWeightsToWeightsFolder(self, zipPath):
+    def expectedWeightsSha256(self, releaseInfo) -> Optional[str]:
+        """
+        Uses the digest published by GitHub, then the digest pinned in knownWeightsSha256. The digests of previously
+        downloaded files are never trusted, as they may not have been verified. Logs a warning if no digest is
+        available.
+
+        :returns: Expected SHA-256 digest of the release asset or None if no digest is available.
+        """
+        download_url = releaseInfo["download_url"]
+        sha256 = releaseInfo.get("sha256") or self.knownWeightsSha256.get(download_url)
+        if sha256 is None:
+            logging.warning(
+                f"No SHA-256 digest is available for the weights release {download_url}. The weights are only "
+                f"downloaded if the download is confirmed."
+            )
+        return sha256
+
+    @staticmethod
+    def _downloadProgressCallback(progressCallback, step_percent=10):
+        """
+        :returns: Function reporting the download progress to the input progress callback every step_percent.
+        """
+        lastReported = [-step_percent]
+
+        def onProgress(nBytes, totalBytes):
+            if not totalBytes:
+                return
+            percent = int(100 * nBytes / totalBytes)
+            if percent - lastReported[0] >= step_percent or (percent == 100 and lastReported[0] != 100):
+                lastReported[0] = percent
+                progressCallback(f"Downloading model weights... {percent}% ({totalBytes / 1024 ** 2:.0f} MB)")
+
+        return onProgress
+
+    def _migrateManuallyInstalledWeights(self) -> Optional[str]:
+        """
+        Move the weights extracted outside the version folders, such as the weights installed before the weights were
+        versioned, to their own version folder. The version is named from the download URL of their download_info.json
+        file, so that they can be listed, pinned and activated again without downloading them.
+
+        Files are moved one by one directly to the version folder. An interrupted migration is resumed in a new version
+        folder on the next download and never removes any file.
+
+        :returns: Name of the migrated version or None if there are no weights outside the version folders.
+        """
+        if self.writeWeightsManifest(self.destWeightFolder) is None:
+            return None
+
+        keptPaths = {
+            self.getVersionsFolder(),
+            self.getDownloadFolder(),
+            self.getCalibrationFolder(),
+            self.getActivePointerPath(),
+            self.releaseMetadata.cachePath
+        }
+        try:
+            download_url = json.loads(self.destWeightFolder.joinpath("download_info.json").read_text())["download_url"]
+            version = self.weightsVersionName(download_url)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            version = "manual"
+
+        versionFolder = self.getVersionsFolder() / version
+        suffix = 1
+        while versionFolder.exists():
+            suffix += 1
+            versionFolder = self.getVersionsFolder() / f"{version}_{suffix}"
+
+        versionFolder.mkdir(parents=True)
+        for path in list(self.destWeightFolder.iterdir()):
+            if path not in keptPaths:
+                os.replace(path, versionFolder / path.name)
+        return versionFolder.name
+
+    def installWeightsVersion(self, zipPath, version, download_url, sha256=None) -> str:
+        """
+        Extract the weights archive to a temporary folder and move it to its version folder once the extraction is
+        complete. The installed version is not activated.
+
+        :returns: Installed version name.
+        :raises RuntimeError: if the archive doesn't contain a dataset.
+        """
+        versionFolder = self.getVersionsFolder() / version
+        tmpFolder = self.getVersionsFolder() / f".{version}.tmp"
+        oldFolder = self.getVersionsFolder() / f".{version}.old"
+        shutil.rmtree(tmpFolder, ignore_errors=True)
+        shutil.rmtree(oldFolder, ignore_errors=True)
+
+        self.extractWeightsToWeightsFolder(zipPath, tmpFolder)
+        if self.readWeightsManifest(tmpFolder) is None:
+            shutil.rmtree(tmpFolder)
+            raise RuntimeError(f"Weights archive {zipPath} doesn't contain any dataset.json file.")
+        self._writeDownloadInfo(tmpFolder, download_url, sha256)
+
+        if versionFolder.exists():
+            os.replace(versionFolder, oldFolder)
+        os.replace(tmpFolder, versionFolder)
+        shutil.rmtree(oldFolder, ignore_errors=True)
+        return version
+
+    @staticmethod
+    def verifyWeightsArchive(zipPath):
+        """
+        Check the CRC of all the archive files before the current weights are replaced.
+
+        :raises RuntimeError: if the archive is corrupted.
+        """
+        try:
+            with zipfile.ZipFile(zipPath, "r") as f:
+                corruptedFile = f.testzip()
+        except zipfile.BadZipFile as e:
+            raise RuntimeError(f"Downloaded weights archive {zipPath} is corrupted.") from e
+
+        if corruptedFile is not None:
+            raise RuntimeError(f"Downloaded weights archive {zipPath} is corrupted ({corruptedFile}).")
+
+    def extractWeightsToWeightsFolder(self, zipPath, destFolder=None):
+        destFolder = destFolder or self.destWeightFolder
         with zipfile.ZipFile(zipPath, "r") as f:
-            f.extractall(self.destWeightFolder)
+            f.extractall(destFolder)
+        self.writeWeightsManifest(destFolder)
+
+    def writeDownloadInfoURL(self, download_url, sha256=None):
+        self._writeDownloadInfo(self.getActiveWeightsFolder(), download_url, sha256)
+
+    @staticmethod
+    def _writeDownloadInfo(folder, download_url, sha256=None):
+        Path(folder).joinpath("download_info.json").write_text(
+            json.dumps({"download_url": download_url, "sha256": sha256})
+        )
+
+    def getCalibrationFolder(self):
+        """
+        Folder of the volume the INT8 quantization is calibrated on.
+        """
+        return self.destWeightFolder / "calibration"
+
+    @staticmethod
+    def getReferenceSegmentationPath() -> Path:
+        """
+        Reference segmentation of the calibration volume, used to evaluate the INT8 networks accuracy.
+        """
+        return Path(__file__).parents[1].joinpath("Testing", "Data", "PostDentalSurgery_Segmentation.nii.gz")
+
+    def areQuantizedWeightsAvailable(self, folds) -> bool:
+        """
+        :returns: True if the INT8 networks of the folds were generated from the current checkpoints of the active
+            weights version.
+        """
+        modelFolder = trainedModelFolder(self.getActiveWeightsFolder())
+        return modelFolder is not None and all(readOnnxMetadata(modelFolder, fold, "int8") for fold in folds)
+
+    def getCalibrationVolumePath(self) -> Path:
+        """
+        Export the PostDentalSurgery sample volume, whose reference segmentation is bundled with the module tests, to
+        the calibration folder if needed.
+
+        :returns: Path of the calibration volume in the nnU-Net input naming.
+        """
+        volumePath = self.getCalibrationFolder() / "PostDentalSurgery_0000.nii.gz"
+        if volumePath.exists():
+            return volumePath
+
+        import SampleData
+        loadedNodes = [node for node in SampleData.SampleDataLogic().downloadDentalSurgery() or [] if node is not None]
+        try:
+            volumeNode = next((node for node in loadedNodes if node.GetName() == "PostDentalSurgery"), None)
+            if volumeNode is None:
+                raise RuntimeError("Failed to download the quantization calibration volume.")
+
+            self.getCalibrationFolder().mkdir(parents=True, exist_ok=True)
+            tmpPath = volumePath.with_name(".PostDentalSurgery_0000.nii.gz")
+            if not slicer.util.exportNode(volumeNode, tmpPath.as_posix()):
+                raise RuntimeError("Failed to write the quantization calibration volume.")
+            os.replace(tmpPath, volumePath)
+        finally:
+            for node in loadedNodes:
+                slicer.mrmlScene.RemoveNode(node)
+        return volumePath
+
+    def generateQuantizedWeights(self, folds, progressCallback) -> bool:
+        """
+        Generate the INT8 networks of the folds with static post-training quantization in a PythonSlicer process.
+        The quantization is calibrated on the PostDentalSurgery sample volume and its accuracy is evaluated against the
+        reference segmentation of the volume.
+
+        :returns: True if the INT8 networks are available, False otherwise.
+        """
+        if not installOnnxRuntime(progressCallback, isQuantizationNeeded=True):
+            return False
+
+        try:
+            progressCallback("Preparing the INT8 quantization calibration volume...")
+            args = [
+                pythonSlicerExecutable(),
+                OnnxSegmentationLogic.workerPath.as_posix(),
+                "--quantize",
+                "-m", self.getActiveWeightsFolder().as_posix(),
+                "-f", *folds,
+                "--calibration_volume", self.getCalibrationVolumePath().as_posix(),
+            ]
+            if self.getReferenceSegmentationPath().exists():
+                args += ["--reference", self.getReferenceSegmentationPath().as_posix()]
+
+            process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            outputLines = []
+            for line in process.stdout:
+                if line.strip():
+                    outputLines.append(line.rstrip())
+                    progressCallback(line.rstrip())
+                slicer.app.processEvents()
+            if process.wait() != 0:
+                raise RuntimeError("\n".join(outputLines[-20:]))
+        except Exception:  # noqa
+            import traceback
+            self.errorDisplay("Failed to generate the INT8 model weights.", detailedText=traceback.format_exc())
+            return False
+        return self.areQuantizedWeightsAvailable(folds)
+
+    def readQuantizationReport(self, folds) -> Optional[str]:
+        """
+        :returns: Description of the INT8 networks of the folds and of their accuracy difference from the float32
+            networks or None if the networks were not generated.
+        """
+        modelFolder = trainedModelFolder(self.getActiveWeightsFolder())
+        metadata = readOnnxMetadata(modelFolder, folds[0], "int8") if modelFolder is not None else None
+        if metadata is None:
+            return None
+
+        report = (
+            f"INT8 networks calibrated on {metadata['nCalibrationTiles']} tiles of {metadata['calibrationVolume']} "
+            f"({metadata['int8Size_MB']} MB instead of {metadata['float32Size_MB']} MB)."
+        )
+        evaluation = metadata.get("evaluation")
+        if evaluation is None:
+            return report
 
-    def writeDownloadInfoURL(self, download_url):
-        self.getWeightDownloadInfoPath().write_text(json.dumps({"download_url": download_url}))
+        float32Dice, int8Dice = evaluation["float32"]["meanDice"], evaluation["int8"]["meanDice"]
+        return (
+            f"{report} Mean Dice against the reference segmentation (folds {', '.join(evaluation['folds'])}, no test "
+            f"time augmentation) : float32 {float32Dice:.4f}, INT8 {int8Dice:.4f} ({int8Dice - float32Dice:+.4f})."
+        )
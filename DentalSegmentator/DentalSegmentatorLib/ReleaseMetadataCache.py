@@ -0,0 +1,151 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+import qt
+
+
+class ReleaseMetadataCache:
+    """
+    Persisted cache of the latest weights release metadata and of the internet connection probe failures.
+
+    Cached release metadata is returned without any network access while younger than the configured time to live.
+    Expired metadata is revalidated using its ETag, which doesn't count in the GitHub API rate limit if the releases
+    didn't change. Failed connection probes are cached with an exponential backoff to avoid waiting for the probe
+    timeout on every call when offline.
+    """
+
+    settingsGroup = "DentalSegmentator/ReleaseMetadata"
+    defaultTTL_h = 24
+    initialBackoff_s = 60
+    maxBackoff_s = 3600
+
+    def __init__(
+            self,
+            cachePath,
+            repoPath: str,
+            hasInternetConnectionF: Callable[[], bool],
+            apiUrl: str = "https://api.github.com",
+            ttl_s: Optional[float] = None,
+            timeOut_sec: float = 5
+    ):
+        """
+        :param cachePath: Path to the JSON cache file.
+        :param repoPath: GitHub repository publishing the weights releases.
+        :param hasInternetConnectionF: Function returning True when internet connection is available.
+        :param apiUrl: GitHub API URL.
+        :param ttl_s: Optional metadata time to live. Defaults to the TTL configured in the application settings.
+        :param timeOut_sec: Timeout of the release metadata requests.
+        """
+        self.cachePath = Path(cachePath)
+        self.repoPath = repoPath
+        self.hasInternetConnectionF = hasInternetConnectionF
+        self.apiUrl = apiUrl.rstrip("/")
+        self._ttl_s = ttl_s
+        self.timeOut_sec = timeOut_sec
+
+    @classmethod
+    def defaultTTL_s(cls) -> float:
+        return float(qt.QSettings().value(f"{cls.settingsGroup}/TTLHours", cls.defaultTTL_h)) * 3600
+
+    @classmethod
+    def setDefaultTTL_h(cls, ttl_h):
+        qt.QSettings().setValue(f"{cls.settingsGroup}/TTLHours", float(ttl_h))
+
+    @property
+    def ttl_s(self) -> float:
+        return self._ttl_s if self._ttl_s is not None else self.defaultTTL_s()
+
+    def _read(self) -> dict:
+        try:
+            content = json.loads(self.cachePath.read_text())
+            return content if isinstance(content, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, content):
+        self.cachePath.parent.mkdir(parents=True, exist_ok=True)
+        tmpPath = self.cachePath.with_suffix(".tmp")
+        tmpPath.write_text(json.dumps(content, indent=2))
+        os.replace(tmpPath, self.cachePath)
+
+    def _update(self, **values):
+        content = self._read()
+        content.update(values)
+        self._write(content)
+
+    def cachedRelease(self) -> Optional[dict]:
+        """
+        :returns: Last fetched release metadata, whatever its age, or None if never fetched.
+        """
+        return self._read().get("release")
+
+    def isFresh(self) -> bool:
+        content = self._read()
+        return content.get("release") is not None and time.time() - content.get("fetched_at", 0) < self.ttl_s
+
+    def invalidate(self):
+        self._update(fetched_at=0)
+
+    def latestRelease(self, forceRevalidate=False) -> dict:
+        """
+        :param forceRevalidate: If True, revalidates the cached metadata even if it didn't expire.
+        :returns: dict containing the download_url and sha256 of the latest release weights asset.
+        :raises RuntimeError: if the metadata needs to be fetched and the request failed.
+        """
+        if not forceRevalidate and self.isFresh():
+            return self.cachedRelease()
+
+        content = self._read()
+        cachedRelease = content.get("release")
+        headers = {"Accept": "application/vnd.github+json"}
+        if cachedRelease is not None and content.get("etag"):
+            headers["If-None-Match"] = content["etag"]
+
+        import requests
+        try:
+            response = requests.get(
+                f"{self.apiUrl}/repos/{self.repoPath}/releases", headers=headers, timeout=self.timeOut_sec
+            )
+            if response.status_code == 304:
+                self._update(fetched_at=time.time())
+                return cachedRelease
+
+            response.raise_for_status()
+            release = self._latestReleaseAsset(response.json())
+        except (requests.RequestException, ValueError) as e:
+            raise RuntimeError(f"Failed to fetch the {self.repoPath} releases.") from e
+
+        self._update(release=release, etag=response.headers.get("ETag"), fetched_at=time.time())
+        return release
+
+    def _latestReleaseAsset(self, releases) -> dict:
+        for release in releases:
+            for asset in release.get("assets", []):
+                digest = asset.get("digest") or ""
+                return {
+                    "download_url": asset["browser_download_url"],
+                    "sha256": digest.split(":", 1)[1] if digest.startswith("sha256:") else None
+                }
+        raise ValueError(f"No release asset found for {self.repoPath}.")
+
+    def hasInternetConnection(self) -> bool:
+        """
+        Probe the internet connection unless a previous probe failed less than the current backoff delay ago.
+        The backoff delay is doubled after each failed probe and reset after a successful probe.
+        """
+        content = self._read()
+        connectivity = content.get("connectivity", {})
+        if time.time() - connectivity.get("failed_at", 0) < connectivity.get("backoff_s", 0):
+            return False
+
+        if self.hasInternetConnectionF():
+            if connectivity:
+                self._update(connectivity={})
+            return True
+
+        backoff_s = min(2 * connectivity.get("backoff_s", self.initialBackoff_s / 2), self.maxBackoff_s)
+        self._update(connectivity={"failed_at": time.time(), "backoff_s": backoff_s})
+        return False
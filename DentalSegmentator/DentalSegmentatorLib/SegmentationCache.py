@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Optional
+
+import qt
+import slicer
+
+
+class SegmentationResultCache:
+    """
+    Persistent on-disk cache of the raw inference results.
+
+    Results are addressed by a key combining the hash of the input voxels and geometry, the model weights, the
+    inference device and the inference parameters. Cached files are evicted in least recently used order when the
+    cache size exceeds the configured size limit.
+    """
+
+    settingsGroup = "DentalSegmentator/ResultCache"
+    defaultMaxSize_MB = 2048
+    fileSuffix = ".nii.gz"
+
+    def __init__(self, cacheFolder=None):
+        """
+        :param cacheFolder: Optional path to the cache folder. Defaults to the DentalSegmentator folder in the Slicer
+            cache.
+        """
+        self.cacheFolder = Path(cacheFolder or self.defaultCacheFolder())
+
+    @staticmethod
+    def defaultCacheFolder() -> Path:
+        return Path(slicer.app.cachePath).joinpath("DentalSegmentator", "Results")
+
+    @classmethod
+    def _settingsValue(cls, name, defaultValue, valueType):
+        value = qt.QSettings().value(f"{cls.settingsGroup}/{name}", defaultValue)
+        if valueType is bool and isinstance(value, str):
+            return value.lower() == "true"
+        return valueType(value)
+
+    @classmethod
+    def _setSettingsValue(cls, name, value):
+        qt.QSettings().setValue(f"{cls.settingsGroup}/{name}", value)
+
+    @property
+    def isEnabled(self) -> bool:
+        return self._settingsValue("Enabled", True, bool)
+
+    @isEnabled.setter
+    def isEnabled(self, isEnabled):
+        self._setSettingsValue("Enabled", bool(isEnabled))
+
+    @property
+    def maxSize_MB(self) -> float:
+        return self._settingsValue("MaxSizeMB", self.defaultMaxSize_MB, float)
+
+    @maxSize_MB.setter
+    def maxSize_MB(self, maxSize_MB):
+        self._setSettingsValue("MaxSizeMB", float(maxSize_MB))
+        self.evict()
+
+    @staticmethod
+    def computeKey(volumeNode, weightsUrl, device, parameters: dict) -> str:
+        """
+        Compute the content address of the inference result of the input volume.
+
+        :param volumeNode: Input vtkMRMLScalarVolumeNode.
+        :param weightsUrl: Download URL of the model weights.
+        :param device: Device used for the inference.
+        :param parameters: Dictionary of the inference parameters impacting the result.
+        """
+        import numpy as np
+
+        voxels = np.ascontiguousarray(slicer.util.arrayFromVolume(volumeNode))
+        ijkToRas = [volumeNode.GetIJKToRASMatrix().GetElement(i, j) for i in range(4) for j in range(4)]
+        metadata = {
+            "dtype": str(voxels.dtype),
+            "shape": voxels.shape,
+            "ijkToRas": [round(v, 6) for v in ijkToRas],
+            "weightsUrl": weightsUrl,
+            "device": device,
+            "parameters": parameters,
+        }
+
+        keyHash = hashlib.blake2b(digest_size=32)
+        keyHash.update(json.dumps(metadata, sort_keys=True, default=str).encode())
+        keyHash.update(memoryview(voxels).cast("B"))
+        return keyHash.hexdigest()
+
+    def cachedPath(self, key) -> Path:
+        return self.cacheFolder.joinpath(key + self.fileSuffix)
+
+    def get(self, key) -> Optional[Path]:
+        """
+        :returns: Path to the cached result file if present, None otherwise. Marks the entry as recently used.
+        """
+        path = self.cachedPath(key)
+        if not path.exists():
+            return None
+
+        os.utime(path)
+        return path
+
+    def load(self, key):
+        """
+        :returns: Segmentation node loaded from the cache or None if the key is not in the cache.
+        """
+        path = self.get(key)
+        if path is None:
+            return None
+        return slicer.util.loadSegmentation(path.as_posix())
+
+    def store(self, key, resultPath):
+        """
+        Copy the input inference result file to the cache and evict the least recently used entries if the cache is
+        larger than its size limit.
+        """
+        resultPath = Path(resultPath)
+        if not resultPath.name.endswith(self.fileSuffix):
+            return
+
+        self.cacheFolder.mkdir(parents=True, exist_ok=True)
+        tmpPath = self.cacheFolder.joinpath(f".{key}.tmp")
+        shutil.copyfile(resultPath, tmpPath)
+        os.replace(tmpPath, self.cachedPath(key))
+        self.evict()
+
+    def entries(self):
+        """
+        :returns: List of cached files sorted from least to most recently used.
+        """
+        if not self.cacheFolder.exists():
+            return []
+        return sorted(self.cacheFolder.glob("*" + self.fileSuffix), key=lambda p: p.stat().st_mtime)
+
+    def size_MB(self) -> float:
+        return sum(p.stat().st_size for p in self.entries()) / 1024 ** 2
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache size is below its size limit.
+        """
+        maxSize = self.maxSize_MB * 1024 ** 2
+        entries = self.entries()
+        totalSize = sum(p.stat().st_size for p in entries)
+        for path in entries:
+            if totalSize <= maxSize:
+                break
+            totalSize -= path.stat().st_size
+            path.unlink()
+
+    def clear(self):
+        if self.cacheFolder.exists():
+            shutil.rmtree(self.cacheFolder)
@@ -0,0 +1,609 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from enum import Flag, auto
+from pathlib import Path
+from typing import Optional
+
+import qt
+import slicer
+import vtk
+
+from .PythonDependencyChecker import hasInternetConnection
+from .Signal import Signal
+from .Tracing import traceSpan
+
+
+class ExportFormat(Flag):
+    OBJ = auto()
+    STL = auto()
+    NIFTI = auto()
+    GLTF = auto()
+
+
+def segmentLabelmapHashes(segmentationNode) -> dict:
+    """
+    Compute the hash of the binary labelmap content and geometry of each segment.
+
+    :returns: dict of segment ID to hash. Hashes are None if the segment is not stored as a binary labelmap.
+    """
+    import numpy as np
+    from vtk.util.numpy_support import vtk_to_numpy
+
+    segmentation = segmentationNode.GetSegmentation()
+    isLabelmapSource = (
+            segmentation.GetSourceRepresentationName() ==
+            slicer.vtkSegmentationConverter.GetBinaryLabelmapRepresentationName()
+    )
+
+    layerArrays = {}
+    hashes = {}
+    for i in range(segmentation.GetNumberOfSegments()):
+        segmentId = segmentation.GetNthSegmentID(i)
+        segment = segmentation.GetSegment(segmentId)
+        layer = segmentation.GetLayerIndex(segmentId)
+        labelmap = segmentation.GetLayerDataObject(layer) if isLabelmapSource else None
+        if labelmap is None:
+            hashes[segmentId] = None
+            continue
+
+        if layer not in layerArrays:
+            scalars = labelmap.GetPointData().GetScalars()
+            dims = labelmap.GetDimensions()
+            layerArrays[layer] = vtk_to_numpy(scalars).reshape(dims[::-1]) if scalars is not None else None
+
+        imageToWorld = vtk.vtkMatrix4x4()
+        labelmap.GetImageToWorldMatrix(imageToWorld)
+        geometry = {
+            "extent": list(labelmap.GetExtent()),
+            "imageToWorld": [round(imageToWorld.GetElement(r, c), 6) for r in range(4) for c in range(4)],
+        }
+
+        segmentHash = hashlib.blake2b(digest_size=16)
+        segmentHash.update(json.dumps(geometry, sort_keys=True).encode())
+        if layerArrays[layer] is not None:
+            segmentHash.update(np.packbits(layerArrays[layer] == segment.GetLabelValue()).tobytes())
+        hashes[segmentId] = segmentHash.hexdigest()
+    return hashes
+
+
+def segmentContentHashes(segmentationNode, labelmapHashes: Optional[dict] = None) -> dict:
+    """
+    Compute the hash of the binary labelmap content of each segment, including its name, color and geometry.
+
+    :param labelmapHashes: Optional segment labelmap hashes of the node, computed if not provided.
+    :returns: dict of segment ID to hash. Hashes are None if the segment is not stored as a binary labelmap.
+    """
+    segmentation = segmentationNode.GetSegmentation()
+    if labelmapHashes is None:
+        labelmapHashes = segmentLabelmapHashes(segmentationNode)
+
+    hashes = {}
+    for segmentId, labelmapHash in labelmapHashes.items():
+        segment = segmentation.GetSegment(segmentId)
+        if labelmapHash is None or segment is None:
+            hashes[segmentId] = None
+            continue
+
+        metadata = {
+            "name": segment.GetName(),
+            "color": [round(c, 4) for c in segment.GetColor()],
+            "labelmap": labelmapHash,
+        }
+        hashes[segmentId] = hashlib.blake2b(json.dumps(metadata, sort_keys=True).encode(), digest_size=16).hexdigest()
+    return hashes
+
+
+def combineHashes(hashes: dict, **parameters):
+    """
+    :returns: Hash combining the input hashes and parameters or None if any of the input hashes is None.
+    """
+    if any(h is None for h in hashes.values()):
+        return None
+
+    combinedHash = hashlib.blake2b(digest_size=16)
+    combinedHash.update(json.dumps({"hashes": hashes, "parameters": parameters}, sort_keys=True).encode())
+    return combinedHash.hexdigest()
+
+
+class ExportManifest:
+    """
+    Records the content hash of the exported segments for each format in the export folder.
+    The manifest is used to only export the segments which changed since the last export to the same folder.
+    Removing the manifest file forces a full export.
+    """
+
+    fileName = ".dental_segmentator_export.json"
+
+    def __init__(self, folderPath):
+        self.path = Path(folderPath).joinpath(self.fileName)
+        self._entries = self._read()
+
+    def _read(self) -> dict:
+        try:
+            entries = json.loads(self.path.read_text())
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def isUpToDate(self, formatName, key, contentHash, filePath=None) -> bool:
+        if contentHash is None or (filePath is not None and not Path(filePath).exists()):
+            return False
+        return self._entries.get(formatName, {}).get(key) == contentHash
+
+    def update(self, formatName, key, contentHash):
+        if contentHash is None:
+            return
+        self._entries.setdefault(formatName, {})[key] = contentHash
+
+    def retain(self, formatName, keys):
+        """
+        Remove the entries of the format whose key is not in the input keys.
+        """
+        entries = self._entries.get(formatName, {})
+        self._entries[formatName] = {key: value for key, value in entries.items() if key in keys}
+
+    def save(self):
+        tmpPath = self.path.with_suffix(".tmp")
+        tmpPath.write_text(json.dumps(self._entries, indent=2, sort_keys=True))
+        os.replace(tmpPath, self.path)
+
+
+class SegmentationExportJob:
+    """
+    Exports a segmentation node to the selected formats, writing the files outside the GUI thread.
+
+    The data to write is extracted from the MRML scene on the main thread when the job is started. The file writes of
+    each format, and of each segment for STL, are then run concurrently in a worker thread pool.
+
+    Two steps modify the MRML scene and still block the GUI thread : the closed surface generation of the segments
+    missing from the surface cache, when the job is started, and the glTF export, run while the workers are writing the
+    other formats. The progressInfo signal is emitted before each of these steps, and with an empty message once they
+    are done.
+
+    Progress is reported using the progress signal (number of finished tasks, number of tasks) and the finished signal
+    is emitted on the main thread once all the tasks are done or cancelled.
+
+    In incremental mode, the content hash of each exported segment and format is stored in an ExportManifest in the
+    export folder. Segments and formats whose content didn't change since the last export are skipped and listed in
+    the skipped attribute.
+
+    If a ClosedSurfaceCache is provided, the closed surfaces of the mesh exports are taken from the cache shared with
+    the 3D display instead of being generated again.
+    """
+
+    def __init__(
+            self,
+            segmentationNode,
+            folderPath,
+            selectedFormats,
+            reductionFactor=0.9,
+            maxWorkers=None,
+            errorDisplayF=None,
+            incremental=True,
+            tracer=None,
+            surfaceCache=None
+    ):
+        """
+        :param segmentationNode: vtkMRMLSegmentationNode to export
+        :param folderPath: Destination folder of the exported files
+        :param selectedFormats: ExportFormat flags combination
+        :param reductionFactor: glTF decimation factor. Higher value means stronger reduction.
+        :param maxWorkers: Optional maximum number of worker threads. Defaults to the number of CPUs.
+        :param errorDisplayF: Optional function used to display glTF export error information.
+        :param incremental: If True, only the segments which changed since the last export to the folder are exported.
+        :param tracer: Optional tracer recording the export time of each format and segment.
+        :param surfaceCache: Optional ClosedSurfaceCache providing the closed surfaces of the STL, OBJ and glTF exports.
+        """
+        self.segmentationNode = segmentationNode
+        self.folderPath = Path(folderPath)
+        self.selectedFormats = selectedFormats
+        self.reductionFactor = reductionFactor
+        self.maxWorkers = maxWorkers or os.cpu_count() or 1
+        self.errorDisplay = errorDisplayF
+        self.incremental = incremental
+        self.tracer = tracer
+        self.surfaceCache = surfaceCache
+        self._exportSpan = None
+
+        self.progress = Signal("int", "int")
+        self.progressInfo = Signal("str")
+        self.finished = Signal()
+        self.errors = []
+        self.skipped = []
+
+        self._manifest = None
+        self._hashes = {}
+        self._manifestEntries = {}
+        self._gltfManifestEntry = None
+
+        self._cancelEvent = threading.Event()
+        self._executor = None
+        self._futures = []
+        self._nMainThreadTasks = 0
+        self._nFinishedMainThreadTasks = 0
+        self._isFinished = False
+        self._pollTimer = qt.QTimer()
+        self._pollTimer.setInterval(50)
+        self._pollTimer.timeout.connect(self._poll)
+
+    @property
+    def nTasks(self):
+        return len(self._futures) + self._nMainThreadTasks
+
+    @property
+    def nFinishedTasks(self):
+        return sum(future.done() for future in self._futures) + self._nFinishedMainThreadTasks
+
+    def isFinished(self):
+        return self._isFinished
+
+    def isCancelled(self):
+        return self._cancelEvent.is_set()
+
+    def start(self):
+        """
+        Extract the data to export from the scene and start the export tasks.
+        """
+        if self.tracer is not None:
+            self._exportSpan = self.tracer.begin("Export", "export", folder=self.folderPath.as_posix())
+
+        self.folderPath.mkdir(parents=True, exist_ok=True)
+        with traceSpan(self.tracer, "Export preparation", "export"):
+            if self.incremental:
+                self._manifest = ExportManifest(self.folderPath)
+                self._hashes = segmentContentHashes(self.segmentationNode, self._labelmapHashes())
+
+            self._nMainThreadTasks = 1 if self._isGLTFExportNeeded() else 0
+            workerTasks = self._createWorkerTasks()
+
+        self._executor = ThreadPoolExecutor(max_workers=max(1, min(self.maxWorkers, len(workerTasks))))
+        self._futures = []
+        for task, manifestEntry in workerTasks:
+            future = self._executor.submit(self._runTask, task, self._taskSpanName(manifestEntry))
+            self._futures.append(future)
+            self._manifestEntries[future] = manifestEntry
+        self._pollTimer.start()
+
+        if self._nMainThreadTasks:
+            qt.QTimer.singleShot(0, self._exportGLTF)
+
+    def cancel(self):
+        """
+        Cancel the pending export tasks. Tasks already running are finished.
+        """
+        self._cancelEvent.set()
+        for future in self._futures:
+            future.cancel()
+
+    def wait(self):
+        """
+        Block until the export is finished while processing the application events.
+        """
+        while not self._isFinished:
+            slicer.app.processEvents(qt.QEventLoop.AllEvents, 50)
+
+    def _taskSpanName(self, manifestEntry):
+        formatName, key, _ = manifestEntry
+        segment = self.segmentationNode.GetSegmentation().GetSegment(key)
+        return f"Export {formatName} {segment.GetName()}" if segment is not None else f"Export {formatName}"
+
+    def _runTask(self, task, spanName):
+        if self._cancelEvent.is_set():
+            return
+
+        with traceSpan(self.tracer, spanName, "export"):
+            task()
+
+    def _poll(self):
+        self.progress(self.nFinishedTasks, self.nTasks)
+        if self._isFinished or self.nFinishedTasks < self.nTasks:
+            return
+
+        self._pollTimer.stop()
+        self._executor.shutdown(wait=False)
+        for future in self._futures:
+            if future.cancelled():
+                continue
+            if future.exception() is not None:
+                self.errors.append(future.exception())
+            elif self._manifest is not None and not self.isCancelled():
+                self._manifest.update(*self._manifestEntries[future])
+
+        self._saveManifest()
+        if self.tracer is not None:
+            self.tracer.end(self._exportSpan)
+        self._isFinished = True
+        self.finished()
+
+    def _saveManifest(self):
+        if self._manifest is None:
+            return
+
+        try:
+            self._manifest.save()
+        except OSError as e:
+            self.errors.append(e)
+
+    def _exportGLTF(self):
+        try:
+            if not self._cancelEvent.is_set():
+                self.progressInfo("Exporting glTF (the application is busy)...")
+                with traceSpan(self.tracer, "Export GLTF", "export"):
+                    exportToGLTF(self.segmentationNode, self.folderPath.as_posix(), self.reductionFactor,
+                                 errorDisplayF=self.errorDisplay)
+                if self._manifest is not None:
+                    self._manifest.update(*self._gltfManifestEntry)
+        except Exception as e:  # noqa
+            self.errors.append(e)
+        finally:
+            self._nFinishedMainThreadTasks += 1
+            self.progressInfo("")
+
+    def _smoothingFactor(self):
+        return self.segmentationNode.GetSegmentation().GetConversionParameter("Smoothing factor")
+
+    def _isUpToDate(self, exportFormat, key, contentHash, description, filePath=None) -> bool:
+        """
+        :returns: True if the format / key content didn't change since the last export. Adds description to the
+            skipped list if the export is skipped.
+        """
+        if self._manifest is None or not self._manifest.isUpToDate(exportFormat.name, key, contentHash, filePath):
+            return False
+
+        self.skipped.append(description)
+        return True
+
+    def _isGLTFExportNeeded(self):
+        if not self.selectedFormats & ExportFormat.GLTF:
+            return False
+
+        gltfHash = combineHashes(
+            self._hashes, smoothing=self._smoothingFactor(), reductionFactor=round(self.reductionFactor, 4)
+        )
+        self._gltfManifestEntry = (ExportFormat.GLTF.name, "all", gltfHash)
+        return not self._isUpToDate(ExportFormat.GLTF, "all", gltfHash, "glTF", self._exportFilePath("gltf"))
+
+    def _createWorkerTasks(self):
+        """
+        Extract the data to export from the MRML scene and return the list of the tasks writing the files with their
+        manifest entry. The tasks only access data detached from the scene and can run in any thread.
+        """
+        segmentation = self.segmentationNode.GetSegmentation()
+        segmentIds = [segmentation.GetNthSegmentID(i) for i in range(segmentation.GetNumberOfSegments())]
+        smoothing = self._smoothingFactor()
+
+        stlEntries = []
+        if self.selectedFormats & ExportFormat.STL:
+            if self._manifest is not None:
+                self._manifest.retain(ExportFormat.STL.name, segmentIds)
+            for segmentId in segmentIds:
+                stlHash = combineHashes({segmentId: self._hashes.get(segmentId)}, smoothing=smoothing)
+                segmentName = segmentation.GetSegment(segmentId).GetName()
+                stlPath = self._exportFilePath("stl", segmentName)
+                if not self._isUpToDate(ExportFormat.STL, segmentId, stlHash, f"STL {segmentName}", stlPath):
+                    stlEntries.append((ExportFormat.STL.name, segmentId, stlHash))
+
+        objEntry = None
+        if self.selectedFormats & ExportFormat.OBJ:
+            objHash = combineHashes(self._hashes, smoothing=smoothing)
+            if not self._isUpToDate(ExportFormat.OBJ, "all", objHash, "OBJ", self._exportFilePath("obj")):
+                objEntry = (ExportFormat.OBJ.name, "all", objHash)
+
+        if stlEntries or objEntry or self._nMainThreadTasks:
+            self._createClosedSurfaceRepresentation()
+
+        # Each task owns its detached copy as the VTK / MRML objects are not safe to share between the worker threads
+        tasks = []
+        for entry in stlEntries:
+            detachedNode = self._createDetachedSegmentationCopy([entry[1]])
+            tasks.append((self._closedSurfaceExportTask(detachedNode, "STL", entry[1]), entry))
+        if objEntry:
+            detachedNode = self._createDetachedSegmentationCopy(segmentIds)
+            tasks.append((self._closedSurfaceExportTask(detachedNode, "OBJ"), objEntry))
+
+        if self.selectedFormats & ExportFormat.NIFTI:
+            niftiHash = combineHashes(self._hashes)
+            niftiPath = self._exportFilePath("nii.gz")
+            if not self._isUpToDate(ExportFormat.NIFTI, "all", niftiHash, "NIFTI", niftiPath):
+                niftiEntry = (ExportFormat.NIFTI.name, "all", niftiHash)
+                tasks.append((self._labelmapExportTask(self._createDetachedLabelmap(), niftiPath), niftiEntry))
+
+        return tasks
+
+    def _labelmapHashes(self):
+        """
+        :returns: Segment labelmap hashes, shared with the surface cache if available to avoid hashing the labelmaps
+            again.
+        """
+        if self.surfaceCache is not None:
+            return self.surfaceCache.labelmapHashes(self.segmentationNode)
+        return segmentLabelmapHashes(self.segmentationNode)
+
+    def _createClosedSurfaceRepresentation(self):
+        """
+        Create the closed surfaces of the segmentation node once for all the mesh exports, using the surface cache if
+        available.
+        """
+        self.progressInfo("Generating the 3D surfaces (the application is busy)...")
+        try:
+            with traceSpan(self.tracer, "Export closed surfaces", "export"):
+                if self.surfaceCache is None:
+                    self.segmentationNode.CreateClosedSurfaceRepresentation()
+                else:
+                    self.surfaceCache.applyTo(self.segmentationNode)
+        finally:
+            self.progressInfo("")
+
+    def _createDetachedSegmentationCopy(self, segmentIds):
+        """
+        Deep copy the closed surfaces of the input segments to a segmentation outside the MRML scene. The binary
+        labelmaps are not copied. Parent transforms are hardened in the copy.
+        """
+        closedSurfaceName = slicer.vtkSegmentationConverter.GetSegmentationClosedSurfaceRepresentationName()
+        detachedNode = slicer.vtkMRMLSegmentationNode()
+        detachedNode.SetName(self.segmentationNode.GetName())
+        detachedSegmentation = detachedNode.GetSegmentation()
+        detachedSegmentation.SetSourceRepresentationName(closedSurfaceName)
+
+        for segmentId in segmentIds:
+            sourceSegment = self.segmentationNode.GetSegmentation().GetSegment(segmentId)
+            segment = slicer.vtkSegment()
+            segment.DeepCopyMetadata(sourceSegment)
+            surface = sourceSegment.GetRepresentation(closedSurfaceName)
+            if surface is not None:
+                polyData = vtk.vtkPolyData()
+                polyData.DeepCopy(surface)
+                segment.AddRepresentation(closedSurfaceName, polyData)
+            detachedSegmentation.AddSegment(segment, segmentId)
+
+        parentTransform = self.segmentationNode.GetParentTransformNode()
+        if parentTransform is not None:
+            transformToWorld = vtk.vtkGeneralTransform()
+            slicer.vtkMRMLTransformNode.GetTransformBetweenNodes(parentTransform, None, transformToWorld)
+            detachedNode.ApplyTransform(transformToWorld)
+        return detachedNode
+
+    def _createDetachedLabelmap(self):
+        """
+        Export the segments to a labelmap volume node copied outside the scene. The labelmap node and its associated
+        display and color nodes are removed from the scene once exported.
+        """
+        sceneNodeIds = self._sceneNodeIds()
+        labelmapNode = slicer.mrmlScene.AddNewNodeByClass("vtkMRMLLabelMapVolumeNode")
+        try:
+            slicer.modules.segmentations.logic().ExportAllSegmentsToLabelmapNode(
+                self.segmentationNode, labelmapNode, slicer.vtkSegmentation.EXTENT_REFERENCE_GEOMETRY
+            )
+            detachedNode = slicer.vtkMRMLLabelMapVolumeNode()
+            detachedNode.SetName(self.segmentationNode.GetName())
+            imageData = vtk.vtkImageData()
+            imageData.DeepCopy(labelmapNode.GetImageData())
+            detachedNode.SetAndObserveImageData(imageData)
+            ijkToRas = vtk.vtkMatrix4x4()
+            labelmapNode.GetIJKToRASMatrix(ijkToRas)
+            detachedNode.SetIJKToRASMatrix(ijkToRas)
+            return detachedNode
+        finally:
+            for nodeId in self._sceneNodeIds() - sceneNodeIds:
+                slicer.mrmlScene.RemoveNode(slicer.mrmlScene.GetNodeByID(nodeId))
+
+    @staticmethod
+    def _sceneNodeIds():
+        nodes = slicer.mrmlScene.GetNodes()
+        return {nodes.GetItemAsObject(i).GetID() for i in range(nodes.GetNumberOfItems())}
+
+    def _closedSurfaceExportTask(self, detachedNode, fileFormat, segmentId=None):
+        folderPath = self.folderPath.as_posix()
+
+        def task():
+            segmentIds = None
+            if segmentId is not None:
+                segmentIds = vtk.vtkStringArray()
+                segmentIds.InsertNextValue(segmentId)
+
+            if not slicer.vtkSlicerSegmentationsModuleLogic.ExportSegmentsClosedSurfaceRepresentationToFiles(
+                    folderPath, detachedNode, segmentIds, fileFormat, True, 1.0, False
+            ):
+                raise RuntimeError(f"Failed to export {fileFormat} to {folderPath}.")
+
+        return task
+
+    def _exportFilePath(self, extension, segmentName=None):
+        """
+        :returns: Path of the file written for the segmentation node, or for one of its segments if segmentName is
+            provided, following the file naming of the Slicer segmentation export.
+        """
+        fileName = self.segmentationNode.GetName()
+        if segmentName is not None:
+            fileName = f"{fileName}_{segmentName}"
+        fileName = slicer.qSlicerCoreIOManager.forceFileNameValidCharacters(fileName)
+        return self.folderPath.joinpath(f"{fileName}.{extension}").as_posix()
+
+    def _labelmapExportTask(self, detachedLabelmapNode, filePath):
+        def task():
+            storageNode = slicer.vtkMRMLVolumeArchetypeStorageNode()
+            storageNode.SetFileName(filePath)
+            storageNode.SetUseCompression(True)
+            if not storageNode.WriteData(detachedLabelmapNode):
+                raise RuntimeError(f"Failed to export NIFTI to {filePath}.")
+
+        return task
+
+
+def exportSegmentation(
+        segmentationNode,
+        folderPath,
+        selectedFormats,
+        reductionFactor=0.9,
+        errorDisplayF=None,
+        surfaceCache=None
+):
+    """
+    Export the input segmentation node to the input folder using the selected formats and wait for the export to be
+    finished. Doesn't depend on any widget and can be used both from the module UI and in headless mode.
+
+    :param segmentationNode: vtkMRMLSegmentationNode to export
+    :param folderPath: Destination folder of the exported files
+    :param selectedFormats: ExportFormat flags combination
+    :param reductionFactor: glTF decimation factor. Higher value means stronger reduction.
+    :param errorDisplayF: Optional function used to display error information.
+    :param surfaceCache: Optional ClosedSurfaceCache providing the closed surfaces of the mesh exports.
+    :raises RuntimeError: if any of the formats failed to export.
+    """
+    job = SegmentationExportJob(
+        segmentationNode, folderPath, selectedFormats, reductionFactor, errorDisplayF=errorDisplayF,
+        surfaceCache=surfaceCache
+    )
+    job.start()
+    job.wait()
+    if job.errors:
+        raise RuntimeError("\n".join(str(error) for error in job.errors))
+
+
+def exportToGLTF(segmentationNode, folderPath, reductionFactor, tryInstall=True, errorDisplayF=None):
+    """
+    Export input segmentation node to glTF format.
+    Export relies on the SlicerOpenAnatomy extension. If extension is not available, export will try to install it
+    provided an internet connection is available.
+
+    Otherwise, export will fail and will ask users to install the extension manually to proceed.
+    """
+    errorDisplayF = errorDisplayF or slicer.util.errorDisplay
+    try:
+        from OpenAnatomyExport import OpenAnatomyExportLogic
+
+        logic = OpenAnatomyExportLogic()
+        shNode = slicer.vtkMRMLSubjectHierarchyNode.GetSubjectHierarchyNode(slicer.mrmlScene)
+        segmentationItem = shNode.GetItemByDataNode(segmentationNode)
+        logic.exportModel(segmentationItem, folderPath, reductionFactor, "glTF")
+    except ImportError:
+        if not tryInstall or not hasInternetConnection():
+            errorDisplayF(
+                f"Failed to export to glTF. Try installing the SlicerOpenAnatomy extension manually to continue."
+            )
+            return
+        installOpenAnatomyExtension()
+        exportToGLTF(segmentationNode, folderPath, reductionFactor, tryInstall=False, errorDisplayF=errorDisplayF)
+
+
+def installOpenAnatomyExtension():
+    # Install extension from extension manager
+    extensionManager = slicer.app.extensionsManagerModel()
+    extensionManager.setInteractive(False)
+    extName = "SlicerOpenAnatomy"
+    if extensionManager.isExtensionInstalled(extName):
+        return
+
+    success = extensionManager.installExtensionFromServer(extName, False, False)
+    if not success:
+        return
+
+    # If install was successful, load the open anatomy export module to be used by the exporter
+    moduleName = "OpenAnatomyExport"
+    modulePath = extensionManager.extensionModulePaths(extName)[0] + f"/{moduleName}.py"
+    factory = slicer.app.moduleManager().factoryManager()
+    factory.registerModule(qt.QFileInfo(modulePath))
+    factory.loadModules([moduleName])
@@ -0,0 +1,188 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+import slicer
+import vtk
+
+
+@dataclass
+class LabelArrayResult:
+    """
+    Segmentation result as a label array in KJI order and its IJK to RAS matrix.
+    """
+    labelArray: "np.ndarray"
+    ijkToRas: "np.ndarray"
+
+    def presentLabelValues(self) -> List[int]:
+        import numpy as np
+        counts = np.bincount(np.asarray(self.labelArray).ravel())
+        return [int(labelValue) for labelValue in np.flatnonzero(counts) if labelValue > 0]
+
+
+def isLabelArrayReadingAvailable() -> bool:
+    try:
+        import nibabel  # noqa
+        return True
+    except ImportError:
+        return False
+
+
+def readLabelArray(filePath) -> LabelArrayResult:
+    """
+    Read a NIfTI label file without loading it in the MRML scene.
+    Uncompressed files are memory mapped. Compressed files are decoded in memory.
+
+    :raises RuntimeError: if the file cannot be read.
+    """
+    import nibabel
+    import numpy as np
+
+    try:
+        image = nibabel.load(Path(filePath).as_posix(), mmap=True)
+        dataObj = image.dataobj
+        labelArray = dataObj.get_unscaled() if hasattr(dataObj, "get_unscaled") else np.asanyarray(dataObj)
+    except Exception as e:  # noqa
+        raise RuntimeError(f"Failed to read the segmentation results {filePath} :\n{e}") from e
+
+    # NIfTI voxels are stored in IJK order and VTK images are in KJI order
+    while labelArray.ndim > 3 and labelArray.shape[-1] == 1:
+        labelArray = labelArray[..., 0]
+    return LabelArrayResult(labelArray=labelArray.T, ijkToRas=np.asarray(image.affine))
+
+
+def writeLabelArray(filePath, result: LabelArrayResult):
+    """
+    Write the label array result to a NIfTI file.
+
+    :raises RuntimeError: if the file cannot be written.
+    """
+    import nibabel
+    import numpy as np
+
+    try:
+        image = nibabel.Nifti1Image(np.asarray(result.labelArray).T, np.asarray(result.ijkToRas))
+        nibabel.save(image, Path(filePath).as_posix())
+    except Exception as e:  # noqa
+        raise RuntimeError(f"Failed to write the segmentation results {filePath} :\n{e}") from e
+
+
+def inferenceResultPath(logic) -> Optional[Path]:
+    """
+    Adapter to the result file of the segmentation logics. The module logics provide it with resultPath.
+
+    :returns: Path of the result file written by the segmentation logic or None if the logic doesn't expose it.
+    """
+    resultPathF = getattr(logic, "resultPath", None)
+    if callable(resultPathF):
+        return resultPathF()
+
+    # The SlicerNNUNet segmentation logic doesn't provide a public accessor to its result file
+    try:
+        return Path(logic._outFile)
+    except (AttributeError, StopIteration, TypeError):
+        return None
+
+
+def inferenceProbabilitiesPath(logic) -> Optional[Path]:
+    """
+    :returns: Path of the class probabilities file written by the segmentation logic or None if the logic doesn't
+        write the probabilities.
+    """
+    probabilitiesPathF = getattr(logic, "probabilitiesPath", None)
+    return probabilitiesPathF() if callable(probabilitiesPathF) else None
+
+
+def readProbabilities(filePath) -> "np.ndarray":
+    """
+    Read the class probabilities written by nnU-Net with its save probabilities option.
+
+    :returns: Probability array of shape (class, K, J, I), in the same voxel order as the read label arrays.
+    :raises RuntimeError: if the file cannot be read.
+    """
+    import numpy as np
+
+    try:
+        with np.load(Path(filePath).as_posix()) as probabilitiesFile:
+            return probabilitiesFile["probabilities"]
+    except Exception as e:  # noqa
+        raise RuntimeError(f"Failed to read the segmentation probabilities {filePath} :\n{e}") from e
+
+
+def _vtkMatrix(array) -> vtk.vtkMatrix4x4:
+    matrix = vtk.vtkMatrix4x4()
+    for i in range(4):
+        for j in range(4):
+            matrix.SetElement(i, j, float(array[i][j]))
+    return matrix
+
+
+def _reusableSharedLabelmap(segmentation, segmentIds, labelValues):
+    """
+    :returns: Binary labelmap shared by exactly the input segments with the matching label values, None otherwise.
+    """
+    labelmapName = slicer.vtkSegmentationConverter.GetBinaryLabelmapRepresentationName()
+    if segmentation.GetSourceRepresentationName() != labelmapName:
+        return None
+
+    currentIds = [segmentation.GetNthSegmentID(i) for i in range(segmentation.GetNumberOfSegments())]
+    if sorted(currentIds) != sorted(segmentIds):
+        return None
+
+    if any(segmentation.GetSegment(s).GetLabelValue() != v for s, v in zip(segmentIds, labelValues)):
+        return None
+
+    layers = {segmentation.GetLayerIndex(segmentId) for segmentId in segmentIds}
+    return segmentation.GetLayerDataObject(layers.pop()) if len(layers) == 1 else None
+
+
+def fillSegmentationFromLabelArray(segmentationNode, result: LabelArrayResult):
+    """
+    Fill the segmentation node with the label array result. Label value N is stored in segment Segment_N.
+
+    If the node segments already share one binary labelmap with the same label values, the labelmap is updated in
+    place. Otherwise, the node segments are replaced by segments sharing a new labelmap filled from the array.
+    In both cases, the array is copied once in the labelmap without any intermediate node.
+    """
+    from vtk.util.numpy_support import vtk_to_numpy
+
+    labelArray = result.labelArray
+    labelValues = result.presentLabelValues()
+    segmentIds = [f"Segment_{labelValue}" for labelValue in labelValues]
+    segmentation = segmentationNode.GetSegmentation()
+    labelmap = _reusableSharedLabelmap(segmentation, segmentIds, labelValues)
+    isNewLabelmap = labelmap is None
+    if isNewLabelmap:
+        labelmap = slicer.vtkOrientedImageData()
+
+    dims = labelArray.shape[::-1]
+    labelmap.SetExtent(0, dims[0] - 1, 0, dims[1] - 1, 0, dims[2] - 1)
+    labelmap.SetImageToWorldMatrix(_vtkMatrix(result.ijkToRas))
+    scalarType = vtk.VTK_UNSIGNED_CHAR if max(labelValues, default=0) < 256 else vtk.VTK_SHORT
+    scalars = labelmap.GetPointData().GetScalars()
+    if (
+            scalars is None
+            or scalars.GetNumberOfTuples() != labelArray.size
+            or scalars.GetNumberOfComponents() != 1
+            or scalars.GetDataType() != scalarType
+    ):
+        labelmap.AllocateScalars(scalarType, 1)
+    vtk_to_numpy(labelmap.GetPointData().GetScalars()).reshape(labelArray.shape)[...] = labelArray
+
+    if not isNewLabelmap:
+        # Source representation modification triggers the segmentation update and derived representations invalidation
+        labelmap.Modified()
+        return
+
+    wasModifying = segmentationNode.StartModify()
+    try:
+        segmentation.RemoveAllSegments()
+        segmentation.SetSourceRepresentationName(slicer.vtkSegmentationConverter.GetBinaryLabelmapRepresentationName())
+        for segmentId, labelValue in zip(segmentIds, labelValues):
+            segment = slicer.vtkSegment()
+            segment.SetName(segmentId)
+            segment.SetLabelValue(labelValue)
+            segment.AddRepresentation(slicer.vtkSegmentationConverter.GetBinaryLabelmapRepresentationName(), labelmap)
+            segmentation.AddSegment(segment, segmentId)
+    finally:
+        segmentationNode.EndModify(wasModifying)
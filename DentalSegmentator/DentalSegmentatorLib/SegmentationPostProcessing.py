@@ -0,0 +1,271 @@
+from typing import Callable, Dict, Iterable, Optional
+
+import qt
+import slicer
+
+from .Tracing import Tracer, traceSpan
+
+
+def removeSmallIslandsFromLabelArray(
+        labelArray: "np.ndarray",
+        labelValues: Iterable[int],
+        minimumSize: int,
+        keepLargestOnly: bool = False,
+        tracer: Optional[Tracer] = None,
+        labelNames: Optional[Dict[int, str]] = None
+) -> Dict[int, int]:
+    """
+    Remove the small islands of the input label values in place.
+    The bounding boxes of all the labels are computed in one pass over the label array and the connected components
+    (face connectivity, as the Islands effect default) of each label are computed in its bounding box only.
+
+    :param labelArray: Integer label array modified in place. Removed voxels are set to 0.
+    :param labelValues: Label values to filter.
+    :param minimumSize: Islands with less voxels than minimumSize are removed.
+    :param keepLargestOnly: If True, only the largest island of each label is kept.
+    :param tracer: Optional tracer recording the processing time of each label.
+    :param labelNames: Optional label names used in the trace span names.
+    :returns: Number of removed voxels for each filtered label value.
+    """
+    import numpy as np
+    from scipy import ndimage
+
+    structure = ndimage.generate_binary_structure(labelArray.ndim, 1)
+    labelBoundingBoxes = ndimage.find_objects(labelArray)
+    labelNames = labelNames or {}
+    removedVoxels = {}
+    for labelValue in labelValues:
+        if labelValue < 1 or labelValue > len(labelBoundingBoxes) or labelBoundingBoxes[labelValue - 1] is None:
+            continue
+
+        labelName = labelNames.get(labelValue, f"label {labelValue}")
+        with traceSpan(tracer, f"Post process {labelName}", "postprocess", label=labelValue):
+            labelView = labelArray[labelBoundingBoxes[labelValue - 1]]
+            mask = labelView == labelValue
+            components, nComponents = ndimage.label(mask, structure=structure)
+            if nComponents == 0:
+                continue
+
+            componentSizes = np.bincount(components.ravel())
+            componentSizes[0] = 0
+            if keepLargestOnly:
+                isKept = np.zeros_like(componentSizes, dtype=bool)
+                isKept[np.argmax(componentSizes)] = True
+            else:
+                isKept = componentSizes >= minimumSize
+
+            isKept[0] = True
+            isRemoved = ~isKept[components]
+            removedVoxels[labelValue] = int(np.count_nonzero(isRemoved))
+            labelView[isRemoved] = 0
+
+    return removedVoxels
+
+
+class SegmentationPostProcessor:
+    """
+    Class responsible for naming the DentalSegmentator segments and removing small islands from the inference results.
+    Doesn't depend on the module widget and can be used in headless mode.
+    """
+
+    labels = ["Maxilla & Upper Skull", "Mandible", "Upper Teeth", "Lower Teeth", "Mandibular canal"]
+    colors = ["#E3DD90", "#D4A1E6", "#DC9565", "#EBDFB4", "#D8654F"]
+    opacities = [0.45, 0.45, 1.0, 1.0, 1.0]
+
+    # Mandibular canals are thin structures and are not filtered
+    islandFilteredSegmentIds = ["Segment_1", "Segment_2", "Segment_3", "Segment_4"]
+
+    def __init__(
+            self,
+            minimumIslandSize_mm3: float = 60,
+            progressCallback: Optional[Callable[[str], None]] = None,
+            segmentEditorWidget=None,
+            tracer: Optional[Tracer] = None
+    ):
+        """
+        :param minimumIslandSize_mm3: Islands smaller than this volume are removed from the filtered segments.
+        :param progressCallback: Optional function called with progress information.
+        :param segmentEditorWidget: Optional segment editor widget used to run the Islands effect. If None, a hidden
+            segment editor widget will be created on first use.
+        :param tracer: Optional tracer recording the post processing time of each segment.
+        """
+        self.useVectorizedEngine = True
+        self.minimumIslandSize_mm3 = minimumIslandSize_mm3
+        self.progressCallback = progressCallback or (lambda *_: None)
+        self._segmentEditorWidget = segmentEditorWidget
+        self._segmentEditorNode = None
+        self.tracer = tracer
+
+    @classmethod
+    def segmentIds(cls):
+        return [f"Segment_{i + 1}" for i in range(len(cls.labels))]
+
+    @staticmethod
+    def toRGB(colorString):
+        color = qt.QColor(colorString)
+        return color.redF(), color.greenF(), color.blueF()
+
+    @classmethod
+    def setSegmentNamesAndColors(cls, segmentationNode):
+        """
+        Set the DentalSegmentator segment names and colors. Sets the 3D opacities if the node has a display node.
+        """
+        segmentation = segmentationNode.GetSegmentation()
+        displayNode = segmentationNode.GetDisplayNode()
+        for segmentId, label, color, opacity in zip(cls.segmentIds(), cls.labels, cls.colors, cls.opacities):
+            segment = segmentation.GetSegment(segmentId)
+            if segment is None:
+                continue
+
+            segment.SetName(label)
+            segment.SetColor(*cls.toRGB(color))
+            if displayNode is not None:
+                displayNode.SetSegmentOpacity3D(segmentId, opacity)
+
+    def process(self, segmentationNode, volumeNode):
+        """
+        Remove small islands on all segments except mandibular canals.
+        """
+        self.progressCallback("Post processing results...")
+        with traceSpan(self.tracer, "Post processing", "postprocess"):
+            self.removeSmallIslands(segmentationNode, volumeNode, self.islandFilteredSegmentIds)
+        self.progressCallback("Post processing done.")
+
+    def minimumIslandSizeInVoxels(self, volumeNode) -> int:
+        import numpy as np
+        voxelSize_mm3 = np.cumprod(volumeNode.GetSpacing())[-1]
+        return int(np.ceil(self.minimumIslandSize_mm3 / voxelSize_mm3))
+
+    def keepLargestIsland(self, segmentationNode, volumeNode, segmentId):
+        """
+        Keeps largest voxel islands for input segmentId.
+        """
+        segment = segmentationNode.GetSegmentation().GetSegment(segmentId)
+        if not segment:
+            return
+
+        self.progressCallback(f"Keep largest region for {segment.GetName()}...")
+        if self._filterIslandsVectorized(segmentationNode, [segmentId], minimumSize=0, keepLargestOnly=True):
+            return
+
+        import SegmentEditorEffects
+        effect = self._selectIslandsEffect(segmentationNode, volumeNode, segmentId)
+        effect.setParameter("Operation", SegmentEditorEffects.KEEP_LARGEST_ISLAND)
+        effect.self().onApply()
+
+    def removeSmallIsland(self, segmentationNode, volumeNode, segmentId):
+        """
+        Removes small islands for input segmentId.
+        """
+        self.removeSmallIslands(segmentationNode, volumeNode, [segmentId])
+
+    def removeSmallIslands(self, segmentationNode, volumeNode, segmentIds):
+        """
+        Removes small islands for all the input segmentIds.
+        Uses the vectorized engine if the segments share the same labelmap and SciPy is available. Otherwise, falls
+        back to the segment editor Islands effect for each segment.
+        """
+        segmentation = segmentationNode.GetSegmentation()
+        segmentIds = [segmentId for segmentId in segmentIds if segmentation.GetSegment(segmentId)]
+        if not segmentIds:
+            return
+
+        minimumSize = self.minimumIslandSizeInVoxels(volumeNode)
+        segmentNames = ", ".join(segmentation.GetSegment(segmentId).GetName() for segmentId in segmentIds)
+        self.progressCallback(f"Remove small voxels for {segmentNames}...")
+        if self._filterIslandsVectorized(segmentationNode, segmentIds, minimumSize):
+            return
+
+        import SegmentEditorEffects
+        for segmentId in segmentIds:
+            segmentName = segmentation.GetSegment(segmentId).GetName()
+            with traceSpan(self.tracer, f"Post process {segmentName}", "postprocess", segment=segmentId):
+                effect = self._selectIslandsEffect(segmentationNode, volumeNode, segmentId)
+                effect.setParameter("Operation", SegmentEditorEffects.REMOVE_SMALL_ISLANDS)
+                effect.setParameter("MinimumSize", minimumSize)
+                effect.self().onApply()
+
+    def _filterIslandsVectorized(self, segmentationNode, segmentIds, minimumSize, keepLargestOnly=False) -> bool:
+        """
+        Filter the islands of the input segments directly in their shared labelmap and write the result back once.
+
+        :returns: True if the vectorized engine could be used, False if the caller needs to fall back to the Islands
+            effect.
+        """
+        if not self.useVectorizedEngine:
+            return False
+
+        try:
+            import scipy.ndimage  # noqa
+        except ImportError:
+            return False
+
+        labelmap = self._getSharedLabelmap(segmentationNode, segmentIds)
+        if labelmap is None:
+            return False
+
+        from vtk.util.numpy_support import vtk_to_numpy
+        segmentation = segmentationNode.GetSegmentation()
+        segments = [segmentation.GetSegment(segmentId) for segmentId in segmentIds]
+        labelValues = [segment.GetLabelValue() for segment in segments]
+        labelNames = {segment.GetLabelValue(): segment.GetName() for segment in segments}
+        labelArray = vtk_to_numpy(labelmap.GetPointData().GetScalars()).reshape(labelmap.GetDimensions()[::-1])
+        removedVoxels = removeSmallIslandsFromLabelArray(
+            labelArray, labelValues, minimumSize, keepLargestOnly, self.tracer, labelNames
+        )
+
+        # Source representation modification triggers the segmentation update and derived representations invalidation
+        labelmap.Modified()
+        self.progressCallback(f"Removed {sum(removedVoxels.values())} island voxels.")
+        return True
+
+    @staticmethod
+    def _getSharedLabelmap(segmentationNode, segmentIds):
+        """
+        :returns: The binary labelmap shared by all the input segments or None if the segments are not stored in the
+            same labelmap layer.
+        """
+        segmentation = segmentationNode.GetSegmentation()
+        labelmapName = slicer.vtkSegmentationConverter.GetBinaryLabelmapRepresentationName()
+        if segmentation.GetSourceRepresentationName() != labelmapName:
+            return None
+
+        layers = {segmentation.GetLayerIndex(segmentId) for segmentId in segmentIds}
+        if len(layers) != 1:
+            return None
+
+        labelmap = segmentation.GetLayerDataObject(layers.pop())
+        if labelmap is None or labelmap.GetPointData().GetScalars() is None:
+            return None
+        return labelmap
+
+    def _selectIslandsEffect(self, segmentationNode, volumeNode, segmentId):
+        segmentEditorWidget = self._getSegmentEditorWidget()
+        if segmentEditorWidget.segmentationNode() != segmentationNode:
+            segmentEditorWidget.setSegmentationNode(segmentationNode)
+        if segmentEditorWidget.sourceVolumeNode() != volumeNode:
+            segmentEditorWidget.setSourceVolumeNode(volumeNode)
+        segmentEditorWidget.setCurrentSegmentID(segmentId)
+        return segmentEditorWidget.effectByName("Islands")
+
+    def _getSegmentEditorWidget(self):
+        """
+        Segment editor effects need a segment editor widget to run. When used in headless mode, the widget is created
+        once and never shown.
+        """
+        if self._segmentEditorWidget is None:
+            self._segmentEditorWidget = slicer.qMRMLSegmentEditorWidget()
+            self._segmentEditorWidget.setMRMLScene(slicer.mrmlScene)
+
+        if self._segmentEditorWidget.mrmlSegmentEditorNode() is None:
+            self._segmentEditorNode = slicer.mrmlScene.AddNewNodeByClass("vtkMRMLSegmentEditorNode")
+            self._segmentEditorWidget.setMRMLSegmentEditorNode(self._segmentEditorNode)
+        return self._segmentEditorWidget
+
+    def cleanup(self):
+        """
+        Remove the segment editor node created by the post processor if any.
+        """
+        if self._segmentEditorNode is not None and slicer.mrmlScene.IsNodePresent(self._segmentEditorNode):
+            slicer.mrmlScene.RemoveNode(self._segmentEditorNode)
+        self._segmentEditorNode = None
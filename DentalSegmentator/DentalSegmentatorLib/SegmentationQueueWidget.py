@@ -0,0 +1,161 @@
+import qt
+import slicer
+
+from .Signal import Signal
+from .Utils import createButton
+
+
+class SegmentationQueue:
+    """
+    Ordered list of volume nodes waiting to be segmented.
+    Volume nodes removed from the scene are ignored when popping the next volume.
+    """
+
+    def __init__(self):
+        self.queueChanged = Signal()
+        self._volumeNodes = []
+
+    def __len__(self):
+        return len(self._volumeNodes)
+
+    def volumeNodes(self):
+        return list(self._volumeNodes)
+
+    def isEmpty(self):
+        return len(self) == 0
+
+    def enqueue(self, volumeNode) -> bool:
+        """
+        Add volume node at the end of the queue.
+
+        :returns: True if the node was added, False if node is None or already in the queue.
+        """
+        if volumeNode is None or volumeNode in self._volumeNodes:
+            return False
+
+        self._volumeNodes.append(volumeNode)
+        self.queueChanged()
+        return True
+
+    def remove(self, volumeNode):
+        if volumeNode not in self._volumeNodes:
+            return
+
+        self._volumeNodes.remove(volumeNode)
+        self.queueChanged()
+
+    def move(self, index, offset):
+        """
+        Move the volume at index by offset positions in the queue.
+
+        :returns: New index of the moved volume.
+        """
+        newIndex = min(max(index + offset, 0), len(self) - 1)
+        if not (0 <= index < len(self)) or newIndex == index:
+            return index
+
+        self._volumeNodes.insert(newIndex, self._volumeNodes.pop(index))
+        self.queueChanged()
+        return newIndex
+
+    def popNext(self):
+        """
+        :returns: First volume of the queue still present in the scene or None if the queue is empty.
+        """
+        while self._volumeNodes:
+            volumeNode = self._volumeNodes.pop(0)
+            if slicer.mrmlScene.IsNodePresent(volumeNode):
+                self.queueChanged()
+                return volumeNode
+
+        self.queueChanged()
+        return None
+
+    def clear(self):
+        self._volumeNodes = []
+        self.queueChanged()
+
+
+class SegmentationQueueWidget(qt.QWidget):
+    """
+    Panel listing the volumes waiting to be segmented. Volumes can be added, reordered and removed from the queue while
+    a segmentation is running.
+    """
+
+    def __init__(self, queue: SegmentationQueue, parent=None):
+        super().__init__(parent)
+        self.queue = queue
+        self.startQueueClicked = Signal()
+
+        self.volumeSelector = slicer.qMRMLNodeComboBox(self)
+        self.volumeSelector.nodeTypes = ["vtkMRMLScalarVolumeNode"]
+        self.volumeSelector.addEnabled = False
+        self.volumeSelector.showHidden = False
+        self.volumeSelector.removeEnabled = False
+        self.volumeSelector.setMRMLScene(slicer.mrmlScene)
+
+        self.queueListWidget = qt.QListWidget(self)
+        self.queueListWidget.setSelectionMode(qt.QAbstractItemView.SingleSelection)
+
+        self.addButton = createButton("Add", callback=self.onAddClicked, toolTip="Add the volume to the queue.")
+        self.addAllButton = createButton(
+            "Add all", callback=self.onAddAllClicked, toolTip="Add all the volumes of the scene to the queue."
+        )
+        self.moveUpButton = createButton("Up", callback=lambda: self.onMoveClicked(-1), toolTip="Move volume up.")
+        self.moveDownButton = createButton(
+            "Down", callback=lambda: self.onMoveClicked(1), toolTip="Move volume down."
+        )
+        self.removeButton = createButton(
+            "Remove", callback=self.onRemoveClicked, toolTip="Remove the selected volume from the queue."
+        )
+        self.startButton = createButton(
+            "Start queue",
+            callback=lambda *_: self.startQueueClicked(),
+            toolTip="Segment the queued volumes one after the other."
+        )
+
+        addLayout = qt.QHBoxLayout()
+        addLayout.addWidget(self.volumeSelector, 1)
+        addLayout.addWidget(self.addButton)
+        addLayout.addWidget(self.addAllButton)
+
+        editLayout = qt.QHBoxLayout()
+        editLayout.addWidget(self.moveUpButton)
+        editLayout.addWidget(self.moveDownButton)
+        editLayout.addWidget(self.removeButton)
+
+        layout = qt.QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(addLayout)
+        layout.addWidget(self.queueListWidget)
+        layout.addLayout(editLayout)
+        layout.addWidget(self.startButton)
+
+        self.queue.queueChanged.connect(self.updateQueueList)
+        self.updateQueueList()
+
+    def onAddClicked(self, *_):
+        self.queue.enqueue(self.volumeSelector.currentNode())
+
+    def onAddAllClicked(self, *_):
+        for volumeNode in slicer.mrmlScene.GetNodesByClass("vtkMRMLScalarVolumeNode"):
+            if not volumeNode.GetHideFromEditors():
+                self.queue.enqueue(volumeNode)
+
+    def onMoveClicked(self, offset):
+        newIndex = self.queue.move(self.queueListWidget.currentRow, offset)
+        self.queueListWidget.setCurrentRow(newIndex)
+
+    def onRemoveClicked(self, *_):
+        row = self.queueListWidget.currentRow
+        volumeNodes = self.queue.volumeNodes()
+        if 0 <= row < len(volumeNodes):
+            self.queue.remove(volumeNodes[row])
+
+    def updateQueueList(self, *_):
+        currentRow = self.queueListWidget.currentRow
+        self.queueListWidget.clear()
+        for volumeNode in self.queue.volumeNodes():
+            self.queueListWidget.addItem(volumeNode.GetName())
+        self.queueListWidget.setCurrentRow(min(currentRow, self.queueListWidget.count - 1))
+        self.startButton.setEnabled(not self.queue.isEmpty())
@@ -1,34 +1,75 @@
-from enum import Flag, auto
+import time
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 
-import SegmentEditorEffects
 import ctk
-import numpy as np
 import qt
 import slicer
 
+from .ClosedSurfaceCache import ClosedSurfaceCache
+from .CpuAutotune import CpuAutotuner, CpuProfileStore, createRepresentativeCrop
+from .DependencyPrefetch import DependencyPrefetcher
+from .FieldOfViewCropping import FieldOfViewCrop
+from .FoldEnsemble import FoldEnsembleLogic, availableFolds, cappedThreads, isLabelVotingReliable, parseFolds
 from .IconPath import icon, iconPath
-from .PythonDependencyChecker import PythonDependencyChecker, hasInternetConnection
+from .InferenceProfiles import defaultInferenceProfile, getInferenceProfile, inferenceProfiles
+from .LogSink import BufferedLogSink
+from .LogStore import LogStore, LogViewerWidget
+from .MemoryBudget import MemoryBudget, SlabbedInference, planInference, readTargetSpacing
+from .OnnxSegmentation import OnnxSegmentationLogic, installOnnxRuntime
+from .PythonDependencyChecker import PythonDependencyChecker
+from .SegmentationCache import SegmentationResultCache
+from .SegmentationExport import ExportFormat, SegmentationExportJob, exportSegmentation
+from .SegmentationLoading import (
+    LabelArrayResult,
+    fillSegmentationFromLabelArray,
+    inferenceResultPath,
+    isLabelArrayReadingAvailable,
+    readLabelArray,
+)
+from .SegmentationPostProcessing import SegmentationPostProcessor
+from .SegmentationQueueWidget import SegmentationQueue, SegmentationQueueWidget
+from .Tracing import Tracer
 from .Utils import (
     createButton,
-    addInCollapsibleLayout,
+    addLazyInCollapsibleLayout,
     set3DViewBackgroundColors,
     setConventionalWideScreenView,
     setBoxAndTextVisibilityOnThreeDViews,
 )
 
 
-class ExportFormat(Flag):
-    OBJ = auto()
-    STL = auto()
-    NIFTI = auto()
-    GLTF = auto()
+class SegmentationWidget(qt.QWidget):
+    cropMargin_mm = 10
 
+    # Preview inference settings : no sliding window overlap and no test time augmentation
+    previewProfile = "Fast"
 
-class SegmentationWidget(qt.QWidget):
-    def __init__(self, logic=None, parent=None):
+    # Devices running the nnU-Net network with ONNX Runtime on CPU instead of PyTorch and their network precision
+    onnxDevice = "onnx-cpu"
+    onnxInt8Device = "onnx-cpu-int8"
+    onnxPrecisions = {onnxDevice: "float32", onnxInt8Device: "int8"}
+
+    def __init__(self, logic=None, parent=None, resultCache=None, tracer=None, logStore=None):
         super().__init__(parent)
         self.logic = logic or self._createSlicerSegmentationLogic()
+        self._activeLogic = self.logic
+        self._onnxLogics = {}
+        self._foldEnsembleLogics = {}
+        self.resultCache = resultCache or SegmentationResultCache()
+        self.tracer = tracer or Tracer()
+        self.logStore = logStore or LogStore(self.defaultLogFolder())
+        self._inferenceSpan = None
+        self._inferenceStartTime = None
+        self._fieldOfViewCrop = None
+        self._slabbedInference = None
+        self._inferenceCpuSet = None
+        self._autotuner = None
+        self._autotuneCrop = None
+        self.memoryBudget = MemoryBudget()
+        self._isPreviewRun = False
+        self._previewVolumeNode = None
+        self._pendingCacheKey = None
         self._prevSegmentationNode = None
         self._minimumIslandSize_mm3 = 60
 
@@ -42,7 +83,67 @@ class SegmentationWidget(qt.QWidget):
 
         # Configure inference device options
         self.deviceComboBox = qt.QComboBox()
-        self.deviceComboBox.addItems(["cuda", "cpu", "mps"])
+        self.deviceComboBox.addItems(["cuda", "cpu", "mps", *self.onnxPrecisions])
+        self.deviceComboBox.setToolTip(
+            f"Inference device. {self.onnxDevice} runs the network with ONNX Runtime on CPU, which is usually faster "
+            f"than the PyTorch CPU inference. The network is exported to ONNX on its first run. {self.onnxInt8Device} "
+            "runs an INT8 quantized network, faster and lighter at the cost of some accuracy. The INT8 network is "
+            "generated and calibrated locally on its first run."
+        )
+
+        self.inferenceProfileComboBox = qt.QComboBox(self)
+        for iProfile, profile in enumerate(inferenceProfiles.values()):
+            self.inferenceProfileComboBox.addItem(profile.name)
+            self.inferenceProfileComboBox.setItemData(iProfile, profile.description, qt.Qt.ToolTipRole)
+        self.inferenceProfileComboBox.setCurrentText(defaultInferenceProfile)
+        self.inferenceProfileComboBox.setToolTip(
+            "Inference accuracy and speed trade-off. Balanced is the default and doesn't use test time augmentation. "
+            "Accurate adds the test time augmentation, up to 8 times slower. Fast also removes the overlap between the "
+            "sliding window tiles."
+        )
+
+        self.foldsLineEdit = qt.QLineEdit("0", self)
+        self.foldsLineEdit.setToolTip(
+            "Comma separated list of the model folds to run (for instance 0,1,2,3,4). The segmentations of several "
+            "folds are ensembled for a better accuracy at the cost of a longer inference."
+        )
+        self.foldWorkersSpinBox = qt.QSpinBox(self)
+        self.foldWorkersSpinBox.setRange(1, 16)
+        self.foldWorkersSpinBox.setToolTip(
+            "Number of folds segmented in parallel on CPU, each in its own process using an equal share of the CPU "
+            "cores. With a single worker, the folds are ensembled by nnU-Net in one process. The PyTorch backend "
+            "always ensembles an even number of folds in one process."
+        )
+
+        self.memoryBudgetSpinBox = qt.QSpinBox(self)
+        self.memoryBudgetSpinBox.setRange(0, 1024)
+        self.memoryBudgetSpinBox.setSuffix(" GB")
+        self.memoryBudgetSpinBox.setSpecialValueText("Automatic")
+        self.memoryBudgetSpinBox.setValue(int(self.memoryBudget.budget_GB))
+        self.memoryBudgetSpinBox.setToolTip(
+            "Maximum memory used by the CPU inference. Volumes exceeding the budget are segmented in overlapping "
+            "slabs. Automatic uses 75% of the physical memory."
+        )
+        self.memoryBudgetSpinBox.valueChanged.connect(self.onMemoryBudgetChanged)
+
+        self.cropCheckBox = qt.QCheckBox(self)
+        self.cropCheckBox.setToolTip(
+            "Run the inference only on the anatomy bounding box to skip the air and the scanner padding around it."
+        )
+
+        self.previewCheckBox = qt.QCheckBox(self)
+        self.previewCheckBox.setToolTip(
+            "Display a fast rough segmentation first, computed on the anatomy field of view without sliding window "
+            "overlap and test time augmentation. The full resolution segmentation replaces the preview once done."
+        )
+        self.refineAutomaticallyCheckBox = qt.QCheckBox(self)
+        self.refineAutomaticallyCheckBox.setChecked(True)
+        self.refineAutomaticallyCheckBox.setToolTip(
+            "Start the full resolution segmentation as soon as the preview is displayed. If unchecked, the full "
+            "resolution segmentation is started using the Refine button."
+        )
+        self.refineAutomaticallyCheckBox.setEnabled(False)
+        self.previewCheckBox.toggled.connect(self.refineAutomaticallyCheckBox.setEnabled)
 
         # Configure segment editor node selector
         self.segmentationNodeSelector = slicer.qMRMLNodeComboBox(self)
@@ -66,11 +167,20 @@ class SegmentationWidget(qt.QWidget):
         self.segmentEditorWidget.setSourceVolumeNodeSelectorVisible(False)
         self.segmentEditorWidget.layout().setContentsMargins(0, 0, 0, 0)
         self.segmentEditorNode = None
+        self._postProcessor = SegmentationPostProcessor(
+            self._minimumIslandSize_mm3,
+            progressCallback=self.onProgressInfo,
+            segmentEditorWidget=self.segmentEditorWidget,
+            tracer=self.tracer
+        )
 
         # Find show 3D Button in widget
         self.show3DButton = slicer.util.findChild(self.segmentEditorWidget, "Show3DButton")
 
-        # Create surface smoothing and connect it to show3D button surface smoothing
+        # Closed surfaces shared by the 3D display and the mesh exports
+        self.surfaceCache = ClosedSurfaceCache(tracer=self.tracer)
+
+        # Create surface smoothing and synchronize it with show3D button surface smoothing
         smoothingSlider = self.show3DButton.findChild("ctkSliderWidget")
         self.surfaceSmoothingSlider = ctk.ctkSliderWidget(self)
         self.surfaceSmoothingSlider.setToolTip(
@@ -81,31 +191,9 @@ class SegmentationWidget(qt.QWidget):
         self.surfaceSmoothingSlider.singleStep = 0.1
         self.surfaceSmoothingSlider.setValue(smoothingSlider.value)
         self.surfaceSmoothingSlider.tracking = False
-        self.surfaceSmoothingSlider.valueChanged.connect(smoothingSlider.setValue)
+        self.surfaceSmoothingSlider.valueChanged.connect(self.onSurfaceSmoothingChanged)
 
-        # Export Widget
-        exportWidget = qt.QWidget()
-        exportLayout = qt.QFormLayout(exportWidget)
-        self.stlCheckBox = qt.QCheckBox(exportWidget)
-        self.stlCheckBox.setChecked(True)
-        self.objCheckBox = qt.QCheckBox(exportWidget)
-        self.niftiCheckBox = qt.QCheckBox(exportWidget)
-        self.gltfCheckBox = qt.QCheckBox(exportWidget)
-        self.reductionFactorSlider = ctk.ctkSliderWidget()
-        self.reductionFactorSlider.maximum = 1.0
-        self.reductionFactorSlider.value = 0.9
-        self.reductionFactorSlider.singleStep = 0.01
-        self.reductionFactorSlider.toolTip = (
-            "Decimation factor determining how much the mesh complexity will be reduced. "
-            "Higher value means stronger reduction (smaller files, less details preserved)."
-        )
-
-        exportLayout.addRow("Export STL", self.stlCheckBox)
-        exportLayout.addRow("Export OBJ", self.objCheckBox)
-        exportLayout.addRow("Export NIFTI", self.niftiCheckBox)
-        exportLayout.addRow("Export glTF", self.gltfCheckBox)
-        exportLayout.addRow("glTF reduction factor :", self.reductionFactorSlider)
-        exportLayout.addRow(createButton("Export", callback=self.onExportClicked, parent=exportWidget))
+        self._exportJob = None
 
         layout = qt.QVBoxLayout(self)
         self.inputWidget = qt.QWidget(self)
@@ -114,6 +202,13 @@ class SegmentationWidget(qt.QWidget):
         inputLayout.addRow(self.inputSelector)
         inputLayout.addRow(self.segmentationNodeSelector)
         inputLayout.addRow("Device:", self.deviceComboBox)
+        inputLayout.addRow("Inference profile:", self.inferenceProfileComboBox)
+        inputLayout.addRow("Folds:", self.foldsLineEdit)
+        inputLayout.addRow("Parallel fold workers:", self.foldWorkersSpinBox)
+        inputLayout.addRow("CPU memory budget:", self.memoryBudgetSpinBox)
+        inputLayout.addRow("Crop to anatomy:", self.cropCheckBox)
+        inputLayout.addRow("Preview first:", self.previewCheckBox)
+        inputLayout.addRow("Refine automatically:", self.refineAutomaticallyCheckBox)
         layout.addWidget(self.inputWidget)
 
         self.applyButton = createButton(
@@ -123,10 +218,17 @@ class SegmentationWidget(qt.QWidget):
             icon=icon("start_icon.png")
         )
 
+        self.refineButton = createButton(
+            "Refine",
+            callback=self.onRefineClicked,
+            toolTip="Click to run the full resolution segmentation and replace the preview.",
+        )
+        self.refineButton.setVisible(False)
+
         self.currentInfoTextEdit = qt.QTextEdit()
         self.currentInfoTextEdit.setReadOnly(True)
         self.currentInfoTextEdit.setLineWrapMode(qt.QTextEdit.NoWrap)
-        self.fullInfoLogs = []
+        self._logSink = BufferedLogSink(self._writeInfoLogs, filterF=self.removeImageIOError)
         self.stopWidget = qt.QVBoxLayout()
 
         self.stopButton = createButton(
@@ -149,11 +251,17 @@ class SegmentationWidget(qt.QWidget):
         applyLayout = qt.QHBoxLayout(self.applyWidget)
         applyLayout.setContentsMargins(0, 0, 0, 0)
         applyLayout.addWidget(self.applyButton, 1)
+        applyLayout.addWidget(self.refineButton, 1)
         applyLayout.addWidget(
             createButton("", callback=self.showInfoLogs, icon=icon("info.png"), toolTip="Show logs.")
         )
 
+        self.readinessLabel = qt.QLabel(self)
+        self.readinessLabel.setWordWrap(True)
+        self.readinessLabel.setVisible(False)
+
         layout.addWidget(self.applyWidget)
+        layout.addWidget(self.readinessLabel)
         layout.addWidget(self.stopWidget)
         layout.addWidget(self.segmentEditorWidget)
 
@@ -161,13 +269,26 @@ class SegmentationWidget(qt.QWidget):
         surfaceSmoothingLayout.setContentsMargins(0, 0, 0, 0)
         surfaceSmoothingLayout.addRow("Surface smoothing :", self.surfaceSmoothingSlider)
         layout.addLayout(surfaceSmoothingLayout)
-        layout.addWidget(exportWidget)
-        addInCollapsibleLayout(exportWidget, layout, "Export segmentation", isCollapsed=False)
+
+        # Secondary panels are only built when first expanded to speed up the module startup
+        self.exportPanel = addLazyInCollapsibleLayout(
+            self._createExportWidget, layout, "Export segmentation", isCollapsed=False
+        )
+        self.segmentationQueue = SegmentationQueue()
+        self.queuePanel = addLazyInCollapsibleLayout(self._createQueueWidget, layout, "Segmentation queue")
+        self.resultCachePanel = addLazyInCollapsibleLayout(self._createResultCacheWidget, layout, "Result cache")
+        self.cpuProfilePanel = addLazyInCollapsibleLayout(self._createCpuProfileWidget, layout, "CPU performance")
         layout.addStretch()
 
         self.isStopping = False
+        self.isRunning = False
+        self._isDeviceFallbackAccepted = False
+        self._isNextQueuedScheduled = False
 
-        self._dependencyChecker = PythonDependencyChecker()
+        self._dependencyChecker = PythonDependencyChecker(
+            confirmUnverifiedDownloadF=self._confirmUnverifiedWeightsDownload
+        )
+        self._prefetcher = None
         self.processedVolumes = {}
 
         self.onInputChanged()
@@ -180,13 +301,198 @@ class SegmentationWidget(qt.QWidget):
         slicer.mrmlScene.RemoveObserver(self.sceneCloseObserver)
         super().__del__()
 
+    def _createExportWidget(self):
+        exportWidget = qt.QWidget()
+        exportLayout = qt.QFormLayout(exportWidget)
+        self.stlCheckBox = qt.QCheckBox(exportWidget)
+        self.stlCheckBox.setChecked(True)
+        self.objCheckBox = qt.QCheckBox(exportWidget)
+        self.niftiCheckBox = qt.QCheckBox(exportWidget)
+        self.gltfCheckBox = qt.QCheckBox(exportWidget)
+        self.gltfCheckBox.toolTip = (
+            "The glTF export and the generation of the 3D surfaces used by the STL, OBJ and glTF exports run on the "
+            "application main thread. The application doesn't respond to user input during these steps."
+        )
+        self.reductionFactorSlider = ctk.ctkSliderWidget()
+        self.reductionFactorSlider.maximum = 1.0
+        self.reductionFactorSlider.value = 0.9
+        self.reductionFactorSlider.singleStep = 0.01
+        self.reductionFactorSlider.toolTip = (
+            "Decimation factor determining how much the mesh complexity will be reduced. "
+            "Higher value means stronger reduction (smaller files, less details preserved)."
+        )
+
+        exportLayout.addRow("Export STL", self.stlCheckBox)
+        exportLayout.addRow("Export OBJ", self.objCheckBox)
+        exportLayout.addRow("Export NIFTI", self.niftiCheckBox)
+        exportLayout.addRow("Export glTF", self.gltfCheckBox)
+        exportLayout.addRow("glTF reduction factor :", self.reductionFactorSlider)
+        self.exportButton = createButton("Export", callback=self.onExportClicked, parent=exportWidget)
+        exportLayout.addRow(self.exportButton)
+
+        self.exportProgressBar = qt.QProgressBar(exportWidget)
+        self.cancelExportButton = createButton(
+            "Cancel", callback=self.onCancelExportClicked, toolTip="Cancel the export.", parent=exportWidget
+        )
+        self.exportProgressWidget = qt.QWidget(exportWidget)
+        exportProgressLayout = qt.QHBoxLayout(self.exportProgressWidget)
+        exportProgressLayout.setContentsMargins(0, 0, 0, 0)
+        exportProgressLayout.addWidget(self.exportProgressBar, 1)
+        exportProgressLayout.addWidget(self.cancelExportButton)
+        self.exportProgressWidget.setVisible(False)
+        exportLayout.addRow(self.exportProgressWidget)
+        return exportWidget
+
+    def _createQueueWidget(self):
+        queueWidget = SegmentationQueueWidget(self.segmentationQueue)
+        queueWidget.startQueueClicked.connect(self.onStartQueueClicked)
+        queueWidget.startButton.setEnabled(not self.isRunning and not self.segmentationQueue.isEmpty())
+        return queueWidget
+
+    @property
+    def queueWidget(self) -> SegmentationQueueWidget:
+        return self.queuePanel.widget()
+
+    def _createResultCacheWidget(self):
+        cacheWidget = qt.QWidget()
+        cacheLayout = qt.QFormLayout(cacheWidget)
+
+        self.cacheEnabledCheckBox = qt.QCheckBox(cacheWidget)
+        self.cacheEnabledCheckBox.setChecked(self.resultCache.isEnabled)
+        self.cacheEnabledCheckBox.setToolTip(
+            "When enabled, segmentation results are stored on disk and reused when the same volume is segmented again "
+            "with the same model and parameters."
+        )
+        self.cacheEnabledCheckBox.toggled.connect(self.onCacheEnabledToggled)
+
+        self.cacheSizeSpinBox = qt.QSpinBox(cacheWidget)
+        self.cacheSizeSpinBox.setRange(0, 1024 * 1024)
+        self.cacheSizeSpinBox.setSuffix(" MB")
+        self.cacheSizeSpinBox.setValue(int(self.resultCache.maxSize_MB))
+        self.cacheSizeSpinBox.setToolTip("Least recently used results are removed when the cache exceeds this size.")
+        self.cacheSizeSpinBox.editingFinished.connect(self.onCacheSizeChanged)
+
+        self.cacheUsageLabel = qt.QLabel(cacheWidget)
+        cacheLayout.addRow("Enable cache", self.cacheEnabledCheckBox)
+        cacheLayout.addRow("Cache size limit :", self.cacheSizeSpinBox)
+        cacheLayout.addRow("Cache usage :", self.cacheUsageLabel)
+        cacheLayout.addRow(createButton("Clear cache", callback=self.onClearCacheClicked, parent=cacheWidget))
+        self.cacheUsageLabel.setText(f"{self.resultCache.size_MB():.1f} MB")
+        return cacheWidget
+
+    def onMemoryBudgetChanged(self, budget_GB):
+        self.memoryBudget.budget_GB = budget_GB
+
+    def onCacheEnabledToggled(self, isEnabled):
+        self.resultCache.isEnabled = isEnabled
+
+    def onCacheSizeChanged(self):
+        self.resultCache.maxSize_MB = self.cacheSizeSpinBox.value
+        self._updateCacheUsage()
+
+    def onClearCacheClicked(self, *_):
+        self.resultCache.clear()
+        self._updateCacheUsage()
+
+    def _createCpuProfileWidget(self):
+        profileWidget = qt.QWidget()
+        profileLayout = qt.QFormLayout(profileWidget)
+        self.cpuProfileLabel = qt.QLabel(profileWidget)
+        self.cpuProfileLabel.setWordWrap(True)
+        self.autotuneButton = createButton(
+            "Autotune",
+            callback=self.onAutotuneClicked,
+            toolTip="Benchmark the CPU inference settings on a crop of the current volume and use the fastest ones "
+                    "for the next CPU segmentations on this machine. Takes several inference runs.",
+            parent=profileWidget
+        )
+        profileLayout.addRow("CPU profile :", self.cpuProfileLabel)
+        profileLayout.addRow(self.autotuneButton)
+        profileLayout.addRow(
+            createButton("Clear profile", callback=self.onClearCpuProfileClicked, parent=profileWidget)
+        )
+        self.cpuProfileLabel.setText(self._cpuProfileText())
+        return profileWidget
+
+    @staticmethod
+    def _cpuProfileText():
+        profile = CpuProfileStore.load()
+        if profile is None:
+            return "Not autotuned. Default settings are used."
+        return f"{profile.describe()} (autotuned on {profile.createdAt})"
+
+    def _updateCpuProfile(self):
+        if self.cpuProfilePanel.isBuilt():
+            self.cpuProfileLabel.setText(self._cpuProfileText())
+
+    def onClearCpuProfileClicked(self, *_):
+        CpuProfileStore.clear()
+        self._updateCpuProfile()
+
+    def onAutotuneClicked(self, *_):
+        """
+        Benchmark the CPU inference settings on a representative crop of the current volume and store the fastest
+        settings in the machine CPU profile.
+        """
+        from SlicerNNUNetLib import Parameter
+
+        volumeNode = self.getCurrentVolumeNode()
+        if volumeNode is None:
+            slicer.util.errorDisplay("Select a volume to autotune the CPU inference on.")
+            return
+
+        self._isDeviceFallbackAccepted = False
+        if not self._prepareSegmentation():
+            return
+
+        parameter = Parameter(
+            folds=self.getSelectedFolds()[0],
+            modelPath=self._dependencyChecker.getActiveWeightsFolder(),
+            device="cpu"
+        )
+        self._applyInferenceProfile(parameter, self.getSelectedInferenceProfile())
+        self._autotuneCrop = createRepresentativeCrop(volumeNode)
+        self._autotuner = CpuAutotuner(
+            self._createWorkerLogic(), parameter, self._autotuneCrop.createCroppedVolumeNode()
+        )
+        self._autotuner.progressInfo.connect(self.onProgressInfo)
+        self._autotuner.finished.connect(self._onAutotuneFinished)
+        self._autotuner.errorOccurred.connect(self._onAutotuneError)
+        self._autotuner.start()
+
+    def _onAutotuneFinished(self, profile):
+        CpuProfileStore.save(profile)
+        self._clearAutotune()
+        self._updateCpuProfile()
+        self._setApplyVisible(True)
+
+    def _onAutotuneError(self, errorMsg):
+        self._clearAutotune()
+        self._setApplyVisible(True)
+        slicer.util.errorDisplay(errorMsg)
+
+    def _clearAutotune(self, doStop=False):
+        if self._autotuner is not None and doStop:
+            self._autotuner.stop()
+        if self._autotuneCrop is not None:
+            self._autotuneCrop.cleanup()
+        self._autotuner = None
+        self._autotuneCrop = None
+
+    def _updateCacheUsage(self):
+        if self.resultCachePanel.isBuilt():
+            self.cacheUsageLabel.setText(f"{self.resultCache.size_MB():.1f} MB")
+
     def onSceneChanged(self, *_, doStopInference=True):
         if doStopInference:
             self.onStopClicked()
         self.segmentEditorNode = slicer.mrmlScene.AddNewNodeByClass("vtkMRMLSegmentEditorNode")
         self.segmentEditorWidget.setMRMLSegmentEditorNode(self.segmentEditorNode)
+        self.segmentationQueue.clear()
         self.processedVolumes = {}
         self._prevSegmentationNode = None
+        self._previewVolumeNode = None
+        self._updateRefineButton()
         self._initSlicerDisplay()
 
     @staticmethod
@@ -204,12 +510,18 @@ class SegmentationWidget(qt.QWidget):
     def onStopClicked(self):
         """
         When user kills the execution, don't show any error window and wait for process to be killed in the logic.
-        Once cleanup is done, restore buttons.
+        Once cleanup is done, restore buttons. The remaining queued volumes are kept in the queue.
         """
 
         self.isStopping = True
-        self.logic.stopSegmentation()
-        self.logic.waitForSegmentationFinished()
+        self._pendingCacheKey = None
+        self._isPreviewRun = False
+        self._clearAutotune(doStop=True)
+        self._activeLogic.stopSegmentation()
+        self._activeLogic.waitForSegmentationFinished()
+        self._endInferenceSpan()
+        self._clearFieldOfViewCrop()
+        self._clearSlabbedInference()
         slicer.app.processEvents()
         self.isStopping = False
         self._setApplyVisible(True)
@@ -218,43 +530,266 @@ class SegmentationWidget(qt.QWidget):
         """
         On apply, clear the output log infos, hide apply button, install dependencies and start the segmentation process
         """
+        self._isDeviceFallbackAccepted = False
+        if not self._prepareSegmentation():
+            return
+
+        self._runSegmentation()
+
+    def onRefineClicked(self, *_):
+        """
+        Run the full resolution segmentation of the previewed volume. Its results replace the preview.
+        """
+        if not self._prepareSegmentation():
+            return
+
+        self._runSegmentation(isPreview=False)
+
+    def onStartQueueClicked(self):
+        """
+        Install dependencies and start the segmentation of the first queued volume. The following volumes are started
+        as soon as the previous inference is finished.
+        """
+        if self.isRunning or self.segmentationQueue.isEmpty():
+            return
+
+        self._isDeviceFallbackAccepted = False
+        if not self._prepareSegmentation():
+            return
+
+        self._startNextQueuedSegmentation()
+
+    def startPrefetch(self):
+        """
+        Start the dependency and weights checks in the background. Missing weights are downloaded in the background.
+        The first Apply waits for the checks to be finished and reuses their result.
+        """
+        if self._prefetcher is not None or self.logic is None:
+            return
+
+        self._prefetcher = DependencyPrefetcher(self._dependencyChecker, tracer=self.tracer)
+        self._prefetcher.progress.connect(self._onPrefetchProgress)
+        self._prefetcher.finished.connect(self._onPrefetchFinished)
+        self.readinessLabel.setVisible(True)
+        self._prefetcher.start()
+
+    def _onPrefetchProgress(self, msg):
+        self.readinessLabel.setText(msg)
+        self.onProgressInfo(msg)
+
+    def _onPrefetchFinished(self):
+        result = self._prefetcher.result
+        if not result.dependenciesSatisfied:
+            self.readinessLabel.setText("Python dependencies will be installed on Apply.")
+        elif result.weightsMissing:
+            self.readinessLabel.setText("Model weights are not available. Their download will be retried on Apply.")
+        elif result.weightsOutdated:
+            self.readinessLabel.setText("Ready. New model weights are available.")
+        else:
+            self.readinessLabel.setText("Ready.")
+
+    def _confirmUnverifiedWeightsDownload(self, download_url) -> bool:
+        ret = qt.QMessageBox.question(
+            self,
+            "Unverified model weights",
+            f"No SHA-256 digest is available to verify the model weights downloaded from :\n{download_url}\n\n"
+            "The downloaded archive will only be checked for corruption. Would you like to download them anyway?"
+        )
+        return ret == qt.QMessageBox.Yes
+
+    def _waitForPrefetch(self):
+        """
+        Wait for the background checks started by startPrefetch and consume their result.
+
+        :returns: PrefetchResult or None if no background checks were started.
+        """
+        prefetcher, self._prefetcher = self._prefetcher, None
+        if prefetcher is None:
+            return None
+
+        if not prefetcher.isFinished():
+            self.onProgressInfo("Waiting for the dependency checks to finish...")
+            prefetcher.wait()
+        self.readinessLabel.setVisible(False)
+        return prefetcher.result
+
+    def _prepareSegmentation(self) -> bool:
+        """
+        Clear the output log infos, hide apply button and install dependencies.
+        Reuses the result of the background checks if they were started.
+
+        :returns: True if the segmentation can be started, False otherwise.
+        """
         if not self.isNNUNetModuleInstalled() or self.logic is None:
             slicer.util.errorDisplay(
                 "This module depends on the NNUNet module."
                 " Please install the NNUNet module and restart to proceed."
             )
-            return
+            return False
 
+        self._logSink.flush()
         self.currentInfoTextEdit.clear()
         self._setApplyVisible(False)
-        if not self._installNNUNetIfNeeded():
+        with self.tracer.span("Wait for background checks", "dependencies"):
+            prefetchResult = self._waitForPrefetch()
+
+        # Segmentation was stopped while waiting for the background checks
+        if not self.isRunning:
+            return False
+
+        # The background check only imports the dependencies. The requirements versions are checked on each run, which
+        # is fast once they are met.
+        with self._blockingStage("Dependency check", "dependencies"):
+            isInstalled = self._installNNUNetIfNeeded()
+        if not isInstalled:
             self._setApplyVisible(True)
-            return
+            return False
 
-        if not self._dependencyChecker.downloadWeightsIfNeeded(self.onProgressInfo):
+        if prefetchResult is None or prefetchResult.weightsMissing or prefetchResult.weightsOutdated:
+            with self._blockingStage("Weights check", "dependencies"):
+                areWeightsAvailable = self._dependencyChecker.downloadWeightsIfNeeded(self.onProgressInfo)
+            if not areWeightsAvailable:
+                self._setApplyVisible(True)
+                return False
+
+        if self.isOnnxBackendSelected():
+            with self._blockingStage("ONNX Runtime check", "dependencies"):
+                isInstalled = self._installOnnxRuntimeIfNeeded()
+            if not isInstalled:
+                self._setApplyVisible(True)
+                return False
+
+        if self.getSelectedOnnxPrecision() == "int8":
+            with self._blockingStage("INT8 weights check", "dependencies"):
+                areWeightsAvailable = self._prepareQuantizedWeights()
+            if not areWeightsAvailable:
+                self._setApplyVisible(True)
+                return False
+        return True
+
+    def _prepareQuantizedWeights(self) -> bool:
+        """
+        Generate the INT8 networks of the selected folds if needed and report their accuracy difference from the
+        float32 networks.
+
+        :returns: True if the INT8 networks are available, False otherwise.
+        """
+        folds = self.getSelectedFolds()
+        if not self._dependencyChecker.areQuantizedWeightsAvailable(folds):
+            ret = qt.QMessageBox.question(
+                self,
+                "Generate INT8 model weights",
+                "The INT8 model weights are generated locally from the downloaded weights and calibrated on a sample "
+                "volume. Their accuracy is then compared to the float32 weights.\n"
+                "The generation may take several minutes. Would you like to proceed?"
+            )
+            if ret == qt.QMessageBox.No:
+                return False
+            if not self._dependencyChecker.generateQuantizedWeights(folds, self.onProgressInfo):
+                return False
+
+        report = self._dependencyChecker.readQuantizationReport(folds)
+        if report is not None:
+            self.onProgressInfo(report)
+        return True
+
+    def _startNextQueuedSegmentation(self):
+        """
+        Select the next queued volume as input and start its segmentation. Restores apply button if queue is empty.
+        """
+        self._isNextQueuedScheduled = False
+        volumeNode = self.segmentationQueue.popNext()
+        if volumeNode is None:
             self._setApplyVisible(True)
             return
 
+        self.inputSelector.setCurrentNode(volumeNode)
+        self.onProgressInfo(f"Starting segmentation of queued volume {volumeNode.GetName()}...")
+        self._setApplyVisible(False)
         self._runSegmentation()
 
+    def _continueAfterResults(self):
+        """
+        Start the full resolution segmentation after a preview if automatic refinement is enabled or the next queued
+        volume otherwise. Returns False if no segmentation was started.
+        """
+        self._clearSlabbedInference()
+        isPreview, self._isPreviewRun = self._isPreviewRun, False
+        if isPreview and not self.isStopping:
+            if self.refineAutomaticallyCheckBox.isChecked():
+                qt.QTimer.singleShot(0, self._startRefinement)
+                return True
+            self._previewVolumeNode = self.getCurrentVolumeNode()
+        return self._continueQueue()
+
+    def _startRefinement(self):
+        """
+        Start the full resolution segmentation of the previewed volume unless the segmentation was stopped.
+        """
+        if not self.isRunning:
+            return
+
+        self.onProgressInfo("Preview displayed. Starting full resolution segmentation...")
+        self._runSegmentation(isPreview=False)
+
+    def _continueQueue(self):
+        """
+        Start the next queued volume if any. Returns False if the queue is empty.
+        """
+        if self.isStopping or self.segmentationQueue.isEmpty():
+            return False
+
+        # Error and finished signals may both be emitted for the same run. Make sure only one run is started.
+        if not self._isNextQueuedScheduled:
+            self._isNextQueuedScheduled = True
+            qt.QTimer.singleShot(0, self._startNextQueuedSegmentation)
+        return True
+
     def _setApplyVisible(self, isVisible):
         """
         Toggles visibility of the apply / stop buttons and make sure the selectors are disabled when running
         segmentation.
         """
+        self.isRunning = not isVisible
         self.applyWidget.setVisible(isVisible)
         self.stopWidget.setVisible(not isVisible)
         self.inputWidget.setEnabled(isVisible)
+        self._updateRefineButton()
+        if self.queuePanel.isBuilt():
+            self.queueWidget.startButton.setEnabled(isVisible and not self.segmentationQueue.isEmpty())
 
-    def _runSegmentation(self):
+    def _updateRefineButton(self):
+        """
+        Show the refine button when the current volume only has a preview segmentation.
+        """
+        isPreviewed = self._previewVolumeNode is not None and self._previewVolumeNode == self.getCurrentVolumeNode()
+        self.refineButton.setVisible(isPreviewed and not self.isRunning)
+
+    def _runSegmentation(self, isPreview=None):
         """
         Make sure the dependencies are available and user is aware CPU process may take time if current install doesn't
         support CUDA before starting the actual segmentation from the logic object.
+
+        :param isPreview: If True, run the fast preview inference. Defaults to the preview checkbox state.
         """
         from SlicerNNUNetLib import Parameter
 
-        parameter = Parameter(folds="0", modelPath=self.nnUnetFolder(), device=self.deviceComboBox.currentText)
-        if not parameter.isSelectedDeviceAvailable():
+        if isPreview is None:
+            isPreview = self.previewCheckBox.isChecked()
+
+        parameter = Parameter(
+            folds=",".join(self.getSelectedFolds()),
+            modelPath=self._dependencyChecker.getActiveWeightsFolder(),
+            device=self.getSelectedNNUNetDevice()
+        )
+        if not self._areSelectedFoldsAvailable(parameter):
+            self._setApplyVisible(True)
+            return
+
+        self._applyInferenceProfile(parameter, self.getSelectedInferenceProfile())
+        if isPreview:
+            self._setPreviewParameters(parameter)
+        if not parameter.isSelectedDeviceAvailable() and not self._isDeviceFallbackAccepted:
             deviceName = parameter.device.upper()
             ret = qt.QMessageBox.question(
                 self,
@@ -262,15 +797,325 @@ class SegmentationWidget(qt.QWidget):
                 f"Selected device ({deviceName}) is not currently available on your system and will "
                 "default to CPU device.\n"
                 "Running the segmentation may take up to 1 hour.\n"
+                f"{self._autotuneHint()}"
                 "Would you like to proceed?"
             )
             if ret == qt.QMessageBox.No:
                 self._setApplyVisible(True)
                 return
+            self._isDeviceFallbackAccepted = True
+
+        self._isPreviewRun = isPreview
+        if not isPreview and self._previewVolumeNode == self.getCurrentVolumeNode():
+            self._previewVolumeNode = None
 
+        cacheKey = self._computeCacheKey(parameter, isPreview)
+        if self._loadCachedSegmentation(cacheKey):
+            return
+
+        self._pendingCacheKey = cacheKey
+        inputVolumeNode = self._createInferenceInput(isPreview)
+        self._applyCpuProfile(parameter)
+        inputVolumeNode = self._planMemoryBudget(parameter, inputVolumeNode)
         slicer.app.processEvents()
-        self.logic.setParameter(parameter)
-        self.logic.startSegmentation(self.getCurrentVolumeNode())
+        self._activeLogic = self._selectInferenceLogic(parameter)
+        self._activeLogic.setParameter(parameter)
+        self._inferenceStartTime = time.perf_counter()
+        self._startInference(inputVolumeNode, device=parameter.device, profile=self.getSelectedInferenceProfile())
+
+    def _startInference(self, volumeNode, **spanArgs):
+        self._inferenceSpan = self.tracer.begin("Inference", "inference", **spanArgs)
+        with cappedThreads(self._inferenceCpuSet) if self._inferenceCpuSet else nullcontext():
+            self._activeLogic.startSegmentation(volumeNode)
+
+    @staticmethod
+    def _autotuneHint():
+        if CpuProfileStore.load() is not None:
+            return ""
+        return "Autotuning the CPU inference in the CPU performance section may speed it up on this machine.\n"
+
+    def _applyCpuProfile(self, parameter):
+        """
+        Apply the autotuned profile of the machine to the CPU inference if any.
+        """
+        self._inferenceCpuSet = None
+        profile = CpuProfileStore.load()
+        if profile is None or self._effectiveDevice(parameter) != "cpu":
+            return
+
+        profile.applyTo(parameter)
+        self._inferenceCpuSet = profile.cpuSet()
+        self.onProgressInfo(f"Using the autotuned CPU profile : {profile.describe()}.")
+
+    def getSelectedInferenceProfile(self):
+        return self.inferenceProfileComboBox.currentText
+
+    def _applyInferenceProfile(self, parameter, profileName):
+        """
+        Set the inference profile settings on the nnU-Net parameter and report the settings the installed NNUNet
+        module doesn't support.
+        """
+        unsupportedNames = getInferenceProfile(profileName).applyTo(parameter)
+        if unsupportedNames:
+            self.onProgressInfo(
+                f"The installed NNUNet module doesn't support the {', '.join(unsupportedNames)} settings of the "
+                f"{profileName} inference profile. Update the NNUNet extension to use them."
+            )
+
+    def getSelectedFolds(self):
+        return parseFolds(self.foldsLineEdit.text) or ["0"]
+
+    def _areSelectedFoldsAvailable(self, parameter) -> bool:
+        """
+        Check the selected folds against the folds of the model weights. Displays an error if some are missing.
+        """
+        folds = availableFolds(parameter.modelPath)
+        missingFolds = [fold for fold in self.getSelectedFolds() if folds and fold not in folds]
+        if missingFolds:
+            slicer.util.errorDisplay(
+                f"Folds {', '.join(missingFolds)} are not available in the model weights.\n"
+                f"Available folds : {', '.join(folds)}"
+            )
+        return not missingFolds
+
+    def _nParallelFoldWorkers(self, parameter) -> int:
+        """
+        :returns: Number of parallel fold workers. Folds are only segmented in parallel on CPU. The ONNX Runtime workers
+            write the fold probabilities, which are averaged. The nnU-Net workers only provide the fold labels, merged
+            by majority voting, and an even number of folds is ensembled by nnU-Net in a single process instead.
+        """
+        if self._effectiveDevice(parameter) != "cpu" or not isLabelArrayReadingAvailable():
+            return 1
+
+        nFolds = len(parseFolds(parameter.folds))
+        if not self.isOnnxBackendSelected() and not isLabelVotingReliable(nFolds):
+            return 1
+        return min(self.foldWorkersSpinBox.value, nFolds)
+
+    def _foldEnsembleMethod(self, parameter):
+        """
+        :returns: Merge method of the parallel fold workers or None if the folds are ensembled by nnU-Net.
+        """
+        if self._nParallelFoldWorkers(parameter) < 2:
+            return None
+        return "probabilityAverage" if self.isOnnxBackendSelected() else "labelVote"
+
+    def _selectInferenceLogic(self, parameter):
+        """
+        :returns: Fold ensemble logic if several folds are segmented in parallel, the segmentation logic of the
+            selected backend otherwise. nnU-Net then ensembles the folds sequentially in a single process.
+        """
+        nWorkers = self._nParallelFoldWorkers(parameter)
+        if nWorkers < 2:
+            return self._getOnnxLogic(self.getSelectedOnnxPrecision()) if self.isOnnxBackendSelected() else self.logic
+
+        # Ensemble workers are reused between runs and are specific to the backend
+        backend = self.getSelectedBackend()
+        if backend not in self._foldEnsembleLogics:
+            self._foldEnsembleLogics[backend] = FoldEnsembleLogic(self._createWorkerLogic)
+            self._connectSegmentationLogic(self._foldEnsembleLogics[backend])
+        self._foldEnsembleLogics[backend].nWorkers = nWorkers
+        self.onProgressInfo(f"Segmenting folds {parameter.folds} with {nWorkers} parallel workers.")
+        return self._foldEnsembleLogics[backend]
+
+    def _createWorkerLogic(self):
+        if self.isOnnxBackendSelected():
+            return self._createOnnxLogic(self.getSelectedOnnxPrecision(), saveProbabilities=True)
+        return type(self.logic)()
+
+    def _getOnnxLogic(self, precision):
+        if precision not in self._onnxLogics:
+            self._onnxLogics[precision] = self._createOnnxLogic(precision)
+            self._connectSegmentationLogic(self._onnxLogics[precision])
+        return self._onnxLogics[precision]
+
+    @staticmethod
+    def _createOnnxLogic(precision, saveProbabilities=False):
+        return OnnxSegmentationLogic(precision, saveProbabilities)
+
+    def isOnnxBackendSelected(self) -> bool:
+        return self.deviceComboBox.currentText in self.onnxPrecisions
+
+    def getSelectedOnnxPrecision(self):
+        """
+        :returns: Network precision of the selected ONNX Runtime device or None if the PyTorch backend is selected.
+        """
+        return self.onnxPrecisions.get(self.deviceComboBox.currentText)
+
+    def getSelectedBackend(self) -> str:
+        if not self.isOnnxBackendSelected():
+            return "pytorch"
+        precision = self.getSelectedOnnxPrecision()
+        return "onnxruntime" if precision == "float32" else f"onnxruntime-{precision}"
+
+    def getSelectedNNUNetDevice(self) -> str:
+        """
+        :returns: Device of the nnU-Net parameter. The ONNX Runtime backend runs on CPU.
+        """
+        return "cpu" if self.isOnnxBackendSelected() else self.deviceComboBox.currentText
+
+    @staticmethod
+    def _effectiveDevice(parameter):
+        return parameter.device if parameter.isSelectedDeviceAvailable() else "cpu"
+
+    def _planMemoryBudget(self, parameter, volumeNode):
+        """
+        Choose the CPU inference strategy fitting the memory budget. The budget is shared by the parallel fold workers.
+        Volumes exceeding the budget are segmented slab by slab, with a single preprocessing and export worker.
+
+        :returns: Volume node to run the inference on.
+        """
+        self._clearSlabbedInference()
+        budget_GB = self.memoryBudget.effectiveBudget_GB()
+        if self._effectiveDevice(parameter) != "cpu" or budget_GB is None:
+            return volumeNode
+
+        plan = planInference(
+            volumeNode.GetImageData().GetDimensions()[::-1],
+            volumeNode.GetSpacing()[::-1],
+            budget_GB,
+            targetSpacing=readTargetSpacing(parameter.modelPath),
+            nWorkers=self._nParallelFoldWorkers(parameter)
+        )
+        if plan.nSlabs > 1 and not isLabelArrayReadingAvailable():
+            self.onProgressInfo(
+                f"{plan.describe()} Slabbed inference requires nibabel. Running the inference on the whole volume."
+            )
+            return volumeNode
+
+        self.onProgressInfo(plan.describe())
+        if plan.nSlabs == 1:
+            return volumeNode
+
+        for name in ["nProcessPreprocessing", "nProcessSegmentationExport"]:
+            if hasattr(parameter, name):
+                setattr(parameter, name, 1)
+
+        # Slab results are accumulated in memory mapped labels and not written to a result file to cache
+        self._pendingCacheKey = None
+        self._slabbedInference = SlabbedInference(volumeNode, plan)
+        self.onProgressInfo(f"Starting inference of slab 1 / {plan.nSlabs}...")
+        return self._slabbedInference.startNextSlab()
+
+    def _continueSlabbedInference(self) -> bool:
+        """
+        Accumulate the finished slab labels and start the inference of the next slab.
+
+        :returns: True if the next slab inference was started, False once all slabs are done or on error.
+        """
+        slabbedInference = self._slabbedInference
+        try:
+            with self._blockingStage("Accumulate slab", "results"):
+                slabbedInference.addSlabResult(readLabelArray(inferenceResultPath(self._activeLogic)))
+        except RuntimeError as e:
+            self.onProgressInfo(f"Error loading slab results :\n{e}")
+            return False
+
+        if not slabbedInference.hasNextSlab():
+            return False
+
+        iSlab = slabbedInference.iSlab + 2
+        self.onProgressInfo(f"Starting inference of slab {iSlab} / {slabbedInference.nSlabs}...")
+        self._startInference(slabbedInference.startNextSlab(), slab=f"{iSlab} / {slabbedInference.nSlabs}")
+        return True
+
+    def _clearSlabbedInference(self):
+        if self._slabbedInference is not None:
+            self._slabbedInference.cleanup()
+        self._slabbedInference = None
+
+    def _setPreviewParameters(self, parameter):
+        """
+        Set the preview inference settings supported by the nnU-Net parameter. Previews only run the first fold.
+        """
+        parameter.folds = self.getSelectedFolds()[0]
+        getInferenceProfile(self.previewProfile).applyTo(parameter)
+
+    def _createInferenceInput(self, isPreview=False):
+        """
+        Crop the current volume to its anatomy bounding box if cropping is enabled. Preview inputs are always cropped.
+
+        :returns: Volume node to run the inference on.
+        """
+        self._clearFieldOfViewCrop()
+        volumeNode = self.getCurrentVolumeNode()
+        if not self.cropCheckBox.isChecked() and not isPreview:
+            return volumeNode
+
+        with self._blockingStage("Field of view cropping", "inference"):
+            crop = FieldOfViewCrop.fromVolume(volumeNode, self.cropMargin_mm)
+            if crop is None:
+                self.onProgressInfo("Field of view not cropped : the anatomy fills most of the volume.")
+                return volumeNode
+            crop.createCroppedVolumeNode()
+
+        self._fieldOfViewCrop = crop
+        self.onProgressInfo(
+            f"Field of view cropped to the anatomy : {crop.nCroppedVoxels:,} / {crop.nOriginalVoxels:,} voxels "
+            f"({crop.reduction:.0%} reduction)."
+        )
+        return crop.croppedVolumeNode
+
+    def _clearFieldOfViewCrop(self):
+        if self._fieldOfViewCrop is not None:
+            self._fieldOfViewCrop.cleanup()
+        self._fieldOfViewCrop = None
+
+    def _reportFieldOfViewCropTimeSaved(self):
+        if self._fieldOfViewCrop is None or self._inferenceStartTime is None:
+            return
+
+        inferenceTime_s = time.perf_counter() - self._inferenceStartTime
+        self.onProgressInfo(
+            f"Inference on the cropped field of view took {inferenceTime_s:.1f} s. "
+            f"Estimated time saved : {self._fieldOfViewCrop.estimatedTimeSaved_s(inferenceTime_s):.1f} s."
+        )
+
+    def _endInferenceSpan(self):
+        self.tracer.end(self._inferenceSpan)
+        self._inferenceSpan = None
+
+    def _computeCacheKey(self, parameter, isPreview=False):
+        """
+        :returns: Result cache key of the current volume and parameter or None if the cache is disabled.
+        """
+        if not self.resultCache.isEnabled:
+            return None
+
+        device = parameter.device if parameter.isSelectedDeviceAvailable() else "cpu"
+        # Settings which don't change the results are not part of the key
+        ignoredNames = ["modelPath", "device", "nProcessPreprocessing", "nProcessSegmentationExport"]
+        parameters = {name: value for name, value in vars(parameter).items() if name not in ignoredNames}
+        if self.cropCheckBox.isChecked() or isPreview:
+            parameters["cropMargin_mm"] = self.cropMargin_mm
+        if isPreview:
+            parameters["isPreview"] = True
+        foldEnsembleMethod = self._foldEnsembleMethod(parameter)
+        if foldEnsembleMethod is not None:
+            parameters["foldEnsemble"] = foldEnsembleMethod
+        if self.isOnnxBackendSelected():
+            parameters["backend"] = self.getSelectedBackend()
+        return self.resultCache.computeKey(
+            self.getCurrentVolumeNode(),
+            self._dependencyChecker.getLastDownloadedWeights(),
+            device,
+            parameters
+        )
+
+    def _loadCachedSegmentation(self, cacheKey) -> bool:
+        """
+        Load the segmentation results from the result cache if available.
+
+        :returns: True if the results were found in the cache, False otherwise.
+        """
+        if cacheKey is None or self.resultCache.get(cacheKey) is None:
+            return False
+
+        self.onProgressInfo("Segmentation found in result cache. Skipping inference.")
+        self._onSegmentationResultsAvailable(
+            lambda: self._readResults(self.resultCache.get(cacheKey), lambda: self.resultCache.load(cacheKey))
+        )
+        return True
 
     def onInputChanged(self, *_):
         """
@@ -278,6 +1123,7 @@ class SegmentationWidget(qt.QWidget):
         """
         volumeNode = self.getCurrentVolumeNode()
         self.applyButton.setEnabled(volumeNode is not None)
+        self._updateRefineButton()
         slicer.util.setSliceViewerLayers(background=volumeNode)
         slicer.util.resetSliceViews()
         self._restoreProcessedSegmentation()
@@ -343,37 +1189,119 @@ class SegmentationWidget(qt.QWidget):
         """
         Restore apply button visibility, load the segmentation results if the inference was not manually stopped.
         """
+        self._endInferenceSpan()
         if self.isStopping:
             self._setApplyVisible(True)
             return
 
+        if self._slabbedInference is not None and self._continueSlabbedInference():
+            return
+
+        self._reportFieldOfViewCropTimeSaved()
+        self._onSegmentationResultsAvailable(self._loadInferenceResults)
+
+    def _onSegmentationResultsAvailable(self, loadSegmentationF):
+        """
+        Load the segmentation results using the input loading function and start the next queued volume if any.
+        """
         try:
             self.onProgressInfo("Loading inference results...")
-            self._loadSegmentationResults()
+            with self._blockingStage("Load results", "results"):
+                self._loadSegmentationResults(loadSegmentationF)
             self.onProgressInfo("Inference ended successfully.")
         except RuntimeError as e:
-            slicer.util.errorDisplay(e)
+            if self.segmentationQueue.isEmpty():
+                slicer.util.errorDisplay(e)
             self.onProgressInfo(f"Error loading results :\n{e}")
         finally:
-            self._setApplyVisible(True)
+            if not self._continueAfterResults():
+                self._setApplyVisible(True)
+
+    def _loadInferenceResults(self):
+        """
+        Load the segmentation results from the logic segmentation folder and store them in the result cache.
+        """
+        resultPath = None if self._slabbedInference is not None else inferenceResultPath(self._activeLogic)
+        with self._blockingStage("Load segmentation", "results"):
+            if self._slabbedInference is not None:
+                results = self._slabbedInference.result()
+            else:
+                results = self._readResults(resultPath, self._activeLogic.loadSegmentation)
+
+        # Results inferred on the cropped volume are pasted back in the input volume geometry
+        crop, self._fieldOfViewCrop = self._fieldOfViewCrop, None
+        if crop is not None:
+            crop.cleanup()
+            if isinstance(results, LabelArrayResult):
+                results = crop.pasteLabelArray(results)
+
+        if resultPath is None and not isinstance(results, LabelArrayResult):
+            storageNode = results.GetStorageNode() if results else None
+            resultPath = storageNode.GetFileName() if storageNode else None
+        self._storeInResultCache(resultPath)
+        return results
 
-    def _loadSegmentationResults(self):
+    @staticmethod
+    def _readResults(resultPath, loadSegmentationNodeF):
         """
-        Load the segmentation results from the logic segmentation folder. Update the segmentation display names and
-        run some simple post-processing on the segmentation.
+        Read the result file label array without loading it in the scene if possible. Otherwise, falls back to loading
+        the results as a segmentation node.
+
+        :returns: LabelArrayResult or vtkMRMLSegmentationNode
+        """
+        if resultPath is not None and isLabelArrayReadingAvailable():
+            return readLabelArray(resultPath)
+        return loadSegmentationNodeF()
+
+    def _storeInResultCache(self, resultPath):
+        cacheKey, self._pendingCacheKey = self._pendingCacheKey, None
+        if cacheKey is None or resultPath is None:
+            return
+
+        try:
+            self.resultCache.store(cacheKey, resultPath)
+            self._updateCacheUsage()
+        except OSError as e:
+            self.onProgressInfo(f"Failed to store results in cache :\n{e}")
+
+    def _loadSegmentationResults(self, loadSegmentationF=None):
+        """
+        Load the segmentation results from the logic segmentation folder or using the input loading function.
+        Update the segmentation display names and run some simple post-processing on the segmentation.
         """
         currentSegmentation = self.getCurrentSegmentationNode()
-        segmentationNode = self.logic.loadSegmentation()
-        segmentationNode.SetName(self.getCurrentVolumeNode().GetName() + "_Segmentation")
-        if currentSegmentation is not None:
-            self._copySegmentationResultsToExistingNode(currentSegmentation, segmentationNode)
+        results = (loadSegmentationF or self._loadInferenceResults)()
+        if isinstance(results, LabelArrayResult):
+            self._fillSegmentationResults(currentSegmentation, results)
+        elif currentSegmentation is not None:
+            results.SetName(self.getCurrentVolumeNode().GetName() + "_Segmentation")
+            self._copySegmentationResultsToExistingNode(currentSegmentation, results)
         else:
-            self.segmentationNodeSelector.setCurrentNode(segmentationNode)
+            results.SetName(self.getCurrentVolumeNode().GetName() + "_Segmentation")
+            self.segmentationNodeSelector.setCurrentNode(results)
         slicer.app.processEvents()
-        self._updateSegmentationDisplay()
-        self._postProcessSegments()
+        with self._blockingStage("Update segmentation display", "results"):
+            self._updateSegmentationDisplay()
+
+        # Previews are replaced by the full resolution results and are not worth post-processing
+        if not self._isPreviewRun:
+            self._postProcessSegments()
         self._storeProcessedSegmentation()
 
+    def _fillSegmentationResults(self, currentSegmentation, results: LabelArrayResult):
+        """
+        Fill the current segmentation node labelmap in place with the label array results. Creates a new segmentation
+        node if no segmentation is selected.
+        """
+        segmentationNode = currentSegmentation
+        if segmentationNode is None:
+            segmentationNode = slicer.mrmlScene.AddNewNodeByClass("vtkMRMLSegmentationNode")
+            segmentationNode.SetName(self.getCurrentVolumeNode().GetName() + "_Segmentation")
+
+        fillSegmentationFromLabelArray(segmentationNode, results)
+        if currentSegmentation is None:
+            self.segmentationNodeSelector.setCurrentNode(segmentationNode)
+
     @staticmethod
     def _copySegmentationResultsToExistingNode(currentSegmentation, segmentationNode):
         """
@@ -387,8 +1315,7 @@ class SegmentationWidget(qt.QWidget):
 
     @staticmethod
     def toRGB(colorString):
-        color = qt.QColor(colorString)
-        return color.redF(), color.greenF(), color.blueF()
+        return SegmentationPostProcessor.toRGB(colorString)
 
     def _updateSegmentationDisplay(self):
         """
@@ -400,67 +1327,60 @@ class SegmentationWidget(qt.QWidget):
             return
 
         self._initializeSegmentationNodeDisplay(segmentationNode)
-        segmentation = segmentationNode.GetSegmentation()
-        labels = ["Maxilla & Upper Skull", "Mandible", "Upper Teeth", "Lower Teeth", "Mandibular canal"]
-        colors = [self.toRGB(c) for c in ["#E3DD90", "#D4A1E6", "#DC9565", "#EBDFB4", "#D8654F"]]
-        opacities = [0.45, 0.45, 1.0, 1.0, 1.0]
-        segmentIds = [f"Segment_{i + 1}" for i in range(len(labels))]
-
-        segmentationDisplayNode = self.getCurrentSegmentationNode().GetDisplayNode()
-        for segmentId, label, color, opacity in zip(segmentIds, labels, colors, opacities):
-            segment = segmentation.GetSegment(segmentId)
-            if segment is None:
-                continue
-
-            segment.SetName(label)
-            segment.SetColor(*color)
-            segmentationDisplayNode.SetSegmentOpacity3D(segmentId, opacity)
-
+        SegmentationPostProcessor.setSegmentNamesAndColors(segmentationNode)
+        self.surfaceCache.applyTo(segmentationNode)
         self.show3DButton.setChecked(True)
         slicer.util.resetThreeDViews()
 
+    def onSurfaceSmoothingChanged(self, value):
+        """
+        Update the smoothing factor of the current segmentation and its displayed closed surfaces using the surface
+        cache. The show 3D button smoothing slider is only synchronized as it would otherwise regenerate the surfaces.
+        """
+        smoothingSlider = self.show3DButton.findChild("ctkSliderWidget")
+        wasBlocked = smoothingSlider.blockSignals(True)
+        smoothingSlider.setValue(value)
+        smoothingSlider.blockSignals(wasBlocked)
+
+        segmentationNode = self.getCurrentSegmentationNode()
+        if not segmentationNode:
+            return
+
+        segmentationNode.GetSegmentation().SetConversionParameter("Smoothing factor", str(value))
+        if self.show3DButton.checked:
+            with slicer.util.tryWithErrorDisplay("Failed to update the segmentation surfaces.", waitCursor=True):
+                self.surfaceCache.applyTo(segmentationNode)
+
     def _postProcessSegments(self):
         """
         Remove small islands on all segments except mandibular canals.
         """
+        segmentationNode = self.getCurrentSegmentationNode()
+        if not segmentationNode:
+            return
 
-        self.onProgressInfo("Post processing results...")
-        self._removeSmallIsland("Segment_1")
-        self._removeSmallIsland("Segment_2")
-        self._removeSmallIsland("Segment_3")
-        self._removeSmallIsland("Segment_4")
-        self.onProgressInfo("Post processing done.")
+        self._postProcessor.minimumIslandSize_mm3 = self._minimumIslandSize_mm3
+        with self.surfaceCache.modifyingLabelmaps(segmentationNode):
+            self._postProcessor.process(segmentationNode, self.getCurrentVolumeNode())
 
     def _keepLargestIsland(self, segmentId):
         """
         Keeps largest voxel islands for input segmentId.
         """
-        segment = self._getSegment(segmentId)
-        if not segment:
-            return
-
-        self.onProgressInfo(f"Keep largest region for {segment.GetName()}...")
-        self.segmentEditorWidget.setCurrentSegmentID(segmentId)
-        effect = self.segmentEditorWidget.effectByName("Islands")
-        effect.setParameter("Operation", SegmentEditorEffects.KEEP_LARGEST_ISLAND)
-        effect.self().onApply()
+        segmentationNode = self.getCurrentSegmentationNode()
+        if segmentationNode:
+            with self.surfaceCache.modifyingLabelmaps(segmentationNode):
+                self._postProcessor.keepLargestIsland(segmentationNode, self.getCurrentVolumeNode(), segmentId)
 
     def _removeSmallIsland(self, segmentId):
         """
         Removes small islands for input segmentId.
         """
-        segment = self._getSegment(segmentId)
-        if not segment:
-            return
-
-        self.onProgressInfo(f"Remove small voxels for {segment.GetName()}...")
-        self.segmentEditorWidget.setCurrentSegmentID(segmentId)
-        voxelSize_mm3 = np.cumprod(self.getCurrentVolumeNode().GetSpacing())[-1]
-        minimumIslandSize = int(np.ceil(self._minimumIslandSize_mm3 / voxelSize_mm3))
-        effect = self.segmentEditorWidget.effectByName("Islands")
-        effect.setParameter("Operation", SegmentEditorEffects.REMOVE_SMALL_ISLANDS)
-        effect.setParameter("MinimumSize", minimumIslandSize)
-        effect.self().onApply()
+        segmentationNode = self.getCurrentSegmentationNode()
+        if segmentationNode:
+            self._postProcessor.minimumIslandSize_mm3 = self._minimumIslandSize_mm3
+            with self.surfaceCache.modifyingLabelmaps(segmentationNode):
+                self._postProcessor.removeSmallIsland(segmentationNode, self.getCurrentVolumeNode(), segmentId)
 
     def _getSegment(self, segmentId):
         segmentationNode = self.getCurrentSegmentationNode()
@@ -472,20 +1392,44 @@ class SegmentationWidget(qt.QWidget):
         """
         Displays error message in case of inference errors if inference was not manually stopped.
         """
+        self._endInferenceSpan()
+        self._clearFieldOfViewCrop()
+        self._clearSlabbedInference()
+        self._isPreviewRun = False
         if self.isStopping:
             return
 
+        if self._continueQueue():
+            self.onProgressInfo("Encountered error during inference :\n" + errorMsg)
+            return
+
         self._setApplyVisible(True)
         slicer.util.errorDisplay("Encountered error during inference :\n" + errorMsg)
 
+    @contextmanager
+    def _blockingStage(self, name, category):
+        """
+        Trace a stage blocking the GUI thread. The pending progress messages are written when the stage starts and
+        ends, as the log flush timer can't expire while the stage is running.
+        """
+        with self._logSink.blockingStage(), self.tracer.span(name, category):
+            yield
+
     def onProgressInfo(self, infoMsg):
         """
         Prints progress information in module log console and in separate log dialog.
+        Messages are buffered and written in batches at a capped rate.
+        """
+        self._logSink.append(infoMsg)
+
+    def _writeInfoLogs(self, timedLines):
+        """
+        Write a batch of progress lines to the module log console and to the session logs. Processes the application
+        events once per batch to refresh the console during blocking operations.
         """
-        infoMsg = self.removeImageIOError(infoMsg)
-        self.currentInfoTextEdit.insertPlainText(infoMsg + "\n")
+        self.currentInfoTextEdit.insertPlainText("".join(f"{line}\n" for _, line in timedLines))
         self.moveTextEditToEnd(self.currentInfoTextEdit)
-        self.insertDatedInfoLogs(infoMsg)
+        self.logStore.append(timedLines)
         slicer.app.processEvents()
 
     @staticmethod
@@ -495,32 +1439,79 @@ class SegmentationWidget(qt.QWidget):
         """
         return "\n".join([msg for msg in infoMsg.strip().splitlines() if "Error ImageIO factory" not in msg])
 
-    def insertDatedInfoLogs(self, infoMsg):
-        now = qt.QDateTime.currentDateTime().toString("yyyy/MM/dd hh:mm:ss.zzz")
-        self.fullInfoLogs.extend([f"{now} :: {msgLine}" for msgLine in infoMsg.splitlines()])
-
     def showInfoLogs(self):
         """
-        Displays all logs from previous runs in a separate dialog.
+        Displays the logs from previous runs in a separate paged dialog with search and severity filtering.
         """
+        self._logSink.flush()
         dialog = qt.QDialog()
         layout = qt.QVBoxLayout(dialog)
 
-        textEdit = qt.QTextEdit()
-        textEdit.setReadOnly(True)
-        textEdit.append("\n".join(self.fullInfoLogs))
-        textEdit.setLineWrapMode(qt.QTextEdit.NoWrap)
-        self.moveTextEditToEnd(textEdit)
-        layout.addWidget(textEdit)
+        tabWidget = qt.QTabWidget(dialog)
+        tabWidget.addTab(LogViewerWidget(self.logStore, dialog), "Logs")
+        tabWidget.addTab(self._createTimingsWidget(dialog), "Timings")
+        layout.addWidget(tabWidget)
         dialog.setWindowFlags(qt.Qt.WindowCloseButtonHint)
         dialog.resize(slicer.util.mainWindow().size * .7)
         dialog.exec()
 
+    def _createTimingsWidget(self, parent):
+        """
+        Create the table summarizing the recorded stage timings with buttons to save the trace or clear it.
+        """
+        timingsWidget = qt.QWidget(parent)
+        timingsLayout = qt.QVBoxLayout(timingsWidget)
+
+        headers = ["Stage", "Count", "Total (ms)", "Mean (ms)", "Max (ms)"]
+        table = qt.QTableWidget(timingsWidget)
+        table.setColumnCount(len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setEditTriggers(qt.QAbstractItemView.NoEditTriggers)
+        table.verticalHeader().setVisible(False)
+        table.horizontalHeader().setSectionResizeMode(0, qt.QHeaderView.Stretch)
+
+        def fillTable():
+            summary = self.tracer.summary()
+            table.setRowCount(len(summary))
+            for row, stage in enumerate(summary):
+                values = [stage.name, str(stage.count)] + [
+                    f"{value:.1f}" for value in (stage.total_ms, stage.mean_ms, stage.max_ms)
+                ]
+                for column, value in enumerate(values):
+                    table.setItem(row, column, qt.QTableWidgetItem(value))
+
+        def clearTrace(*_):
+            self.tracer.clear()
+            fillTable()
+
+        fillTable()
+        buttonLayout = qt.QHBoxLayout()
+        buttonLayout.addStretch()
+        buttonLayout.addWidget(createButton("Save trace...", callback=self.onSaveTraceClicked, parent=timingsWidget))
+        buttonLayout.addWidget(createButton("Clear", callback=clearTrace, parent=timingsWidget))
+        timingsLayout.addWidget(table)
+        timingsLayout.addLayout(buttonLayout)
+        return timingsWidget
+
+    def onSaveTraceClicked(self, *_):
+        """
+        Save the recorded stage timings in the Chrome trace format, which can be opened in chrome://tracing or Perfetto.
+        """
+        filePath = qt.QFileDialog.getSaveFileName(
+            self, "Save trace", "dental_segmentator_trace.json", "Chrome trace (*.json)"
+        )
+        if not filePath:
+            return
+
+        with slicer.util.tryWithErrorDisplay(f"Failed to save trace to {filePath}."):
+            self.tracer.saveChromeTrace(filePath)
+
     @staticmethod
     def moveTextEditToEnd(textEdit):
         textEdit.verticalScrollBar().setValue(textEdit.verticalScrollBar().maximum)
 
     def getSelectedExportFormats(self):
+        self.exportPanel.widget()
         selectedFormats = ExportFormat(0)
         checkBoxes = {
             self.objCheckBox: ExportFormat.OBJ,
@@ -551,76 +1542,75 @@ class SegmentationWidget(qt.QWidget):
             return
 
         with slicer.util.tryWithErrorDisplay(f"Export to {folderPath} failed.", waitCursor=True):
-            self.exportSegmentation(segmentationNode, folderPath, selectedFormats)
-            slicer.util.infoDisplay(f"Export successful to {folderPath}.")
+            self.startExport(segmentationNode, folderPath, selectedFormats)
 
-    def exportSegmentation(self, segmentationNode, folderPath, selectedFormats):
-        for closedSurfaceExport in [ExportFormat.STL, ExportFormat.OBJ]:
-            if selectedFormats & closedSurfaceExport:
-                slicer.vtkSlicerSegmentationsModuleLogic.ExportSegmentsClosedSurfaceRepresentationToFiles(
-                    folderPath,
-                    segmentationNode,
-                    None,
-                    closedSurfaceExport.name,
-                    True,
-                    1.0,
-                    False
-                )
-
-        if selectedFormats & ExportFormat.NIFTI:
-            slicer.vtkSlicerSegmentationsModuleLogic.ExportSegmentsBinaryLabelmapRepresentationToFiles(
-                folderPath,
-                segmentationNode,
-                None,
-                "nii.gz"
-            )
-
-        if selectedFormats & ExportFormat.GLTF:
-            self._exportToGLTF(segmentationNode, folderPath)
-
-    def _exportToGLTF(self, segmentationNode, folderPath, tryInstall=True):
+    def startExport(self, segmentationNode, folderPath, selectedFormats):
         """
-        Export input segmentation node to glTF format.
-        Export relies on the SlicerOpenAnatomy extension. If extension is not available, export will try to install it
-        provided an internet connection is available.
-
-        Otherwise, export will fail and will ask users to install the extension manually to proceed.
+        Start the export in the background and display its progress. Success or failure is displayed once the export
+        is finished.
         """
+        self.exportPanel.widget()
+        self._exportJob = SegmentationExportJob(
+            segmentationNode, folderPath, selectedFormats, self.reductionFactorSlider.value, tracer=self.tracer,
+            surfaceCache=self.surfaceCache
+        )
+        self._exportJob.progress.connect(self._onExportProgress)
+        self._exportJob.progressInfo.connect(self._onExportProgressInfo)
+        self._exportJob.finished.connect(lambda: self._onExportFinished(folderPath))
+        self._setExportRunning(True)
         try:
-            from OpenAnatomyExport import OpenAnatomyExportLogic
-
-            logic = OpenAnatomyExportLogic()
-            shNode = slicer.vtkMRMLSubjectHierarchyNode.GetSubjectHierarchyNode(slicer.mrmlScene)
-            segmentationItem = shNode.GetItemByDataNode(self.segmentationNodeSelector.currentNode())
-            logic.exportModel(segmentationItem, folderPath, self.reductionFactorSlider.value, "glTF")
-        except ImportError:
-            if not tryInstall or not hasInternetConnection():
-                slicer.util.errorDisplay(
-                    f"Failed to export to glTF. Try installing the SlicerOpenAnatomy extension manually to continue."
-                )
-                return
-            self._installOpenAnatomyExtension()
-            self._exportToGLTF(segmentationNode, folderPath, tryInstall=False)
-
-    @classmethod
-    def _installOpenAnatomyExtension(cls):
-        # Install extension from extension manager
-        extensionManager = slicer.app.extensionsManagerModel()
-        extensionManager.setInteractive(False)
-        extName = "SlicerOpenAnatomy"
-        if extensionManager.isExtensionInstalled(extName):
-            return
+            self._exportJob.start()
+        except Exception:
+            self._setExportRunning(False)
+            raise
+
+    def onCancelExportClicked(self, *_):
+        if self._exportJob is not None:
+            self._exportJob.cancel()
+
+    def _setExportRunning(self, isRunning):
+        self.exportButton.setEnabled(not isRunning)
+        self.exportProgressWidget.setVisible(isRunning)
+        self.exportProgressBar.setValue(0)
+        self.exportProgressBar.setFormat("%p%")
+
+    def _onExportProgress(self, nFinished, nTotal):
+        self.exportProgressBar.setMaximum(max(nTotal, 1))
+        self.exportProgressBar.setValue(nFinished)
+
+    def _onExportProgressInfo(self, info):
+        """
+        Display the export steps blocking the GUI thread. Events are processed to paint the message before the step
+        starts.
+        """
+        self.exportProgressBar.setFormat(info or "%p%")
+        slicer.app.processEvents(qt.QEventLoop.ExcludeUserInputEvents)
 
-        success = extensionManager.installExtensionFromServer(extName, False, False)
-        if not success:
-            return
+    def _onExportFinished(self, folderPath):
+        job, self._exportJob = self._exportJob, None
+        self._setExportRunning(False)
+        if job.errors:
+            slicer.util.errorDisplay(
+                f"Export to {folderPath} failed.",
+                detailedText="\n".join(str(error) for error in job.errors)
+            )
+        elif job.isCancelled():
+            slicer.util.infoDisplay(f"Export to {folderPath} was cancelled.")
+        elif job.skipped:
+            slicer.util.infoDisplay(
+                f"Export successful to {folderPath}.\n"
+                f"{len(job.skipped)} file(s) unchanged since the last export were skipped.",
+                detailedText="Skipped: " + ", ".join(job.skipped)
+            )
+        else:
+            slicer.util.infoDisplay(f"Export successful to {folderPath}.")
 
-        # If install was successful, load the open anatomy export module to be used by the exporter
-        moduleName = "OpenAnatomyExport"
-        modulePath = extensionManager.extensionModulePaths(extName)[0] + f"/{moduleName}.py"
-        factory = slicer.app.moduleManager().factoryManager()
-        factory.registerModule(qt.QFileInfo(modulePath))
-        factory.loadModules([moduleName])
+    def exportSegmentation(self, segmentationNode, folderPath, selectedFormats):
+        self.exportPanel.widget()
+        exportSegmentation(
+            segmentationNode, folderPath, selectedFormats, self.reductionFactorSlider.value,
+            surfaceCache=self.surfaceCache
+        )
 
     @staticmethod
     def isNNUNetModuleInstalled():
@@ -636,6 +1626,13 @@ class SegmentationWidget(qt.QWidget):
         logic.progressInfo.connect(self.onProgressInfo)
         return logic.setupPythonRequirements()
 
+    def _installOnnxRuntimeIfNeeded(self) -> bool:
+        if installOnnxRuntime(self.onProgressInfo):
+            return True
+
+        slicer.util.errorDisplay(f"ONNX Runtime is required by the {self.deviceComboBox.currentText} device.")
+        return False
+
     def _createSlicerSegmentationLogic(self):
         if not self.isNNUNetModuleInstalled():
             return None
@@ -643,15 +1640,19 @@ class SegmentationWidget(qt.QWidget):
         from SlicerNNUNetLib import SegmentationLogic
         return SegmentationLogic()
 
-    def _connectSegmentationLogic(self):
-        if self.logic is None:
+    def _connectSegmentationLogic(self, logic=None):
+        logic = logic or self.logic
+        if logic is None:
             return
 
-        self.logic.progressInfo.connect(self.onProgressInfo)
-        self.logic.errorOccurred.connect(self.onInferenceError)
-        self.logic.inferenceFinished.connect(self.onInferenceFinished)
+        logic.progressInfo.connect(self.onProgressInfo)
+        logic.errorOccurred.connect(self.onInferenceError)
+        logic.inferenceFinished.connect(self.onInferenceFinished)
+
+    @staticmethod
+    def defaultLogFolder() -> Path:
+        return Path(slicer.app.temporaryPath).joinpath("DentalSegmentator", "Logs")
 
     @classmethod
     def nnUnetFolder(cls) -> Path:
-        fileDir = Path(__file__).parent
-        return fileDir.joinpath("..", "Resources", "ML").resolve()
+        return PythonDependencyChecker.nnUnetFolder()
@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+
+@dataclass
+class TraceSpan:
+    """
+    Time span of a processing stage. Times are in seconds relative to the tracer creation.
+    """
+    name: str
+    category: str
+    start_s: float
+    duration_s: float
+    threadId: int
+    threadName: str
+    args: dict = field(default_factory=dict)
+
+
+@dataclass
+class SpanSummary:
+    name: str
+    count: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+
+
+class Tracer:
+    """
+    Records the time spans of the segmentation stages to find out where the time of a run went.
+
+    Spans can be nested and recorded from any thread. Spans opened and closed in different callbacks, such as the
+    inference running between the start and finished signals of the logic, are recorded using begin and end.
+    Only the last maxSpans spans are kept.
+
+    The recorded spans can be summarized per stage name or saved in the Chrome trace event format, which can be opened
+    in chrome://tracing or https://ui.perfetto.dev for offline analysis.
+    """
+
+    def __init__(self, isEnabled=True, maxSpans=10000):
+        self.isEnabled = isEnabled
+        self._spans = deque(maxlen=maxSpans)
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name, category="", **args):
+        """
+        Context manager recording the time spent in its block.
+        """
+        token = self.begin(name, category, **args)
+        try:
+            yield
+        finally:
+            self.end(token)
+
+    def begin(self, name, category="", **args):
+        """
+        Start a span which will be recorded when the returned token is passed to end.
+        """
+        return name, category, args, time.perf_counter()
+
+    def end(self, token):
+        """
+        Record the span started by begin. Does nothing if token is None.
+        """
+        if token is None or not self.isEnabled:
+            return
+
+        name, category, args, startTime = token
+        currentThread = threading.current_thread()
+        span = TraceSpan(
+            name=name,
+            category=category,
+            start_s=startTime - self._origin,
+            duration_s=time.perf_counter() - startTime,
+            threadId=currentThread.ident,
+            threadName=currentThread.name,
+            args=args
+        )
+        with self._lock:
+            self._spans.append(span)
+
+    def spans(self) -> List[TraceSpan]:
+        with self._lock:
+            return sorted(self._spans, key=lambda s: s.start_s)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+    def summary(self) -> List[SpanSummary]:
+        """
+        :returns: Count and durations of the recorded spans grouped by name, ordered by first start time.
+        """
+        durations = {}
+        for span in self.spans():
+            durations.setdefault(span.name, []).append(span.duration_s * 1000)
+
+        return [
+            SpanSummary(name, len(values), sum(values), sum(values) / len(values), max(values))
+            for name, values in durations.items()
+        ]
+
+    def formatSummary(self) -> str:
+        """
+        :returns: Summary as a plain text table.
+        """
+        rows = [("Stage", "Count", "Total (ms)", "Mean (ms)", "Max (ms)")]
+        rows += [
+            (s.name, str(s.count), f"{s.total_ms:.1f}", f"{s.mean_ms:.1f}", f"{s.max_ms:.1f}") for s in self.summary()
+        ]
+        nameWidth = max(len(row[0]) for row in rows)
+        return "\n".join(row[0].ljust(nameWidth) + "".join(value.rjust(12) for value in row[1:]) for row in rows)
+
+    def toChromeTrace(self) -> dict:
+        """
+        :returns: Recorded spans as complete events of the Chrome trace event format.
+        """
+        pid = os.getpid()
+        spans = self.spans()
+        threadNames = {span.threadId: span.threadName for span in spans}
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": threadId, "args": {"name": threadName}}
+            for threadId, threadName in threadNames.items()
+        ]
+        events += [
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": span.start_s * 1e6,
+                "dur": span.duration_s * 1e6,
+                "pid": pid,
+                "tid": span.threadId,
+                "args": {key: str(value) for key, value in span.args.items()},
+            }
+            for span in spans
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def saveChromeTrace(self, path):
+        Path(path).write_text(json.dumps(self.toChromeTrace()))
+
+
+def traceSpan(tracer: Optional[Tracer], name, category="", **args):
+    """
+    :returns: Span context manager of the input tracer or an empty context manager if tracer is None.
+    """
+    return tracer.span(name, category, **args) if tracer is not None else nullcontext()
@@ -40,6 +40,49 @@ def addInCollapsibleLayout(childWidget, parentLayout, collapsibleText, isCollaps
     collapsibleButton.setLayout(collapsibleButtonLayout)
 
 
+class LazyWidget:
+    """
+    Widget built by createWidgetF and added to its parent layout the first time it is requested.
+    """
+
+    def __init__(self, createWidgetF, parentLayout, collapsibleButton=None):
+        self.collapsibleButton = collapsibleButton
+        self._createWidgetF = createWidgetF
+        self._parentLayout = parentLayout
+        self._widget = None
+
+    def isBuilt(self):
+        return self._widget is not None
+
+    def widget(self):
+        if self._widget is None:
+            self._widget = self._createWidgetF()
+            self._parentLayout.addWidget(self._widget)
+        return self._widget
+
+
+def addLazyInCollapsibleLayout(createWidgetF, parentLayout, collapsibleText, isCollapsed=True):
+    """
+    Same as addInCollapsibleLayout but the child widget is only created by createWidgetF when the collapsible button
+    is first expanded. If the button is initially expanded, the child widget is created once the event loop is idle.
+
+    :returns: LazyWidget giving access to the child widget. Requesting the widget builds it if needed.
+    """
+    import ctk
+    collapsibleButton = ctk.ctkCollapsibleButton()
+    collapsibleButton.text = collapsibleText
+    collapsibleButton.collapsed = isCollapsed
+    parentLayout.addWidget(collapsibleButton)
+    collapsibleButtonLayout = qt.QVBoxLayout()
+    collapsibleButton.setLayout(collapsibleButtonLayout)
+
+    lazyWidget = LazyWidget(createWidgetF, collapsibleButtonLayout, collapsibleButton)
+    collapsibleButton.contentsCollapsed.connect(lambda collapsed: None if collapsed else lazyWidget.widget())
+    if not isCollapsed:
+        qt.QTimer.singleShot(0, lazyWidget.widget)
+    return lazyWidget
+
+
 def set3DViewBackgroundColors(topColor, bottomColor):
     """ Set the background color as a gradient between the top and bottom colors
 
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Optional
+
+
+def fileSha256(filePath, blockSize=1024 * 1024) -> str:
+    """
+    :returns: Hexadecimal SHA-256 digest of the input file.
+    """
+    sha256 = hashlib.sha256()
+    with open(filePath, "rb") as f:
+        for block in iter(lambda: f.read(blockSize), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+class ChunkedDownloader:
+    """
+    Resumable download of a file using HTTP Range requests over several parallel connections.
+
+    The file is downloaded to a partial file next to the destination file. The downloaded chunks are recorded in a
+    journal file after each chunk write, so that an interrupted download, including after an application restart,
+    only downloads the missing chunks. The journal is discarded when the remote file size or ETag changed.
+
+    Servers not supporting Range requests are downloaded in one stream, without resume.
+    The downloaded file is moved to its destination only after its SHA-256 digest was checked.
+    """
+
+    def __init__(
+            self,
+            url: str,
+            destPath,
+            expectedSha256: Optional[str] = None,
+            nConnections: int = 4,
+            chunkSize: int = 8 * 1024 * 1024,
+            timeOut_sec: float = 30,
+            progressCallback: Optional[Callable[[int, int], None]] = None
+    ):
+        """
+        :param url: URL of the file to download.
+        :param destPath: Path of the downloaded file.
+        :param expectedSha256: Optional expected SHA-256 hexadecimal digest of the file.
+        :param nConnections: Number of parallel connections.
+        :param chunkSize: Size of the chunks in bytes requested by each connection.
+        :param timeOut_sec: Connection and read timeout of each request.
+        :param progressCallback: Optional function called with the number of downloaded bytes and the file size.
+            Always called from the thread calling download.
+        """
+        self.url = url
+        self.destPath = Path(destPath)
+        self.expectedSha256 = expectedSha256.lower() if expectedSha256 else None
+        self.nConnections = max(1, nConnections)
+        self.chunkSize = chunkSize
+        self.timeOut_sec = timeOut_sec
+        self.progressCallback = progressCallback or (lambda *_: None)
+
+        self._lock = threading.Lock()
+        self._sessions = threading.local()
+        self._journal = {}
+        self._nDownloadedBytes = 0
+
+    @property
+    def partialPath(self) -> Path:
+        return self.destPath.with_name(self.destPath.name + ".part")
+
+    @property
+    def journalPath(self) -> Path:
+        return self.destPath.with_name(self.destPath.name + ".journal.json")
+
+    def download(self) -> Path:
+        """
+        Download the file, resuming the previous partial download if any, and verify its SHA-256 digest.
+
+        :returns: Path of the downloaded file.
+        :raises RuntimeError: if the download failed or the downloaded file digest doesn't match the expected digest.
+            The partial download is kept on download failure and removed on digest mismatch.
+        """
+        self.destPath.parent.mkdir(parents=True, exist_ok=True)
+        size, etag, acceptsRanges = self._remoteFileInfo()
+
+        if size is None or not acceptsRanges:
+            self._discardPartialDownload()
+            self._downloadStream()
+        else:
+            self._downloadChunks(size, etag)
+
+        self._verifySha256()
+        os.replace(self.partialPath, self.destPath)
+        self.journalPath.unlink(missing_ok=True)
+        return self.destPath
+
+    def _session(self):
+        import requests
+
+        if not hasattr(self._sessions, "session"):
+            self._sessions.session = requests.Session()
+        return self._sessions.session
+
+    def _remoteFileInfo(self):
+        response = self._session().head(self.url, allow_redirects=True, timeout=self.timeOut_sec)
+        response.raise_for_status()
+        size = response.headers.get("Content-Length")
+        acceptsRanges = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+        return (int(size) if size is not None else None), response.headers.get("ETag"), acceptsRanges
+
+    def _downloadStream(self):
+        response = self._session().get(self.url, stream=True, timeout=self.timeOut_sec)
+        response.raise_for_status()
+        size = int(response.headers.get("Content-Length", 0))
+        with open(self.partialPath, "wb") as f:
+            for data in response.iter_content(1024 * 1024):
+                f.write(data)
+                self._nDownloadedBytes += len(data)
+                self.progressCallback(self._nDownloadedBytes, size)
+
+    def _downloadChunks(self, size, etag):
+        self._journal = self._readJournal(size, etag)
+        completedChunks = set(self._journal["completedChunks"])
+        chunks = [
+            (start, min(start + self.chunkSize, size) - 1)
+            for start in range(0, size, self.chunkSize)
+            if start not in completedChunks
+        ]
+
+        self._nDownloadedBytes = size - sum(end - start + 1 for start, end in chunks)
+        self.progressCallback(self._nDownloadedBytes, size)
+
+        with ThreadPoolExecutor(max_workers=min(self.nConnections, max(1, len(chunks)))) as executor:
+            futures = [executor.submit(self._downloadChunk, start, end) for start, end in chunks]
+            try:
+                for future in as_completed(futures):
+                    self._nDownloadedBytes += future.result()
+                    self.progressCallback(self._nDownloadedBytes, size)
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def _readJournal(self, size, etag) -> dict:
+        """
+        :returns: The journal of the previous download if it matches the remote file. Otherwise, creates a new empty
+            partial file and journal.
+        """
+        journal = {"url": self.url, "size": size, "etag": etag, "chunkSize": self.chunkSize, "completedChunks": []}
+        try:
+            previousJournal = json.loads(self.journalPath.read_text())
+            isSameFile = all(previousJournal.get(key) == journal[key] for key in ["url", "size", "etag", "chunkSize"])
+            if isSameFile and self.partialPath.exists() and self.partialPath.stat().st_size == size:
+                return previousJournal
+        except (OSError, ValueError):
+            pass
+
+        self._discardPartialDownload()
+        with open(self.partialPath, "wb") as f:
+            f.truncate(size)
+        self._writeJournal(journal)
+        return journal
+
+    def _writeJournal(self, journal):
+        tmpPath = self.journalPath.with_suffix(".tmp")
+        tmpPath.write_text(json.dumps(journal))
+        os.replace(tmpPath, self.journalPath)
+
+    def _downloadChunk(self, start, end) -> int:
+        response = self._session().get(
+            self.url, headers={"Range": f"bytes={start}-{end}"}, stream=True, timeout=self.timeOut_sec
+        )
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise RuntimeError(f"Server ignored the range request for {self.url}.")
+
+        data = response.content
+        if len(data) != end - start + 1:
+            raise RuntimeError(f"Incomplete chunk {start}-{end} received for {self.url}.")
+
+        with open(self.partialPath, "r+b") as f:
+            f.seek(start)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        with self._lock:
+            self._journal["completedChunks"].append(start)
+            self._writeJournal(self._journal)
+        return len(data)
+
+    def _verifySha256(self):
+        if self.expectedSha256 is None:
+            return
+
+        sha256 = fileSha256(self.partialPath)
+        if sha256 != self.expectedSha256:
+            self._discardPartialDownload()
+            raise RuntimeError(
+                f"Downloaded file SHA-256 mismatch for {self.url}.\n"
+                f"Expected {self.expectedSha256}, got {sha256}."
+            )
+
+    def _discardPartialDownload(self):
+        self.partialPath.unlink(missing_ok=True)
+        self.journalPath.unlink(missing_ok=True)
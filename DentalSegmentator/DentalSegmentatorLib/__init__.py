@@ -1,5 +1,30 @@
 from .Signal import Signal
+from .Tracing import Tracer, TraceSpan, SpanSummary
 from .PythonDependencyChecker import PythonDependencyChecker
-from .SegmentationWidget import SegmentationWidget, ExportFormat
+from .LogSink import BufferedLogSink
+from .LogStore import LogStore, LogViewerWidget
+from .DependencyPrefetch import DependencyPrefetcher, PrefetchResult
+from .ReleaseMetadataCache import ReleaseMetadataCache
+from .WeightsDownloader import ChunkedDownloader
+from .SegmentationCache import SegmentationResultCache
+from .SegmentationLoading import (
+    LabelArrayResult,
+    fillSegmentationFromLabelArray,
+    isLabelArrayReadingAvailable,
+    readLabelArray,
+    writeLabelArray,
+)
+from .FieldOfViewCropping import FieldOfViewCrop, computeAnatomyBoundingBox
+from .FoldEnsemble import FoldEnsembleLogic, mergeFoldLabels
+from .InferenceProfiles import InferenceProfile, defaultInferenceProfile, getInferenceProfile, inferenceProfiles
+from .CpuAutotune import CpuAutotuner, CpuProfile, CpuProfileStore
+from .MemoryBudget import InferenceMemoryPlan, MemoryBudget, SlabbedInference, planInference, readTargetSpacing
+from .OnnxSegmentation import OnnxSegmentationLogic
+from .SegmentationExport import ExportFormat, ExportManifest, SegmentationExportJob, exportSegmentation
+from .ClosedSurfaceCache import ClosedSurfaceCache
+from .SegmentationPostProcessing import SegmentationPostProcessor
+from .SegmentationQueueWidget import SegmentationQueue, SegmentationQueueWidget
+from .SegmentationWidget import SegmentationWidget
+from .BatchSegmentation import BatchSegmentationLogic, BatchCaseResult
 from .Utils import createButton
 from .IconPath import iconPath, icon
@@ -0,0 +1,96 @@
+import json
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import MagicMock
+
+import slicer
+
+from DentalSegmentatorLib import BatchSegmentationLogic, ExportFormat
+from .Utils import DentalSegmentatorTestCase, MockLogic, load_test_CT_volume
+
+
+class BatchSegmentationTestCase(DentalSegmentatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmpDir = TemporaryDirectory()
+        self.inputDir = Path(self.tmpDir.name).joinpath("input")
+        self.outputDir = Path(self.tmpDir.name).joinpath("output")
+        self.inputDir.mkdir()
+
+        volumeNode = load_test_CT_volume()
+        self.inputFiles = [self.inputDir.joinpath(f"case_{i}.nrrd") for i in range(2)]
+        for inputFile in self.inputFiles:
+            slicer.util.saveNode(volumeNode, inputFile.as_posix())
+        self._clearScene()
+
+        self.logic = MockLogic()
+        self.logic.startSegmentation.side_effect = lambda *_: self.logic.inferenceFinished()
+        self.batch = BatchSegmentationLogic(exportFormats=ExportFormat.STL, logic=self.logic)
+        self.batch.prepare = MagicMock(return_value=True)
+
+    def tearDown(self):
+        super().tearDown()
+        self.tmpDir.cleanup()
+
+    def test_finds_volume_files_in_input_directories(self):
+        self.inputDir.joinpath("notes.txt").write_text("not a volume")
+        self.assertEqual(BatchSegmentationLogic.findInputFiles(self.inputDir), self.inputFiles)
+
+    def test_processes_all_cases_and_writes_manifest(self):
+        results = self.batch.run(self.inputFiles, self.outputDir)
+
+        self.assertEqual([result.status for result in results], ["success", "success"])
+        self.assertEqual(self.logic.startSegmentation.call_count, 2)
+        for inputFile in self.inputFiles:
+            self.assertEqual(len(list(self.outputDir.joinpath(inputFile.stem).glob("*.stl"))), 5)
+
+        manifest = json.loads(BatchSegmentationLogic.manifestPath(self.outputDir).read_text())
+        self.assertEqual(manifest["summary"]["success"], 2)
+        self.assertIn("inference", manifest["cases"][0]["timings_s"])
+
+    def test_inputs_with_the_same_name_are_written_in_distinct_folders(self):
+        otherDir = Path(self.tmpDir.name).joinpath("other")
+        otherDir.mkdir()
+        otherFile = otherDir.joinpath(self.inputFiles[0].name)
+        otherFile.write_bytes(self.inputFiles[0].read_bytes())
+
+        results = self.batch.run([self.inputFiles[0], otherFile], self.outputDir)
+        caseFolders = [Path(result.outputFolder) for result in results]
+        self.assertEqual([folder.name for folder in caseFolders], ["case_0", "case_0_2"])
+        for caseFolder in caseFolders:
+            self.assertEqual(len(list(caseFolder.glob("*.stl"))), 5)
+
+        manifest = json.loads(BatchSegmentationLogic.manifestPath(self.outputDir).read_text())
+        self.assertEqual([case["outputFolder"] for case in manifest["cases"]], [f.as_posix() for f in caseFolders])
+
+    def test_case_folders_are_kept_between_runs(self):
+        otherFile = Path(self.tmpDir.name).joinpath(self.inputFiles[0].name)
+        otherFile.write_bytes(self.inputFiles[0].read_bytes())
+        self.batch.run([self.inputFiles[0]], self.outputDir)
+        results = self.batch.run([otherFile, self.inputFiles[0]], self.outputDir, skipProcessed=False)
+        self.assertEqual([Path(result.outputFolder).name for result in results], ["case_0_2", "case_0"])
+
+    def test_failed_case_does_not_stop_the_batch(self):
+        invalidFile = self.inputDir.joinpath("invalid.nrrd")
+        invalidFile.write_text("invalid volume")
+
+        results = self.batch.run([invalidFile, *self.inputFiles], self.outputDir)
+        self.assertEqual([result.status for result in results], ["failed", "success", "success"])
+        self.assertTrue(results[0].error)
+
+    def test_inference_errors_are_reported_in_manifest(self):
+        self.logic.startSegmentation.side_effect = lambda *_: self.logic.errorOccurred("inference error")
+        results = self.batch.run(self.inputFiles[:1], self.outputDir)
+        self.assertEqual(results[0].status, "failed")
+        self.assertIn("inference error", results[0].error)
+
+    def test_already_processed_cases_are_skipped(self):
+        self.batch.run(self.inputFiles, self.outputDir)
+        results = self.batch.run(self.inputFiles, self.outputDir)
+        self.assertEqual([result.status for result in results], ["skipped", "skipped"])
+        self.assertEqual(self.logic.startSegmentation.call_count, 2)
+
+    def test_does_not_leave_nodes_in_the_scene(self):
+        self.batch.run(self.inputFiles, self.outputDir)
+        self.assertEqual(len(list(slicer.mrmlScene.GetNodesByClass("vtkMRMLScalarVolumeNode"))), 0)
+        self.assertEqual(len(list(slicer.mrmlScene.GetNodesByClass("vtkMRMLSegmentationNode"))), 0)
@@ -0,0 +1,160 @@
+import numpy as np
+import slicer
+
+from DentalSegmentatorLib import ClosedSurfaceCache, SegmentationPostProcessor
+from .Utils import DentalSegmentatorTestCase, get_test_multi_label_path
+
+
+class ClosedSurfaceCacheTestCase(DentalSegmentatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = ClosedSurfaceCache()
+        self.segmentationNode = self.loadSegmentation()
+
+    @staticmethod
+    def loadSegmentation():
+        segmentationNode = slicer.util.loadSegmentation(get_test_multi_label_path())
+        SegmentationPostProcessor.setSegmentNamesAndColors(segmentationNode)
+        return segmentationNode
+
+    @staticmethod
+    def surfaces(segmentationNode):
+        segmentation = segmentationNode.GetSegmentation()
+        return {
+            segmentation.GetNthSegmentID(i): segmentation.GetNthSegment(i).GetRepresentation(
+                ClosedSurfaceCache.closedSurfaceName()
+            )
+            for i in range(segmentation.GetNumberOfSegments())
+        }
+
+    def eraseFirstVoxel(self, segmentId):
+        array = slicer.util.arrayFromSegmentBinaryLabelmap(self.segmentationNode, segmentId)
+        array[tuple(np.argwhere(array)[0])] = 0
+        slicer.util.updateSegmentBinaryLabelmapFromArray(array, self.segmentationNode, segmentId)
+
+    def test_generates_the_closed_surface_of_each_segment(self):
+        self.assertTrue(self.cache.applyTo(self.segmentationNode))
+        self.assertEqual(self.cache.nMisses, 5)
+        self.assertEqual(len(self.cache), 5)
+        self.assertTrue(
+            self.segmentationNode.GetSegmentation().ContainsRepresentation(ClosedSurfaceCache.closedSurfaceName())
+        )
+
+    def test_surfaces_are_the_same_as_the_segmentation_conversion(self):
+        self.cache.applyTo(self.segmentationNode)
+        expectedNode = self.loadSegmentation()
+        expectedNode.CreateClosedSurfaceRepresentation()
+
+        expectedSurfaces = self.surfaces(expectedNode)
+        for segmentId, polyData in self.surfaces(self.segmentationNode).items():
+            self.assertEqual(polyData.GetNumberOfPoints(), expectedSurfaces[segmentId].GetNumberOfPoints())
+            self.assertEqual(polyData.GetNumberOfPolys(), expectedSurfaces[segmentId].GetNumberOfPolys())
+
+    def test_applied_surfaces_are_not_replaced(self):
+        self.cache.applyTo(self.segmentationNode)
+        surfaces = self.surfaces(self.segmentationNode)
+
+        self.cache.applyTo(self.segmentationNode)
+        self.assertEqual(self.cache.nHits, 0)
+        self.assertEqual(self.cache.nMisses, 5)
+        for segmentId, polyData in self.surfaces(self.segmentationNode).items():
+            self.assertIs(polyData, surfaces[segmentId])
+
+    def test_surfaces_are_shared_between_segmentations_with_the_same_content(self):
+        self.cache.applyTo(self.segmentationNode)
+        self.cache.applyTo(self.loadSegmentation())
+        self.assertEqual(self.cache.nMisses, 5)
+        self.assertEqual(self.cache.nHits, 5)
+
+    def test_removed_surfaces_are_restored_from_the_cache(self):
+        self.cache.applyTo(self.segmentationNode)
+        self.segmentationNode.RemoveClosedSurfaceRepresentation()
+
+        self.cache.applyTo(self.segmentationNode)
+        self.assertEqual(self.cache.nHits, 5)
+        self.assertTrue(
+            self.segmentationNode.GetSegmentation().ContainsRepresentation(ClosedSurfaceCache.closedSurfaceName())
+        )
+
+    def test_only_modified_segments_are_generated_again(self):
+        self.cache.applyTo(self.segmentationNode)
+        self.eraseFirstVoxel("Segment_3")
+
+        self.cache.applyTo(self.segmentationNode)
+        self.assertEqual(self.cache.nMisses, 6)
+
+    def test_renamed_and_recolored_segments_reuse_their_surfaces(self):
+        self.cache.applyTo(self.segmentationNode)
+        segment = self.segmentationNode.GetSegmentation().GetSegment("Segment_3")
+        segment.SetColor(0, 0, 1)
+        segment.SetName("Renamed")
+        self.segmentationNode.RemoveClosedSurfaceRepresentation()
+
+        self.cache.applyTo(self.segmentationNode)
+        self.assertEqual(self.cache.nMisses, 5)
+        self.assertEqual(self.cache.nHits, 5)
+
+    def test_surfaces_are_shared_with_the_segmentation(self):
+        self.cache.applyTo(self.segmentationNode)
+        surfaces = self.surfaces(self.segmentationNode)
+        otherNode = self.loadSegmentation()
+        self.cache.applyTo(otherNode)
+
+        for segmentId, polyData in self.surfaces(otherNode).items():
+            self.assertIs(polyData, surfaces[segmentId])
+
+    def test_surfaces_modified_in_place_are_generated_again(self):
+        self.cache.applyTo(self.segmentationNode)
+        self.surfaces(self.segmentationNode)["Segment_3"].Modified()
+
+        self.cache.applyTo(self.loadSegmentation())
+        self.assertEqual(self.cache.nMisses, 6)
+        self.assertEqual(self.cache.nHits, 4)
+
+    def test_surfaces_are_cached_per_smoothing_factor(self):
+        segmentation = self.segmentationNode.GetSegmentation()
+        segmentation.SetConversionParameter("Smoothing factor", "0.2")
+        self.cache.applyTo(self.segmentationNode)
+        segmentation.SetConversionParameter("Smoothing factor", "0.8")
+        self.cache.applyTo(self.segmentationNode)
+        self.assertEqual(self.cache.nMisses, 10)
+
+        segmentation.SetConversionParameter("Smoothing factor", "0.2")
+        self.cache.applyTo(self.segmentationNode)
+        self.assertEqual(self.cache.nMisses, 10)
+        self.assertEqual(self.cache.nHits, 5)
+
+    def test_least_recently_used_surfaces_are_evicted(self):
+        self.cache.maxSize_MB = 0
+        segmentation = self.segmentationNode.GetSegmentation()
+        segmentation.SetConversionParameter("Smoothing factor", "0.2")
+        self.cache.applyTo(self.segmentationNode)
+        segmentation.SetConversionParameter("Smoothing factor", "0.8")
+        self.cache.applyTo(self.segmentationNode)
+        self.assertEqual(len(self.cache), 5)
+
+        segmentation.SetConversionParameter("Smoothing factor", "0.2")
+        self.cache.applyTo(self.segmentationNode)
+        self.assertEqual(self.cache.nMisses, 15)
+
+    def test_joint_smoothing_uses_the_segmentation_conversion(self):
+        self.segmentationNode.GetSegmentation().SetConversionParameter("Joint smoothing", "0.5")
+        self.assertTrue(self.cache.applyTo(self.segmentationNode))
+        self.assertEqual(len(self.cache), 0)
+        self.assertTrue(
+            self.segmentationNode.GetSegmentation().ContainsRepresentation(ClosedSurfaceCache.closedSurfaceName())
+        )
+
+    def test_surfaces_are_restored_after_labelmap_modifications(self):
+        self.cache.applyTo(self.segmentationNode)
+        with self.cache.modifyingLabelmaps(self.segmentationNode):
+            self.assertFalse(
+                self.segmentationNode.GetSegmentation().ContainsRepresentation(ClosedSurfaceCache.closedSurfaceName())
+            )
+            self.eraseFirstVoxel("Segment_3")
+
+        self.assertTrue(
+            self.segmentationNode.GetSegmentation().ContainsRepresentation(ClosedSurfaceCache.closedSurfaceName())
+        )
+        self.assertEqual(self.cache.nMisses, 6)
+        self.assertEqual(self.cache.nHits, 4)
@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from DentalSegmentatorLib import CpuAutotuner, CpuProfile, CpuProfileStore
+from DentalSegmentatorLib.CpuAutotune import candidateThreadCounts, createRepresentativeCrop
+from .Utils import DentalSegmentatorTestCase, MockLogic, load_test_CT_volume
+
+
+class CpuAutotuneTestCase(DentalSegmentatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.previousProfile = CpuProfileStore.load()
+
+    def tearDown(self):
+        super().tearDown()
+        CpuProfileStore.clear()
+        if self.previousProfile is not None:
+            CpuProfileStore.save(self.previousProfile)
+
+    def test_thread_counts_range_from_all_cpus_to_a_quarter(self):
+        self.assertEqual(candidateThreadCounts(8), [8, 6, 4, 2])
+        self.assertEqual(candidateThreadCounts(1), [1])
+
+    def test_profile_is_persisted_per_machine(self):
+        CpuProfileStore.clear()
+        self.assertIsNone(CpuProfileStore.load())
+
+        profile = CpuProfile(nThreads=2, nProcessPreprocessing=2, runtime_s=1.5)
+        CpuProfileStore.save(profile)
+        self.assertEqual(CpuProfileStore.load(), profile)
+
+    def test_profile_sets_parameter_worker_counts(self):
+        parameter = SimpleNamespace(nProcessPreprocessing=3, nProcessSegmentationExport=3)
+        CpuProfile(nThreads=1, nProcessPreprocessing=2, nProcessSegmentationExport=1).applyTo(parameter)
+        self.assertEqual(parameter.nProcessPreprocessing, 2)
+        self.assertEqual(parameter.nProcessSegmentationExport, 1)
+
+    def test_representative_crop_is_limited_in_size(self):
+        volumeNode = load_test_CT_volume()
+        crop = createRepresentativeCrop(volumeNode, size_mm=20)
+        for size, spacing in zip(crop.croppedShape, volumeNode.GetSpacing()[::-1]):
+            self.assertLessEqual(size * spacing, 20 + spacing)
+
+    def test_autotuner_benchmarks_each_setting_and_returns_fastest_profile(self):
+        logic = MockLogic()
+        autotuner = CpuAutotuner(logic, SimpleNamespace(folds="0"), MagicMock())
+        profiles = []
+        autotuner.finished.connect(profiles.append)
+        autotuner.start()
+
+        while not profiles:
+            logic.inferenceFinished()
+
+        self.assertEqual(logic.startSegmentation.call_count, len(autotuner.timings) + 1)
+        self.assertLessEqual(len(autotuner.timings), autotuner.nRuns)
+        fastest = min(autotuner.timings, key=autotuner.timings.get)
+        self.assertLessEqual(autotuner.timings[fastest], profiles[0].runtime_s + 1e-3)
+
+    def test_autotuner_reports_errors(self):
+        logic = MockLogic()
+        autotuner = CpuAutotuner(logic, SimpleNamespace(folds="0"), MagicMock())
+        errors = []
+        autotuner.errorOccurred.connect(errors.append)
+        autotuner.start()
+        logic.errorOccurred("Out of memory")
+        self.assertEqual(len(errors), 1)
+        self.assertIn("Out of memory", errors[0])
@@ -0,0 +1,56 @@
+import zipfile
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import MagicMock
+
+from DentalSegmentatorLib import PythonDependencyChecker
+from DentalSegmentatorLib.DependencyPrefetch import DependencyPrefetcher
+from .Utils import DentalSegmentatorTestCase
+
+
+class DependencyPrefetchTestCase(DentalSegmentatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmpDir = TemporaryDirectory()
+        self.noConnectionF = MagicMock(return_value=False)
+        self.deps = PythonDependencyChecker(
+            destWeightFolder=Path(self.tmpDir.name).joinpath("ML"),
+            hasInternetConnectionF=self.noConnectionF,
+            errorDisplayF=MagicMock()
+        )
+
+    def tearDown(self):
+        super().tearDown()
+        self.tmpDir.cleanup()
+
+    def runPrefetch(self):
+        prefetcher = DependencyPrefetcher(self.deps)
+        progress = MagicMock()
+        finished = MagicMock()
+        prefetcher.progress.connect(progress)
+        prefetcher.finished.connect(finished)
+        prefetcher.start()
+        prefetcher.wait()
+
+        progress.assert_called()
+        finished.assert_called_once()
+        return prefetcher.result
+
+    def test_missing_weights_download_failure_is_reported_without_display(self):
+        result = self.runPrefetch()
+        self.assertTrue(result.weightsMissing)
+        self.assertFalse(result.isReady())
+        self.assertTrue(result.errors)
+        self.deps.errorDisplay.assert_not_called()
+
+    def test_installed_weights_are_reported_present(self):
+        zipPath = Path(self.tmpDir.name).joinpath("weights.zip")
+        with zipfile.ZipFile(zipPath, "w") as f:
+            f.writestr("Dataset111/dataset.json", "{}")
+        self.deps.installWeightsVersion(zipPath, "v1", "url")
+        self.deps.activateWeightsVersion("v1")
+
+        result = self.runPrefetch()
+        self.assertFalse(result.weightsMissing)
+        self.assertFalse(result.weightsOutdated)
+        self.assertEqual(result.errors, [])
@@ -0,0 +1,67 @@
+import numpy as np
+import slicer
+import vtk
+
+from DentalSegmentatorLib import FieldOfViewCrop, LabelArrayResult, computeAnatomyBoundingBox
+from .Utils import DentalSegmentatorTestCase, load_test_CT_volume
+
+
+class FieldOfViewCroppingTestCase(DentalSegmentatorTestCase):
+    @staticmethod
+    def syntheticVolumeArray():
+        volumeArray = np.full((80, 100, 120), -1000, dtype=np.int16)
+        volumeArray[20:40, 30:70, 40:100] = 1000
+        return volumeArray
+
+    def test_bounding_box_contains_anatomy_and_margin(self):
+        boundingBox = computeAnatomyBoundingBox(self.syntheticVolumeArray(), (1, 1, 1), margin_mm=5)
+        for axisSlice, (start, stop) in zip(boundingBox, [(20, 40), (30, 70), (40, 100)]):
+            self.assertLessEqual(axisSlice.start, start - 5)
+            self.assertGreaterEqual(axisSlice.stop, stop + 5)
+
+        boundingBox = computeAnatomyBoundingBox(self.syntheticVolumeArray(), (1, 1, 1), margin_mm=50)
+        self.assertEqual(boundingBox, (slice(0, 80), slice(0, 100), slice(0, 120)))
+
+    def test_empty_volume_is_not_cropped(self):
+        volumeArray = np.zeros((40, 40, 40), dtype=np.int16)
+        boundingBox = computeAnatomyBoundingBox(volumeArray, (1, 1, 1))
+        self.assertEqual(boundingBox, (slice(0, 40), slice(0, 40), slice(0, 40)))
+
+    def test_cropped_volume_matches_input_geometry(self):
+        volumeNode = load_test_CT_volume()
+        dims = volumeNode.GetImageData().GetDimensions()[::-1]
+        boundingBox = tuple(slice(size // 4, size // 2) for size in dims)
+        crop = FieldOfViewCrop(volumeNode, boundingBox)
+        croppedNode = crop.createCroppedVolumeNode()
+
+        np.testing.assert_array_equal(
+            slicer.util.arrayFromVolume(croppedNode), slicer.util.arrayFromVolume(volumeNode)[boundingBox]
+        )
+
+        croppedIjkToRas = vtk.vtkMatrix4x4()
+        croppedNode.GetIJKToRASMatrix(croppedIjkToRas)
+        ijkToRas = vtk.vtkMatrix4x4()
+        volumeNode.GetIJKToRASMatrix(ijkToRas)
+        np.testing.assert_allclose(
+            croppedIjkToRas.MultiplyPoint([0, 0, 0, 1]),
+            ijkToRas.MultiplyPoint([dims[2] // 4, dims[1] // 4, dims[0] // 4, 1])
+        )
+
+        crop.cleanup()
+        self.assertFalse(slicer.mrmlScene.IsNodePresent(croppedNode))
+
+    def test_cropped_labels_are_pasted_in_input_geometry(self):
+        volumeNode = load_test_CT_volume()
+        dims = volumeNode.GetImageData().GetDimensions()[::-1]
+        boundingBox = tuple(slice(size // 4, size // 2) for size in dims)
+        crop = FieldOfViewCrop(volumeNode, boundingBox)
+        croppedShape = tuple(s.stop - s.start for s in boundingBox)
+
+        result = crop.pasteLabelArray(LabelArrayResult(np.ones(croppedShape, dtype=np.uint8), np.eye(4)))
+        self.assertEqual(result.labelArray.shape, dims)
+        self.assertEqual(result.labelArray.sum(), crop.nCroppedVoxels)
+        self.assertTrue(np.all(result.labelArray[boundingBox] == 1))
+        self.assertGreater(crop.reduction, 0.8)
+
+        with self.assertRaises(RuntimeError):
+            crop.pasteLabelArray(LabelArrayResult(np.ones(dims, dtype=np.uint8), np.eye(4)))
@@ -0,0 +1,125 @@
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from DentalSegmentatorLib import FoldEnsembleLogic, LabelArrayResult, isLabelArrayReadingAvailable
+from DentalSegmentatorLib.FoldEnsemble import (
+    availableFolds,
+    cappedThreads,
+    isLabelVotingReliable,
+    mergeFoldLabels,
+    mergeFoldProbabilities,
+    parseFolds,
+)
+from .Utils import DentalSegmentatorTestCase, MockLogic, get_test_multi_label_path
+
+
+class FoldEnsembleTestCase(DentalSegmentatorTestCase):
+    def test_folds_are_parsed_in_order_without_duplicates(self):
+        self.assertEqual(parseFolds(" 2, 0,,2 ,all"), ["2", "0", "all"])
+        self.assertEqual(parseFolds(""), [])
+
+    def test_available_folds_are_read_from_model_folder(self):
+        with TemporaryDirectory() as tmpDir:
+            trainerFolder = Path(tmpDir).joinpath("Dataset111", "nnUNetTrainer__nnUNetPlans__3d_fullres")
+            for fold in ["0", "1", "all"]:
+                trainerFolder.joinpath(f"fold_{fold}").mkdir(parents=True)
+            self.assertEqual(availableFolds(tmpDir), ["0", "1", "all"])
+        self.assertEqual(availableFolds(None), [])
+
+    def test_fold_labels_are_merged_by_majority(self):
+        labels = [
+            np.array([[[0, 1, 2, 3]]], dtype=np.uint8),
+            np.array([[[0, 1, 2, 4]]], dtype=np.uint8),
+            np.array([[[1, 1, 5, 4]]], dtype=np.uint8),
+        ]
+        merged = mergeFoldLabels([LabelArrayResult(labelArray, np.eye(4)) for labelArray in labels])
+        np.testing.assert_array_equal(merged.labelArray, [[[0, 1, 2, 4]]])
+
+    def test_fold_label_ties_are_not_resolved_to_background(self):
+        labels = [np.array([[[1, 1, 0, 2]]], dtype=np.uint8), np.array([[[0, 1, 1, 1]]], dtype=np.uint8)]
+        merged = mergeFoldLabels([LabelArrayResult(labelArray, np.eye(4)) for labelArray in labels])
+        np.testing.assert_array_equal(merged.labelArray, [[[1, 1, 1, 1]]])
+
+    def test_label_voting_is_refused_for_even_fold_counts(self):
+        self.assertTrue(isLabelVotingReliable(1))
+        self.assertFalse(isLabelVotingReliable(2))
+        self.assertTrue(isLabelVotingReliable(3))
+
+    def test_fold_probabilities_are_averaged(self):
+        foldProbabilities = [
+            np.array([[[[0.6, 0.2]]], [[[0.4, 0.8]]]], dtype=np.float32),
+            np.array([[[[0.3, 0.6]]], [[[0.7, 0.4]]]], dtype=np.float32),
+        ]
+        with TemporaryDirectory() as tmpDir:
+            paths = [Path(tmpDir).joinpath(f"fold_{i}.npz") for i in range(len(foldProbabilities))]
+            for path, probabilities in zip(paths, foldProbabilities):
+                np.savez_compressed(path, probabilities=probabilities)
+            merged = mergeFoldProbabilities(paths, np.eye(4))
+
+        # A label vote of the two folds would tie on both voxels
+        np.testing.assert_array_equal(merged.labelArray, [[[1, 1]]])
+
+    def test_thread_cap_is_restored(self):
+        previousValue = os.environ.get("OMP_NUM_THREADS")
+        with cappedThreads({0}):
+            self.assertEqual(os.environ["OMP_NUM_THREADS"], "1")
+        self.assertEqual(os.environ.get("OMP_NUM_THREADS"), previousValue)
+
+    def test_folds_are_run_in_parallel_workers_and_merged(self):
+        if not isLabelArrayReadingAvailable():
+            self.skipTest("nibabel is not installed.")
+
+        workers = []
+
+        def createWorker():
+            worker = MockLogic()
+            worker.resultPath = MagicMock(return_value=Path(get_test_multi_label_path()))
+            workers.append(worker)
+            return worker
+
+        logic = FoldEnsembleLogic(createWorker, nWorkers=2)
+        finished = MagicMock()
+        logic.inferenceFinished.connect(finished)
+        logic.setParameter(MagicMock(folds="0,1,2"))
+        logic.startSegmentation(MagicMock())
+        self.assertEqual(len(workers), 2)
+
+        workers[0].inferenceFinished()
+        workers[1].inferenceFinished()
+        self.assertEqual(len(workers), 2)
+        self.assertEqual(workers[0].startSegmentation.call_count, 2)
+        finished.assert_not_called()
+
+        workers[0].inferenceFinished()
+        finished.assert_called_once()
+        self.assertIsNotNone(logic.resultPath())
+        self.assertEqual(logic.loadSegmentation().GetSegmentation().GetNumberOfSegments(), 5)
+
+    def test_even_fold_count_is_not_merged_without_probabilities(self):
+        if not isLabelArrayReadingAvailable():
+            self.skipTest("nibabel is not installed.")
+
+        workers = []
+
+        def createWorker():
+            worker = MockLogic()
+            worker.resultPath = MagicMock(return_value=Path(get_test_multi_label_path()))
+            workers.append(worker)
+            return worker
+
+        logic = FoldEnsembleLogic(createWorker, nWorkers=2)
+        finished = MagicMock()
+        error = MagicMock()
+        logic.inferenceFinished.connect(finished)
+        logic.errorOccurred.connect(error)
+        logic.setParameter(MagicMock(folds="0,1"))
+        logic.startSegmentation(MagicMock())
+        for worker in workers:
+            worker.inferenceFinished()
+
+        finished.assert_not_called()
+        error.assert_called_once()
@@ -0,0 +1,83 @@
+"""
+Measure the accuracy and runtime trade-off of the DentalSegmentator inference profiles.
+
+Segments the PostDentalSurgery sample volume with each inference profile and reports the inference time and the Dice
+score of each segment against the reference segmentation in Testing/Data :
+
+    Slicer --no-main-window --python-script DentalSegmentator/Testing/InferenceProfileBenchmark.py --device cpu \
+        --output profiles.json
+
+The NNUNet module dependencies and the model weights are installed on first run. The Balanced profile is the module
+default and the baseline the other profiles should be compared to.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def runProfile(batchLogic, profileName, volumeNode, referenceArray):
+    import numpy as np
+    from DentalSegmentatorLib import getInferenceProfile
+    from Testing.Utils import dice_scores, run_inference
+
+    parameter = batchLogic.createParameter()
+    unsupportedNames = getInferenceProfile(profileName).applyTo(parameter)
+    if unsupportedNames:
+        raise RuntimeError(f"The installed NNUNet module doesn't support the {', '.join(unsupportedNames)} settings.")
+
+    labelArray, inference_s = run_inference(batchLogic.logic, parameter, volumeNode)
+    scores = dice_scores(labelArray, referenceArray)
+    return {
+        "inference_s": round(inference_s, 1),
+        "dice": {segmentName: round(score, 4) for segmentName, score in scores.items()},
+        "mean_dice": round(float(np.mean(list(scores.values()))), 4),
+    }
+
+
+def runBenchmark(device, profileNames):
+    import numpy as np
+
+    sys.path.insert(0, Path(__file__).parents[1].as_posix())
+    from DentalSegmentatorLib import BatchSegmentationLogic, readLabelArray
+    from Testing.Utils import get_test_multi_label_path, load_test_CT_volume
+
+    batchLogic = BatchSegmentationLogic(device=device)
+    if not batchLogic.prepare():
+        raise RuntimeError("Failed to prepare the DentalSegmentator dependencies.")
+
+    volumeNode = load_test_CT_volume()
+    referenceArray = np.asarray(readLabelArray(get_test_multi_label_path()).labelArray)
+    return {
+        profileName: runProfile(batchLogic, profileName, volumeNode, referenceArray) for profileName in profileNames
+    }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="DentalSegmentator inference profile benchmark.")
+    parser.add_argument("--device", default="cuda", choices=["cuda", "cpu", "mps"], help="Inference device.")
+    parser.add_argument(
+        "--profiles",
+        nargs="+",
+        default=["Accurate", "Balanced", "Fast"],
+        help="Inference profiles to benchmark."
+    )
+    parser.add_argument("--output", type=Path, help="Optional JSON file where the results are written.")
+    args = parser.parse_args(argv)
+
+    results = runBenchmark(args.device, args.profiles)
+    for profileName, result in results.items():
+        print(f"{profileName:>10} : {result['inference_s']:.1f} s, mean Dice {result['mean_dice']:.4f}")
+        for segmentName, score in result["dice"].items():
+            print(f"{segmentName:>32} : {score:.4f}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    import slicer
+
+    main(sys.argv[1:])
+    slicer.util.exit()
@@ -0,0 +1,32 @@
+from types import SimpleNamespace
+
+from DentalSegmentatorLib import defaultInferenceProfile, getInferenceProfile, inferenceProfiles
+from .Utils import DentalSegmentatorTestCase
+
+
+class InferenceProfilesTestCase(DentalSegmentatorTestCase):
+    def test_profiles_are_ordered_from_most_accurate_to_fastest(self):
+        self.assertEqual(list(inferenceProfiles), ["Accurate", "Balanced", "Fast"])
+        self.assertFalse(inferenceProfiles["Accurate"].disableTta)
+        self.assertTrue(inferenceProfiles["Balanced"].disableTta)
+        self.assertGreater(inferenceProfiles["Fast"].stepSize, inferenceProfiles["Balanced"].stepSize)
+
+    def test_default_profile_does_not_use_test_time_augmentation(self):
+        self.assertEqual(defaultInferenceProfile, "Balanced")
+        self.assertTrue(getInferenceProfile(defaultInferenceProfile).disableTta)
+        self.assertEqual(getInferenceProfile(defaultInferenceProfile).stepSize, 0.5)
+
+    def test_profile_sets_supported_parameter_settings(self):
+        parameter = SimpleNamespace(stepSize=0.5, disableTta=False)
+        self.assertEqual(getInferenceProfile("Fast").applyTo(parameter), [])
+        self.assertEqual(parameter.stepSize, 1.0)
+        self.assertTrue(parameter.disableTta)
+
+    def test_unsupported_parameter_settings_are_reported(self):
+        parameter = SimpleNamespace(stepSize=0.5)
+        self.assertEqual(getInferenceProfile("Balanced").applyTo(parameter), ["disableTta"])
+        self.assertFalse(hasattr(parameter, "disableTta"))
+
+    def test_unknown_profile_raises(self):
+        with self.assertRaises(ValueError):
+            getInferenceProfile("Fastest")
@@ -17,7 +17,12 @@ class IntegrationTestCase(DentalSegmentatorTestCase):
         self.noConnectionF = MagicMock(return_value=False)
         self.mockProgressCallback = MagicMock()
         self.mockErrorDisplay = MagicMock()
-        self.deps = PythonDependencyChecker(destWeightFolder=self.tmpDir.path(), errorDisplayF=self.mockErrorDisplay)
+        # The current weights release has no published SHA-256 digest
+        self.deps = PythonDependencyChecker(
+            destWeightFolder=self.tmpDir.path(),
+            errorDisplayF=self.mockErrorDisplay,
+            confirmUnverifiedDownloadF=MagicMock(return_value=True)
+        )
 
     def test_can_auto_download_weights(self):
         self.assertTrue(self.deps.areWeightsMissing())
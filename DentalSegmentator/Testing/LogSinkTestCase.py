@@ -0,0 +1,68 @@
+import time
+from unittest.mock import MagicMock
+
+import qt
+import slicer
+
+from DentalSegmentatorLib import BufferedLogSink, SegmentationWidget
+from .Utils import DentalSegmentatorTestCase
+
+
+class LogSinkTestCase(DentalSegmentatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.writeF = MagicMock()
+        self.sink = BufferedLogSink(self.writeF, filterF=SegmentationWidget.removeImageIOError, maxRate_Hz=10)
+
+    def writtenLines(self):
+        return [line for call in self.writeF.call_args_list for _, line in call.args[0]]
+
+    def processEventsFor(self, duration_s):
+        endTime = time.monotonic() + duration_s
+        while time.monotonic() < endTime:
+            slicer.app.processEvents(qt.QEventLoop.AllEvents, 10)
+
+    def test_first_message_is_written_immediately(self):
+        self.sink.append("Starting inference")
+        self.writeF.assert_called_once()
+        self.assertEqual(self.writtenLines(), ["Starting inference"])
+
+    def test_burst_of_messages_is_written_in_one_batch(self):
+        self.sink.append("first")
+        for i in range(100):
+            self.sink.append(f"progress {i}\nError ImageIO factory")
+
+        self.assertEqual(self.writeF.call_count, 1)
+        self.assertTrue(self.sink.hasPendingMessages())
+
+        self.processEventsFor(0.3)
+        self.assertEqual(self.writeF.call_count, 2)
+        self.assertEqual(self.writtenLines(), ["first"] + [f"progress {i}" for i in range(100)])
+        self.assertFalse(self.sink.hasPendingMessages())
+
+    def test_flush_writes_pending_messages(self):
+        self.sink.append("first")
+        self.sink.append("second")
+        self.sink.flush()
+        self.assertEqual(self.writtenLines(), ["first", "second"])
+
+    def test_filtered_out_messages_are_not_written(self):
+        self.sink.append("Error ImageIO factory")
+        self.writeF.assert_not_called()
+
+    def test_overdue_batch_is_written_by_the_next_message_without_event_processing(self):
+        self.sink.append("first")
+        self.sink.append("second")
+        time.sleep(0.15)
+        self.sink.append("third")
+        self.assertEqual(self.writtenLines(), ["first", "second", "third"])
+
+    def test_blocking_stage_writes_pending_messages_when_it_starts_and_ends(self):
+        self.sink.append("first")
+        self.sink.append("Loading segmentation")
+        with self.sink.blockingStage():
+            self.assertEqual(self.writtenLines(), ["first", "Loading segmentation"])
+            self.sink.append("Segmentation loaded")
+
+        self.assertEqual(self.writtenLines(), ["first", "Loading segmentation", "Segmentation loaded"])
+        self.assertFalse(self.sink.hasPendingMessages())
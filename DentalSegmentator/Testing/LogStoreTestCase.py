@@ -0,0 +1,65 @@
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from DentalSegmentatorLib import LogStore, LogViewerWidget
+from .Utils import DentalSegmentatorTestCase
+
+
+class LogStoreTestCase(DentalSegmentatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmpDir = TemporaryDirectory()
+        self.logFolder = Path(self.tmpDir.name)
+        self.store = LogStore(self.logFolder, maxRecords=10)
+
+    def tearDown(self):
+        super().tearDown()
+        self.tmpDir.cleanup()
+
+    @staticmethod
+    def timedLines(lines):
+        return [(time.time(), line) for line in lines]
+
+    def test_oldest_lines_are_spilled_to_log_file(self):
+        self.store.append(self.timedLines(f"line {i}" for i in range(25)))
+        self.assertEqual(len(self.store), 10)
+        self.assertEqual(len(self.store.logPath.read_text().splitlines()), 15)
+
+        lines = self.store.lines(includeSpilled=True)
+        self.assertEqual(len(lines), 25)
+        self.assertTrue(lines[0].endswith("INFO :: line 0"))
+        self.assertTrue(lines[-1].endswith("INFO :: line 24"))
+        self.assertEqual(len(self.store.lines()), 10)
+
+    def test_log_file_is_rotated(self):
+        store = LogStore(self.logFolder, maxRecords=1, maxFileSize_MB=1e-4, backupCount=2)
+        for i in range(20):
+            store.append(self.timedLines([f"line {i:04d} " + "x" * 100]))
+
+        self.assertEqual(len(store.spillLogFiles()), 3)
+        self.assertFalse(self.logFolder.joinpath(f"{LogStore.fileName}.3").exists())
+
+    def test_lines_can_be_filtered_by_severity_and_text(self):
+        self.store.append(self.timedLines([
+            "Loading inference results...",
+            "Warning : slow device",
+            "Error loading results",
+        ]))
+
+        self.assertEqual(len(self.store.lines()), 3)
+        self.assertEqual(len(self.store.lines(minimumSeverity="WARNING")), 2)
+        self.assertEqual(len(self.store.lines(minimumSeverity="ERROR")), 1)
+        self.assertEqual(len(self.store.lines(searchText="RESULTS")), 2)
+
+    def test_viewer_shows_last_page(self):
+        store = LogStore(self.logFolder, maxRecords=3000)
+        store.append(self.timedLines(f"line {i}" for i in range(2500)))
+
+        viewer = LogViewerWidget(store)
+        self.assertEqual(viewer.nPages, 3)
+        self.assertEqual(viewer.textEdit.document().blockCount(), 500)
+        self.assertFalse(viewer.nextButton.isEnabled())
+
+        viewer.previousButton.click()
+        self.assertEqual(viewer.textEdit.document().blockCount(), LogViewerWidget.pageSize)
@@ -0,0 +1,73 @@
+import json
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import numpy as np
+
+from DentalSegmentatorLib import LabelArrayResult, SlabbedInference, planInference, readTargetSpacing
+from .Utils import DentalSegmentatorTestCase, load_test_CT_volume
+
+
+class MemoryBudgetTestCase(DentalSegmentatorTestCase):
+    def test_volume_within_budget_is_not_split(self):
+        plan = planInference((100, 200, 200), (0.5, 0.5, 0.5), budget_GB=64)
+        self.assertEqual(plan.nSlabs, 1)
+        self.assertTrue(plan.isWithinBudget)
+        self.assertIn("whole volume", plan.describe())
+
+    def test_slab_cores_partition_the_volume(self):
+        plan = planInference((600, 600, 600), (0.3, 0.3, 0.3), budget_GB=8, targetSpacing=(0.4, 0.4, 0.4))
+        self.assertGreater(plan.nSlabs, 1)
+        self.assertTrue(plan.isWithinBudget)
+        self.assertLess(plan.estimatedPeak_GB, plan.wholeVolumePeak_GB)
+
+        coveredK = np.zeros(600, dtype=int)
+        for core, boundingBox in zip(plan.slabCores, plan.slabBoundingBoxes):
+            coveredK[core] += 1
+            self.assertLessEqual(boundingBox[0].start, core.start)
+            self.assertGreaterEqual(boundingBox[0].stop, core.stop)
+        np.testing.assert_array_equal(coveredK, 1)
+
+    def test_budget_is_shared_by_the_parallel_workers(self):
+        singlePlan = planInference((300, 400, 400), (0.3, 0.3, 0.3), budget_GB=16)
+        parallelPlan = planInference((300, 400, 400), (0.3, 0.3, 0.3), budget_GB=16, nWorkers=4)
+        self.assertEqual(singlePlan.nSlabs, 1)
+        self.assertGreater(parallelPlan.nSlabs, 1)
+        self.assertTrue(parallelPlan.isWithinBudget)
+        self.assertAlmostEqual(parallelPlan.wholeVolumePeak_GB, 4 * singlePlan.wholeVolumePeak_GB)
+        self.assertIn("4 parallel fold workers", parallelPlan.describe())
+
+    def test_unreachable_budget_is_reported(self):
+        plan = planInference((600, 600, 600), (0.3, 0.3, 0.3), budget_GB=1)
+        self.assertFalse(plan.isWithinBudget)
+        self.assertIn("cannot be met", plan.describe())
+
+    def test_target_spacing_is_read_from_model_plans(self):
+        with TemporaryDirectory() as tmpDir:
+            self.assertIsNone(readTargetSpacing(tmpDir))
+
+            plansPath = Path(tmpDir).joinpath("Dataset111", "nnUNetTrainer__nnUNetPlans__3d_fullres", "plans.json")
+            plansPath.parent.mkdir(parents=True)
+            plansPath.write_text(json.dumps({"configurations": {"3d_fullres": {"spacing": [0.4, 0.4, 0.4]}}}))
+            self.assertEqual(readTargetSpacing(tmpDir), [0.4, 0.4, 0.4])
+
+    def test_slab_labels_are_accumulated_in_input_geometry(self):
+        volumeNode = load_test_CT_volume()
+        shape = volumeNode.GetImageData().GetDimensions()[::-1]
+        plan = planInference(shape, volumeNode.GetSpacing()[::-1], budget_GB=1.6, overlap_mm=5)
+        self.assertGreater(plan.nSlabs, 1)
+
+        slabbedInference = SlabbedInference(volumeNode, plan)
+        try:
+            while slabbedInference.hasNextSlab():
+                slabNode = slabbedInference.startNextSlab()
+                slabShape = slabNode.GetImageData().GetDimensions()[::-1]
+                labels = np.full(slabShape, slabbedInference.iSlab + 1, dtype=np.uint8)
+                slabbedInference.addSlabResult(LabelArrayResult(labels, np.eye(4)))
+
+            result = slabbedInference.result()
+            self.assertEqual(result.labelArray.shape, shape)
+            for iSlab, core in enumerate(plan.slabCores):
+                self.assertTrue(np.all(result.labelArray[core] == iSlab + 1))
+        finally:
+            slabbedInference.cleanup()
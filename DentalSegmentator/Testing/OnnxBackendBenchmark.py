@@ -0,0 +1,78 @@
+"""
+Compare the ONNX Runtime and PyTorch CPU inference of DentalSegmentator.
+
+Segments the PostDentalSurgery sample volume with both backends and reports their inference time and the Dice score of
+each segment between the two backends :
+
+    Slicer --no-main-window --python-script DentalSegmentator/Testing/OnnxBackendBenchmark.py --output onnx.json
+
+The first ONNX Runtime run exports the network to ONNX if needed and is reported separately from the timed runs.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def runBenchmark(profileName, nRuns):
+    import numpy as np
+
+    sys.path.insert(0, Path(__file__).parents[1].as_posix())
+    from DentalSegmentatorLib import BatchSegmentationLogic, getInferenceProfile
+    from DentalSegmentatorLib.OnnxSegmentation import OnnxSegmentationLogic, installOnnxRuntime
+    from Testing.Utils import dice_scores, load_test_CT_volume, run_inference
+
+    batchLogic = BatchSegmentationLogic(device="cpu")
+    if not batchLogic.prepare() or not installOnnxRuntime(print):
+        raise RuntimeError("Failed to prepare the DentalSegmentator dependencies.")
+
+    volumeNode = load_test_CT_volume()
+    parameter = batchLogic.createParameter()
+    getInferenceProfile(profileName).applyTo(parameter)
+
+    onnxLogic = OnnxSegmentationLogic()
+    _, onnxFirstRun_s = run_inference(onnxLogic, parameter, volumeNode)
+    onnxTimings, torchTimings = [], []
+    for _ in range(nRuns):
+        onnxLabels, onnx_s = run_inference(onnxLogic, parameter, volumeNode)
+        torchLabels, torch_s = run_inference(batchLogic.logic, parameter, volumeNode)
+        onnxTimings.append(onnx_s)
+        torchTimings.append(torch_s)
+
+    scores = dice_scores(onnxLabels, torchLabels)
+    return {
+        "profile": profileName,
+        "onnx_first_run_s": round(onnxFirstRun_s, 1),
+        "onnx_s": round(float(np.median(onnxTimings)), 1),
+        "pytorch_s": round(float(np.median(torchTimings)), 1),
+        "speedup": round(float(np.median(torchTimings) / np.median(onnxTimings)), 2),
+        "label_agreement": round(float(np.mean(onnxLabels == torchLabels)), 6),
+        "dice": {segmentName: round(score, 4) for segmentName, score in scores.items()},
+    }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="DentalSegmentator ONNX Runtime backend benchmark.")
+    parser.add_argument("--profile", default="Balanced", help="Inference profile of the compared runs.")
+    parser.add_argument("--runs", type=int, default=1, help="Number of timed runs of each backend.")
+    parser.add_argument("--output", type=Path, help="Optional JSON file where the results are written.")
+    args = parser.parse_args(argv)
+
+    results = runBenchmark(args.profile, args.runs)
+    for key, value in results.items():
+        if isinstance(value, dict):
+            for segmentName, score in value.items():
+                print(f"{'Dice ' + segmentName:>32} : {score:.4f}")
+        else:
+            print(f"{key:>32} : {value}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    import slicer
+
+    main(sys.argv[1:])
+    slicer.util.exit()
@@ -0,0 +1,102 @@
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from DentalSegmentatorLib import OnnxSegmentationLogic, PythonDependencyChecker, getInferenceProfile
+from DentalSegmentatorLib.CpuAutotune import createRepresentativeCrop
+from DentalSegmentatorLib.OnnxInferenceWorker import onnxModelPath, readOnnxMetadata, trainedModelFolder
+from DentalSegmentatorLib.OnnxSegmentation import isOnnxRuntimeAvailable
+from .Utils import DentalSegmentatorTestCase, dice_scores, load_test_CT_volume, run_inference
+
+
+class OnnxSegmentationTestCase(DentalSegmentatorTestCase):
+    @staticmethod
+    def createModelFolder(rootDir):
+        modelFolder = Path(rootDir).joinpath("Dataset111", "nnUNetTrainer__nnUNetPlans__3d_fullres")
+        modelFolder.joinpath("fold_0").mkdir(parents=True)
+        modelFolder.joinpath("fold_0", "checkpoint_final.pth").write_bytes(b"weights")
+        for name in ["plans.json", "dataset.json"]:
+            modelFolder.joinpath(name).write_text("{}")
+        return modelFolder
+
+    def test_worker_arguments_match_parameter(self):
+        logic = OnnxSegmentationLogic()
+        logic.setParameter(SimpleNamespace(folds="0,1", modelPath="model", stepSize=1.0, disableTta=True))
+        args = logic.workerArguments("in", "out")
+        self.assertEqual(args[0], logic.workerPath.as_posix())
+        self.assertEqual(args[args.index("-f") + 1:args.index("--step_size")], ["0", "1"])
+        self.assertEqual(args[args.index("--step_size") + 1], "1.0")
+        self.assertIn("--disable_tta", args)
+        self.assertEqual(args[args.index("--precision") + 1], "float32")
+
+        logic = OnnxSegmentationLogic("int8")
+        logic.setParameter(SimpleNamespace(folds="0", modelPath="model"))
+        args = logic.workerArguments("in", "out")
+        self.assertNotIn("--disable_tta", args)
+        self.assertEqual(args[args.index("--precision") + 1], "int8")
+
+    def test_trained_model_folder_is_found_in_weights_folder(self):
+        with TemporaryDirectory() as tmpDir:
+            self.assertIsNone(trainedModelFolder(tmpDir))
+            modelFolder = self.createModelFolder(tmpDir)
+            self.assertEqual(trainedModelFolder(tmpDir), modelFolder)
+
+    def test_onnx_export_is_outdated_when_checkpoint_changes(self):
+        with TemporaryDirectory() as tmpDir:
+            modelFolder = self.createModelFolder(tmpDir)
+            self.assertIsNone(readOnnxMetadata(modelFolder, "0"))
+
+            checkpointStat = modelFolder.joinpath("fold_0", "checkpoint_final.pth").stat()
+            onnxPath = onnxModelPath(modelFolder, "0")
+            onnxPath.write_bytes(b"onnx")
+            onnxPath.with_name(onnxPath.name + ".json").write_text(
+                json.dumps({"checkpoint": [checkpointStat.st_size, checkpointStat.st_mtime_ns]})
+            )
+            self.assertIsNotNone(readOnnxMetadata(modelFolder, "0"))
+
+            self.assertIsNone(readOnnxMetadata(modelFolder, "0", "int8"))
+
+            modelFolder.joinpath("fold_0", "checkpoint_final.pth").write_bytes(b"new weights")
+            self.assertIsNone(readOnnxMetadata(modelFolder, "0"))
+
+
+@pytest.mark.slow
+@unittest.skipUnless(isOnnxRuntimeAvailable(), "ONNX Runtime is not installed.")
+class OnnxSegmentationParityTestCase(DentalSegmentatorTestCase):
+    def test_onnx_labels_match_pytorch_labels(self):
+        from SlicerNNUNetLib import Parameter, SegmentationLogic
+
+        dependencyChecker = PythonDependencyChecker(confirmUnverifiedDownloadF=lambda download_url: True)
+        self.assertTrue(dependencyChecker.downloadWeightsIfNeeded(print))
+        parameter = Parameter(folds="0", modelPath=dependencyChecker.getActiveWeightsFolder(), device="cpu")
+        getInferenceProfile("Fast").applyTo(parameter)
+
+        crop = createRepresentativeCrop(load_test_CT_volume(), size_mm=60)
+        volumeNode = crop.createCroppedVolumeNode()
+        onnxLabels, _ = run_inference(OnnxSegmentationLogic(), parameter, volumeNode)
+        torchLabels, _ = run_inference(SegmentationLogic(), parameter, volumeNode)
+
+        self.assertGreater(np.mean(onnxLabels == torchLabels), 0.999)
+        for segmentName, score in dice_scores(onnxLabels, torchLabels).items():
+            self.assertGreater(score, 0.98, segmentName)
+
+    def test_int8_labels_are_close_to_float32_labels(self):
+        from SlicerNNUNetLib import Parameter
+
+        dependencyChecker = PythonDependencyChecker(confirmUnverifiedDownloadF=lambda download_url: True)
+        self.assertTrue(dependencyChecker.downloadWeightsIfNeeded(print))
+        self.assertTrue(dependencyChecker.generateQuantizedWeights(["0"], print))
+        self.assertIn("INT8", dependencyChecker.readQuantizationReport(["0"]))
+
+        parameter = Parameter(folds="0", modelPath=dependencyChecker.getActiveWeightsFolder(), device="cpu")
+        getInferenceProfile("Fast").applyTo(parameter)
+        crop = createRepresentativeCrop(load_test_CT_volume(), size_mm=60)
+        volumeNode = crop.createCroppedVolumeNode()
+        float32Labels, _ = run_inference(OnnxSegmentationLogic("float32"), parameter, volumeNode)
+        int8Labels, _ = run_inference(OnnxSegmentationLogic("int8"), parameter, volumeNode)
+        self.assertGreater(np.mean(list(dice_scores(int8Labels, float32Labels).values())), 0.9)
@@ -0,0 +1,231 @@
+import json
+import os
+import time
+import zipfile
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import MagicMock, patch
+
+from DentalSegmentatorLib import PythonDependencyChecker
+from .Utils import DentalSegmentatorTestCase
+
+
+class PythonDependencyCheckerTestCase(DentalSegmentatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmpDir = TemporaryDirectory()
+        self.weightsFolder = Path(self.tmpDir.name).joinpath("ML")
+        self.deps = PythonDependencyChecker(
+            destWeightFolder=self.weightsFolder,
+            hasInternetConnectionF=MagicMock(return_value=False),
+            errorDisplayF=MagicMock()
+        )
+
+    def tearDown(self):
+        super().tearDown()
+        self.tmpDir.cleanup()
+
+    def createWeightsArchive(self, name, hasDataset=True):
+        zipPath = Path(self.tmpDir.name).joinpath(f"{name}.zip")
+        with zipfile.ZipFile(zipPath, "w") as f:
+            f.writestr("Dataset111/fold_0/checkpoint_final.pth", name)
+            if hasDataset:
+                f.writestr("Dataset111/dataset.json", "{}")
+        return zipPath
+
+    def installVersion(self, version, activate=True):
+        url = f"https://github.com/gaudot/SlicerDentalSegmentator/releases/download/{version}/Dataset111.zip"
+        self.deps.installWeightsVersion(self.createWeightsArchive(version), version, url)
+        if activate:
+            self.deps.activateWeightsVersion(version)
+
+        # Make sure install times are ordered on file systems with coarse mtime resolution
+        infoPath = self.deps.getVersionsFolder().joinpath(version, "download_info.json")
+        mtime = time.time() + len(self.deps.listWeightsVersions())
+        os.utime(infoPath, (mtime, mtime))
+
+    def test_version_name_is_release_tag(self):
+        self.assertEqual(
+            self.deps.weightsVersionName(
+                "https://github.com/gaudot/SlicerDentalSegmentator/releases/download/v1.0.0/Dataset111.zip"
+            ),
+            "v1.0.0"
+        )
+        self.assertEqual(self.deps.weightsVersionName("https://example.com/weights.zip"), "weights")
+
+    def test_installed_version_is_only_used_once_activated(self):
+        self.installVersion("v1", activate=False)
+        self.assertIsNone(self.deps.getActiveWeightsVersion())
+        self.assertTrue(self.deps.areWeightsMissing())
+
+        self.deps.activateWeightsVersion("v1")
+        self.assertEqual(self.deps.getActiveWeightsFolder(), self.deps.getVersionsFolder() / "v1")
+        self.assertFalse(self.deps.areWeightsMissing())
+        self.assertTrue(self.deps.getLastDownloadedWeights().endswith("/v1/Dataset111.zip"))
+
+    def test_can_switch_between_installed_versions(self):
+        self.installVersion("v1")
+        self.installVersion("v2")
+        self.assertEqual(self.deps.listWeightsVersions(), ["v1", "v2"])
+        self.assertEqual(self.deps.getActiveWeightsVersion(), "v2")
+
+        self.deps.activateWeightsVersion("v1")
+        self.assertEqual(self.deps.getActiveWeightsVersion(), "v1")
+        with self.assertRaises(ValueError):
+            self.deps.activateWeightsVersion("v3")
+
+    def test_invalid_archive_is_not_installed(self):
+        self.installVersion("v1")
+        zipPath = self.createWeightsArchive("v2", hasDataset=False)
+        with self.assertRaises(RuntimeError):
+            self.deps.installWeightsVersion(zipPath, "v2", "url")
+
+        self.assertEqual(self.deps.listWeightsVersions(), ["v1"])
+        self.assertEqual(self.deps.getActiveWeightsVersion(), "v1")
+
+    def test_garbage_collection_keeps_active_and_pinned_versions(self):
+        for version in ["v1", "v2", "v3", "v4"]:
+            self.installVersion(version)
+        self.deps.activateWeightsVersion("v2")
+        self.deps.pinWeightsVersion("v1")
+
+        removed = self.deps.garbageCollectWeightsVersions(keepCount=1)
+        self.assertEqual(removed, ["v3"])
+        self.assertEqual(self.deps.listWeightsVersions(), ["v1", "v2", "v4"])
+
+        self.deps.pinWeightsVersion("v1", isPinned=False)
+        self.assertEqual(self.deps.garbageCollectWeightsVersions(keepCount=0), ["v1", "v4"])
+
+    def test_manually_installed_weights_are_used_without_active_version(self):
+        with zipfile.ZipFile(self.createWeightsArchive("manual"), "r") as f:
+            f.extractall(self.weightsFolder)
+
+        self.assertFalse(self.deps.areWeightsMissing())
+        self.assertEqual(self.deps.getActiveWeightsFolder(), self.weightsFolder)
+
+    def test_manually_installed_weights_are_moved_to_their_version_folder(self):
+        with zipfile.ZipFile(self.createWeightsArchive("manual"), "r") as f:
+            f.extractall(self.weightsFolder)
+        self.deps._writeDownloadInfo(
+            self.weightsFolder, "https://github.com/gaudot/SlicerDentalSegmentator/releases/download/v0/Dataset111.zip"
+        )
+        self.installVersion("v1")
+
+        self.assertEqual(self.deps._migrateManuallyInstalledWeights(), "v0")
+        self.assertEqual(sorted(self.deps.listWeightsVersions()), ["v0", "v1"])
+        self.assertFalse(self.weightsFolder.joinpath("Dataset111").exists())
+        self.assertEqual(self.deps.getActiveWeightsVersion(), "v1")
+
+        self.deps.activateWeightsVersion("v0")
+        self.assertFalse(self.deps.areWeightsMissing())
+        self.assertTrue(self.deps.getLastDownloadedWeights().endswith("/v0/Dataset111.zip"))
+
+    def test_migrated_weights_do_not_replace_an_installed_version(self):
+        with zipfile.ZipFile(self.createWeightsArchive("manual"), "r") as f:
+            f.extractall(self.weightsFolder)
+        self.installVersion("v1")
+
+        self.assertEqual(self.deps._migrateManuallyInstalledWeights(), "manual")
+        self.assertIsNone(self.deps._migrateManuallyInstalledWeights())
+
+        with zipfile.ZipFile(self.createWeightsArchive("manual"), "r") as f:
+            f.extractall(self.weightsFolder)
+        self.assertEqual(self.deps._migrateManuallyInstalledWeights(), "manual_2")
+
+    def test_up_to_date_weights_check_does_not_access_network_with_fresh_release_metadata(self):
+        self.installVersion("v1")
+        self.deps.releaseMetadata.cachePath.write_text(json.dumps({
+            "release": {"download_url": self.deps.getLastDownloadedWeights(), "sha256": None},
+            "fetched_at": time.time()
+        }))
+
+        self.assertFalse(self.deps.areWeightsOutdated())
+        self.deps.hasInternetConnectionF.assert_not_called()
+
+    def test_expected_digest_uses_the_github_digest_first(self):
+        url = "https://example.com/download/v1/weights.zip"
+        with patch.object(PythonDependencyChecker, "knownWeightsSha256", {url: "pinned"}):
+            self.assertEqual(self.deps.expectedWeightsSha256({"download_url": url, "sha256": "github"}), "github")
+            self.assertEqual(self.deps.expectedWeightsSha256({"download_url": url, "sha256": None}), "pinned")
+
+    def test_installed_version_digest_is_not_trusted(self):
+        url = "https://example.com/download/v1/weights.zip"
+        self.deps.installWeightsVersion(self.createWeightsArchive("v1"), "v1", url, sha256="installed")
+        self.assertIsNone(self.deps.expectedWeightsSha256({"download_url": url, "sha256": None}))
+
+    def downloadUnverifiedWeights(self):
+        url = "https://example.com/download/v1/weights.zip"
+        self.deps.hasInternetConnectionF = MagicMock(return_value=True)
+        self.deps.getLatestReleaseInfo = MagicMock(return_value={"download_url": url, "sha256": None})
+        with patch("DentalSegmentatorLib.PythonDependencyChecker.ChunkedDownloader") as downloader:
+            downloader.return_value.download.return_value = self.createWeightsArchive("v1")
+            return self.deps.downloadWeights(MagicMock()), downloader
+
+    def test_unverified_download_is_refused_by_default(self):
+        isDownloaded, downloader = self.downloadUnverifiedWeights()
+        self.assertFalse(isDownloaded)
+        downloader.assert_not_called()
+        self.deps.errorDisplay.assert_called_once()
+        self.assertTrue(self.deps.areWeightsMissing())
+
+    def test_confirmed_unverified_download_does_not_record_a_digest(self):
+        self.deps.confirmUnverifiedDownload = MagicMock(return_value=True)
+        isDownloaded, _ = self.downloadUnverifiedWeights()
+        self.assertTrue(isDownloaded)
+        self.deps.confirmUnverifiedDownload.assert_called_once_with("https://example.com/download/v1/weights.zip")
+        self.assertIsNone(json.loads(self.deps.getWeightDownloadInfoPath().read_text())["sha256"])
+
+    def test_missing_expected_digest_is_logged(self):
+        releaseInfo = {"download_url": "https://example.com/weights.zip", "sha256": None}
+        with self.assertLogs(level="WARNING") as logs:
+            sha256 = self.deps.expectedWeightsSha256(releaseInfo)
+
+        self.assertIsNone(sha256)
+        self.assertIn("No SHA-256 digest", logs.output[0])
+
+    def test_install_writes_weights_manifest(self):
+        self.installVersion("v1")
+        manifest = self.deps.readWeightsManifest(self.deps.getActiveWeightsFolder())
+        self.assertEqual(manifest["dataset"], "Dataset111/dataset.json")
+        self.assertEqual(manifest["folds"], ["Dataset111/fold_0"])
+        self.assertEqual([c["path"] for c in manifest["checkpoints"]], ["Dataset111/fold_0/checkpoint_final.pth"])
+
+    def test_dataset_path_is_read_from_manifest_without_scanning(self):
+        self.installVersion("v1")
+        with patch.object(Path, "rglob", side_effect=AssertionError("Weights folder should not be scanned")):
+            self.assertEqual(
+                self.deps.getDatasetPath(), self.deps.getActiveWeightsFolder().joinpath("Dataset111", "dataset.json")
+            )
+
+    def test_stale_manifest_is_rewritten(self):
+        self.installVersion("v1")
+        checkpointPath = self.deps.getActiveWeightsFolder().joinpath("Dataset111", "fold_0", "checkpoint_final.pth")
+        checkpointPath.write_text("updated checkpoint")
+        self.assertIsNone(self.deps.readWeightsManifest(self.deps.getActiveWeightsFolder()))
+
+        self.assertIsNotNone(self.deps.getDatasetPath())
+        self.assertIsNotNone(self.deps.readWeightsManifest(self.deps.getActiveWeightsFolder()))
+
+    def test_quantized_weights_report_accuracy_difference_from_float32(self):
+        modelFolder = self.weightsFolder.joinpath("Dataset111", "nnUNetTrainer__nnUNetPlans__3d_fullres")
+        modelFolder.joinpath("fold_0").mkdir(parents=True)
+        checkpointPath = modelFolder.joinpath("fold_0", "checkpoint_final.pth")
+        checkpointPath.write_bytes(b"weights")
+        for name in ["plans.json", "dataset.json"]:
+            modelFolder.joinpath(name).write_text("{}")
+        self.assertFalse(self.deps.areQuantizedWeightsAvailable(["0"]))
+        self.assertIsNone(self.deps.readQuantizationReport(["0"]))
+
+        modelFolder.joinpath("fold_0", "checkpoint_final.int8.onnx").write_bytes(b"onnx")
+        modelFolder.joinpath("fold_0", "checkpoint_final.int8.onnx.json").write_text(json.dumps({
+            "checkpoint": [checkpointPath.stat().st_size, checkpointPath.stat().st_mtime_ns],
+            "calibrationVolume": "PostDentalSurgery_0000.nii.gz",
+            "nCalibrationTiles": 16,
+            "float32Size_MB": 120.0,
+            "int8Size_MB": 31.0,
+            "evaluation": {"folds": ["0"], "float32": {"meanDice": 0.95}, "int8": {"meanDice": 0.94}},
+        }))
+        self.assertTrue(self.deps.areQuantizedWeightsAvailable(["0"]))
+        self.assertFalse(self.deps.areQuantizedWeightsAvailable(["0", "1"]))
+        report = self.deps.readQuantizationReport(["0"])
+        self.assertIn("float32 0.9500, INT8 0.9400 (-0.0100)", report)
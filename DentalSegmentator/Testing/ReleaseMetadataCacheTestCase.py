@@ -0,0 +1,108 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import MagicMock
+
+from DentalSegmentatorLib.ReleaseMetadataCache import ReleaseMetadataCache
+from .Utils import DentalSegmentatorTestCase
+
+
+class ReleasesRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves the server releases list and answers 304 to the requests matching its current ETag.
+    """
+
+    def log_message(self, *_):
+        pass
+
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        etag = f'"{len(self.server.releases)}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        body = json.dumps(self.server.releases).encode()
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ReleaseMetadataCacheTestCase(DentalSegmentatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmpDir = TemporaryDirectory()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), ReleasesRequestHandler)
+        self.server.requests = []
+        self.server.releases = [self.release("v1")]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.hasInternetConnection = MagicMock(return_value=True)
+        self.cache = self.createCache(ttl_s=3600)
+
+    def tearDown(self):
+        super().tearDown()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpDir.cleanup()
+
+    def createCache(self, ttl_s):
+        return ReleaseMetadataCache(
+            Path(self.tmpDir.name).joinpath("release_metadata.json"),
+            "owner/repo",
+            self.hasInternetConnection,
+            apiUrl=f"http://127.0.0.1:{self.server.server_port}",
+            ttl_s=ttl_s
+        )
+
+    @staticmethod
+    def release(tag):
+        return {
+            "tag_name": tag,
+            "assets": [{
+                "browser_download_url": f"https://example.com/download/{tag}/weights.zip",
+                "digest": f"sha256:{tag}"
+            }]
+        }
+
+    def test_fresh_metadata_is_returned_without_request(self):
+        self.assertEqual(
+            self.cache.latestRelease(),
+            {"download_url": "https://example.com/download/v1/weights.zip", "sha256": "v1"}
+        )
+        self.assertEqual(self.createCache(ttl_s=3600).latestRelease()["sha256"], "v1")
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_expired_metadata_is_revalidated_with_etag(self):
+        self.cache.latestRelease()
+        expiredCache = self.createCache(ttl_s=0)
+
+        self.assertEqual(expiredCache.latestRelease()["sha256"], "v1")
+        self.assertEqual(self.server.requests[-1].get("If-None-Match"), '"1"')
+
+        self.server.releases.insert(0, self.release("v2"))
+        self.assertEqual(expiredCache.latestRelease()["sha256"], "v2")
+
+    def test_request_failure_raises_runtime_error(self):
+        self.server.releases = []
+        with self.assertRaises(RuntimeError):
+            self.cache.latestRelease()
+
+    def test_failed_connection_probes_are_cached_with_backoff(self):
+        self.hasInternetConnection.return_value = False
+        self.assertFalse(self.cache.hasInternetConnection())
+        self.assertFalse(self.cache.hasInternetConnection())
+        self.assertEqual(self.hasInternetConnection.call_count, 1)
+
+        content = json.loads(self.cache.cachePath.read_text())
+        content["connectivity"]["failed_at"] = 0
+        self.cache.cachePath.write_text(json.dumps(content))
+
+        self.hasInternetConnection.return_value = True
+        self.assertTrue(self.cache.hasInternetConnection())
+        self.assertEqual(self.hasInternetConnection.call_count, 2)
@@ -0,0 +1,72 @@
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import slicer
+
+from DentalSegmentatorLib import SegmentationResultCache
+from .Utils import DentalSegmentatorTestCase, get_test_multi_label_path, load_test_CT_volume
+
+
+class SegmentationCacheTestCase(DentalSegmentatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmpDir = TemporaryDirectory()
+        self.cache = SegmentationResultCache(self.tmpDir.name)
+        self.prevMaxSize = self.cache.maxSize_MB
+        self.volumeNode = load_test_CT_volume()
+
+    def tearDown(self):
+        super().tearDown()
+        self.cache.maxSize_MB = self.prevMaxSize
+        self.tmpDir.cleanup()
+
+    def key(self, weightsUrl="url", device="cuda", parameters=None):
+        return self.cache.computeKey(self.volumeNode, weightsUrl, device, parameters or {"folds": "0"})
+
+    def test_key_is_stable_for_identical_inputs(self):
+        self.assertEqual(self.key(), self.key())
+
+    def test_key_depends_on_voxels_geometry_weights_device_and_parameters(self):
+        keys = {
+            self.key(),
+            self.key(weightsUrl="other_url"),
+            self.key(device="cpu"),
+            self.key(parameters={"folds": "0,1"}),
+        }
+
+        self.volumeNode.SetSpacing(1, 1, 1)
+        keys.add(self.key())
+
+        slicer.util.arrayFromVolume(self.volumeNode)[0, 0, 0] += 1
+        slicer.util.arrayFromVolumeModified(self.volumeNode)
+        keys.add(self.key())
+        self.assertEqual(len(keys), 6)
+
+    def test_can_store_and_load_results(self):
+        key = self.key()
+        self.assertIsNone(self.cache.get(key))
+        self.cache.store(key, get_test_multi_label_path())
+        self.assertIsNotNone(self.cache.get(key))
+
+        segmentationNode = self.cache.load(key)
+        self.assertEqual(segmentationNode.GetSegmentation().GetNumberOfSegments(), 5)
+
+    def test_evicts_least_recently_used_entries(self):
+        keys = ["a", "b", "c"]
+        for i, key in enumerate(keys):
+            self.cache.store(key, get_test_multi_label_path())
+            os.utime(self.cache.cachedPath(key), (i, i))
+
+        # Access first entry to make it the most recently used
+        self.assertIsNotNone(self.cache.get("a"))
+
+        entrySize_MB = Path(get_test_multi_label_path()).stat().st_size / 1024 ** 2
+        self.cache.maxSize_MB = 2.5 * entrySize_MB
+        self.assertEqual([p.name for p in self.cache.entries()], ["c.nii.gz", "a.nii.gz"])
+
+    def test_can_clear_cache(self):
+        self.cache.store(self.key(), get_test_multi_label_path())
+        self.cache.clear()
+        self.assertEqual(self.cache.entries(), [])
+        self.assertEqual(self.cache.size_MB(), 0)
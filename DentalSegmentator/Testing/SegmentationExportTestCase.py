@@ -0,0 +1,161 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import MagicMock
+
+import slicer
+
+from DentalSegmentatorLib import (
+    ClosedSurfaceCache,
+    ExportFormat,
+    ExportManifest,
+    SegmentationExportJob,
+    SegmentationPostProcessor,
+)
+from .Utils import DentalSegmentatorTestCase, get_test_multi_label_path
+
+
+class SegmentationExportTestCase(DentalSegmentatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmpDir = TemporaryDirectory()
+        self.tmpPath = Path(self.tmpDir.name)
+        self.segmentationNode = slicer.util.loadSegmentation(get_test_multi_label_path())
+        SegmentationPostProcessor.setSegmentNamesAndColors(self.segmentationNode)
+
+    def tearDown(self):
+        super().tearDown()
+        self.tmpDir.cleanup()
+
+    def test_exports_formats_concurrently_and_reports_progress(self):
+        job = SegmentationExportJob(
+            self.segmentationNode, self.tmpPath, ExportFormat.STL | ExportFormat.OBJ | ExportFormat.NIFTI
+        )
+        progress = MagicMock()
+        finished = MagicMock()
+        job.progress.connect(progress)
+        job.finished.connect(finished)
+
+        job.start()
+        self.assertEqual(job.nTasks, 7)
+        job.wait()
+
+        finished.assert_called_once()
+        progress.assert_called_with(7, 7)
+        self.assertEqual(job.errors, [])
+        self.assertEqual(len(list(self.tmpPath.glob("*.stl"))), 5)
+        self.assertEqual(len(list(self.tmpPath.glob("*.obj"))), 1)
+        self.assertEqual(len(list(self.tmpPath.glob("*.nii.gz"))), 1)
+
+    def test_each_mesh_export_task_uses_its_own_segmentation_copy(self):
+        job = SegmentationExportJob(self.segmentationNode, self.tmpPath, ExportFormat.STL | ExportFormat.OBJ)
+        job._closedSurfaceExportTask = MagicMock(wraps=job._closedSurfaceExportTask)
+        job.start()
+        job.wait()
+
+        detachedNodes = [call.args[0] for call in job._closedSurfaceExportTask.call_args_list]
+        self.assertEqual(len(detachedNodes), 6)
+        self.assertEqual(len({id(node) for node in detachedNodes}), 6)
+        self.assertEqual([node.GetSegmentation().GetNumberOfSegments() for node in detachedNodes], [1] * 5 + [5])
+        self.assertEqual(job.errors, [])
+
+    def test_main_thread_steps_are_reported(self):
+        job = SegmentationExportJob(self.segmentationNode, self.tmpPath, ExportFormat.STL | ExportFormat.GLTF)
+        progressInfo = MagicMock()
+        job.progressInfo.connect(progressInfo)
+        job.start()
+        job.wait()
+
+        messages = [call.args[0] for call in progressInfo.call_args_list]
+        self.assertEqual(len(messages), 4)
+        self.assertIn("3D surfaces", messages[0])
+        self.assertIn("glTF", messages[2])
+        self.assertEqual(messages[1::2], ["", ""])
+
+    def test_export_does_not_leave_nodes_in_the_scene(self):
+        nNodes = slicer.mrmlScene.GetNumberOfNodes()
+        job = SegmentationExportJob(self.segmentationNode, self.tmpPath, ExportFormat.STL | ExportFormat.NIFTI)
+        job.start()
+        job.wait()
+        self.assertEqual(slicer.mrmlScene.GetNumberOfNodes(), nNodes)
+
+    def test_export_can_be_cancelled(self):
+        finished = MagicMock()
+        job = SegmentationExportJob(self.segmentationNode, self.tmpPath, ExportFormat.STL, maxWorkers=1)
+        job.finished.connect(finished)
+        job.start()
+        job.cancel()
+        job.wait()
+
+        finished.assert_called_once()
+        self.assertTrue(job.isCancelled())
+        self.assertEqual(job.errors, [])
+
+    def exportFormats(self, formats):
+        job = SegmentationExportJob(self.segmentationNode, self.tmpPath, formats)
+        job.start()
+        job.wait()
+        self.assertEqual(job.errors, [])
+        return job
+
+    def fileModificationTimes(self):
+        return {path.name: path.stat().st_mtime_ns for path in self.tmpPath.iterdir()}
+
+    def test_unchanged_segmentation_export_is_skipped(self):
+        self.exportFormats(ExportFormat.STL | ExportFormat.NIFTI)
+        mtimes = self.fileModificationTimes()
+
+        job = self.exportFormats(ExportFormat.STL | ExportFormat.NIFTI)
+        self.assertEqual(job.nTasks, 0)
+        self.assertEqual(len(job.skipped), 6)
+        self.assertEqual(self.fileModificationTimes(), mtimes)
+
+    def test_only_modified_segments_are_exported_again(self):
+        self.exportFormats(ExportFormat.STL | ExportFormat.NIFTI)
+        self.segmentationNode.GetSegmentation().GetSegment("Segment_3").SetColor(0, 0, 1)
+
+        job = self.exportFormats(ExportFormat.STL | ExportFormat.NIFTI)
+        self.assertEqual(job.nTasks, 2)
+        self.assertEqual(len(job.skipped), 4)
+
+    def test_deleted_files_are_exported_again(self):
+        self.exportFormats(ExportFormat.STL | ExportFormat.OBJ)
+        next(self.tmpPath.glob("*.stl")).unlink()
+        next(self.tmpPath.glob("*.obj")).unlink()
+
+        job = self.exportFormats(ExportFormat.STL | ExportFormat.OBJ)
+        self.assertEqual(job.nTasks, 2)
+        self.assertEqual(len(job.skipped), 4)
+        self.assertEqual(len(list(self.tmpPath.glob("*.stl"))), 5)
+        self.assertEqual(len(list(self.tmpPath.glob("*.obj"))), 1)
+
+    def test_renamed_segmentation_is_exported_again(self):
+        self.exportFormats(ExportFormat.STL)
+        self.segmentationNode.SetName("Renamed")
+
+        job = self.exportFormats(ExportFormat.STL)
+        self.assertEqual(job.nTasks, 5)
+        self.assertEqual(job.skipped, [])
+
+    def test_missing_manifest_forces_full_export(self):
+        self.exportFormats(ExportFormat.STL)
+        self.tmpPath.joinpath(ExportManifest.fileName).unlink()
+
+        job = self.exportFormats(ExportFormat.STL)
+        self.assertEqual(job.nTasks, 5)
+        self.assertEqual(job.skipped, [])
+
+    def test_mesh_exports_use_the_shared_surface_cache(self):
+        surfaceCache = ClosedSurfaceCache()
+        surfaceCache.applyTo(self.segmentationNode)
+        self.segmentationNode.RemoveClosedSurfaceRepresentation()
+
+        job = SegmentationExportJob(
+            self.segmentationNode, self.tmpPath, ExportFormat.STL | ExportFormat.OBJ, surfaceCache=surfaceCache
+        )
+        job.start()
+        job.wait()
+
+        self.assertEqual(job.errors, [])
+        self.assertEqual(surfaceCache.nMisses, 5)
+        self.assertEqual(surfaceCache.nHits, 5)
+        self.assertEqual(len(list(self.tmpPath.glob("*.stl"))), 5)
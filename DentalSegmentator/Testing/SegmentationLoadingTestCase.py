@@ -0,0 +1,84 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import numpy as np
+import slicer
+
+from DentalSegmentatorLib.SegmentationLoading import (
+    fillSegmentationFromLabelArray,
+    inferenceResultPath,
+    isLabelArrayReadingAvailable,
+    readLabelArray,
+)
+from .Utils import (
+    DentalSegmentatorTestCase,
+    get_test_multi_label_path,
+    get_test_multi_label_path_with_segments_1_3_5,
+    load_test_CT_volume,
+)
+
+
+class SegmentationLoadingTestCase(DentalSegmentatorTestCase):
+    def setUp(self):
+        super().setUp()
+        if not isLabelArrayReadingAvailable():
+            self.skipTest("nibabel is not installed.")
+
+        self.volumeNode = load_test_CT_volume()
+        self.segmentationNode = slicer.mrmlScene.AddNewNodeByClass("vtkMRMLSegmentationNode")
+
+    def segmentArray(self, segmentationNode, segmentId):
+        return slicer.util.arrayFromSegmentBinaryLabelmap(segmentationNode, segmentId, self.volumeNode)
+
+    def test_filled_segmentation_matches_loaded_segmentation(self):
+        fillSegmentationFromLabelArray(self.segmentationNode, readLabelArray(get_test_multi_label_path()))
+        loadedNode = slicer.util.loadSegmentation(get_test_multi_label_path())
+
+        segmentation = self.segmentationNode.GetSegmentation()
+        self.assertEqual(segmentation.GetNumberOfSegments(), 5)
+        for i in range(segmentation.GetNumberOfSegments()):
+            segmentId = segmentation.GetNthSegmentID(i)
+            np.testing.assert_array_equal(
+                self.segmentArray(self.segmentationNode, segmentId), self.segmentArray(loadedNode, segmentId)
+            )
+
+    def test_existing_shared_labelmap_is_filled_in_place(self):
+        fillSegmentationFromLabelArray(self.segmentationNode, readLabelArray(get_test_multi_label_path()))
+        segmentation = self.segmentationNode.GetSegmentation()
+        labelmap = segmentation.GetLayerDataObject(0)
+
+        fillSegmentationFromLabelArray(self.segmentationNode, readLabelArray(get_test_multi_label_path()))
+        self.assertIs(segmentation.GetLayerDataObject(0), labelmap)
+        self.assertEqual(segmentation.GetNumberOfLayers(), 1)
+
+    def test_segments_missing_from_results_are_removed(self):
+        fillSegmentationFromLabelArray(self.segmentationNode, readLabelArray(get_test_multi_label_path()))
+        fillSegmentationFromLabelArray(
+            self.segmentationNode, readLabelArray(get_test_multi_label_path_with_segments_1_3_5())
+        )
+
+        segmentation = self.segmentationNode.GetSegmentation()
+        segmentIds = [segmentation.GetNthSegmentID(i) for i in range(segmentation.GetNumberOfSegments())]
+        self.assertEqual(segmentIds, ["Segment_1", "Segment_3", "Segment_5"])
+
+    def test_uncompressed_results_are_memory_mapped(self):
+        import nibabel
+
+        with TemporaryDirectory() as tmpDir:
+            niftiPath = Path(tmpDir).joinpath("results.nii")
+            nibabel.save(nibabel.load(get_test_multi_label_path()), niftiPath.as_posix())
+
+            results = readLabelArray(niftiPath)
+            self.assertIsInstance(results.labelArray, np.memmap)
+            self.assertEqual(results.presentLabelValues(), [1, 2, 3, 4, 5])
+            del results
+
+    def test_result_path_is_read_from_the_public_accessor_first(self):
+        logic = SimpleNamespace(resultPath=MagicMock(return_value=Path("public.nii.gz")), _outFile="private.nii.gz")
+        self.assertEqual(inferenceResultPath(logic), Path("public.nii.gz"))
+
+    def test_result_path_falls_back_to_the_nnunet_logic_private_attribute(self):
+        self.assertEqual(inferenceResultPath(SimpleNamespace(_outFile="private.nii.gz")), Path("private.nii.gz"))
+        self.assertIsNone(inferenceResultPath(SimpleNamespace()))
@@ -0,0 +1,75 @@
+import numpy as np
+import slicer
+
+from DentalSegmentatorLib import SegmentationPostProcessor
+from DentalSegmentatorLib.SegmentationPostProcessing import removeSmallIslandsFromLabelArray
+from .Utils import DentalSegmentatorTestCase, get_test_multi_label_path, load_test_CT_volume
+
+
+class SegmentationPostProcessingTestCase(DentalSegmentatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.volumeNode = load_test_CT_volume()
+
+    @staticmethod
+    def segmentVoxelCounts(segmentationNode, volumeNode):
+        return {
+            segmentId: int(np.count_nonzero(
+                slicer.util.arrayFromSegmentBinaryLabelmap(segmentationNode, segmentId, volumeNode)
+            ))
+            for segmentId in SegmentationPostProcessor.segmentIds()
+        }
+
+    def processedVoxelCounts(self, useVectorizedEngine, minimumIslandSize_mm3=60):
+        segmentationNode = slicer.util.loadSegmentation(get_test_multi_label_path())
+        processor = SegmentationPostProcessor(minimumIslandSize_mm3)
+        processor.useVectorizedEngine = useVectorizedEngine
+        processor.process(segmentationNode, self.volumeNode)
+        counts = self.segmentVoxelCounts(segmentationNode, self.volumeNode)
+        processor.cleanup()
+        slicer.mrmlScene.RemoveNode(segmentationNode)
+        return counts
+
+    def test_removes_small_islands_of_each_label_in_place(self):
+        labels = np.zeros((10, 10, 10), dtype=np.uint8)
+        labels[0:4, 0:4, 0:4] = 1
+        labels[8, 8, 8] = 1
+        labels[6:8, 0:2, 0:2] = 2
+        labels[9, 0, 0] = 2
+
+        removed = removeSmallIslandsFromLabelArray(labels, [1, 2], minimumSize=2)
+        self.assertEqual(removed, {1: 1, 2: 1})
+        self.assertEqual(np.count_nonzero(labels == 1), 64)
+        self.assertEqual(np.count_nonzero(labels == 2), 8)
+
+    def test_touching_labels_are_not_merged(self):
+        labels = np.zeros((4, 4, 4), dtype=np.uint8)
+        labels[0, 0, 0] = 1
+        labels[0, 0, 1] = 2
+        labels[0, 0, 2] = 2
+
+        removeSmallIslandsFromLabelArray(labels, [1, 2], minimumSize=2)
+        self.assertEqual(np.count_nonzero(labels == 1), 0)
+        self.assertEqual(np.count_nonzero(labels == 2), 2)
+
+    def test_can_keep_largest_island_only(self):
+        labels = np.zeros((10, 10, 10), dtype=np.uint8)
+        labels[0:4, 0:4, 0:4] = 1
+        labels[6:9, 6:9, 6:9] = 1
+
+        removeSmallIslandsFromLabelArray(labels, [1], minimumSize=0, keepLargestOnly=True)
+        self.assertEqual(np.count_nonzero(labels == 1), 64)
+
+    def test_vectorized_engine_matches_islands_effect(self):
+        self.assertEqual(
+            self.processedVoxelCounts(useVectorizedEngine=True, minimumIslandSize_mm3=200),
+            self.processedVoxelCounts(useVectorizedEngine=False, minimumIslandSize_mm3=200)
+        )
+
+    def test_mandibular_canals_are_not_filtered(self):
+        segmentationNode = slicer.util.loadSegmentation(get_test_multi_label_path())
+        before = self.segmentVoxelCounts(segmentationNode, self.volumeNode)
+        SegmentationPostProcessor(minimumIslandSize_mm3=1e9).process(segmentationNode, self.volumeNode)
+        after = self.segmentVoxelCounts(segmentationNode, self.volumeNode)
+        self.assertEqual(before["Segment_5"], after["Segment_5"])
+        self.assertEqual(after["Segment_1"], 0)
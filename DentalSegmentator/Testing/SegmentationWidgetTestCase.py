@@ -5,32 +5,8 @@ from unittest.mock import MagicMock
 import SampleData
 import slicer
 
-from DentalSegmentatorLib import SegmentationWidget, Signal, ExportFormat
-from .Utils import (
-    DentalSegmentatorTestCase, get_test_multi_label_path, get_test_multi_label_path_with_segments_1_3_5,
-    load_test_CT_volume
-)
-
-
-class MockLogic:
-    def __init__(self):
-        self.inferenceFinished = Signal()
-        self.errorOccurred = Signal("str")
-        self.progressInfo = Signal("str")
-        self.startSegmentation = MagicMock()
-        self.stopSegmentation = MagicMock()
-        self.setParameter = MagicMock()
-        self.waitForSegmentationFinished = MagicMock()
-        self.loadSegmentation = MagicMock()
-        self.loadSegmentation.side_effect = self.load_segmentation
-
-    @staticmethod
-    def load_segmentation():
-        return slicer.util.loadSegmentation(get_test_multi_label_path())
-
-    @staticmethod
-    def load_segmentation_partial():
-        return slicer.util.loadSegmentation(get_test_multi_label_path_with_segments_1_3_5())
+from DentalSegmentatorLib import SegmentationWidget, ExportFormat, SegmentationResultCache
+from .Utils import DentalSegmentatorTestCase, MockLogic, load_test_CT_volume
 
 
 class SegmentationWidgetTestCase(DentalSegmentatorTestCase):
@@ -38,15 +14,32 @@ class SegmentationWidgetTestCase(DentalSegmentatorTestCase):
         super().setUp()
         self.logic = MockLogic()
         self.node = load_test_CT_volume()
+        self.cacheDir = TemporaryDirectory()
+        self.resultCache = SegmentationResultCache(self.cacheDir.name)
+        self.prevCacheEnabled = self.resultCache.isEnabled
+        self.resultCache.isEnabled = True
 
-        self.widget = SegmentationWidget(logic=self.logic)
+        self.widget = SegmentationWidget(logic=self.logic, resultCache=self.resultCache)
         self.widget.inputSelector.setCurrentNode(self.node)
         self.widget.show()
         slicer.app.processEvents()
 
+    def tearDown(self):
+        super().tearDown()
+        self.resultCache.isEnabled = self.prevCacheEnabled
+        self.cacheDir.cleanup()
+
     def test_can_be_displayed(self):
         slicer.app.processEvents()
 
+    def test_collapsed_panels_are_built_on_first_expand(self):
+        self.assertTrue(self.widget.exportPanel.isBuilt())
+        self.assertFalse(self.widget.resultCachePanel.isBuilt())
+
+        self.widget.resultCachePanel.collapsibleButton.collapsed = False
+        self.assertTrue(self.widget.resultCachePanel.isBuilt())
+        self.assertTrue(self.widget.cacheEnabledCheckBox.isChecked())
+
     def test_can_run_segmentation(self):
         slicer.app.processEvents()
         self.assertTrue(self.widget.applyButton.isEnabled())
@@ -81,6 +74,113 @@ class SegmentationWidgetTestCase(DentalSegmentatorTestCase):
         self.assertTrue(self.widget.applyButton.isVisible())
         self.assertFalse(self.widget.stopButton.isVisible())
 
+    def test_cropped_field_of_view_is_segmented_and_removed(self):
+        self.widget.cropCheckBox.setChecked(True)
+        self.widget.applyButton.click()
+        slicer.app.processEvents()
+
+        self.logic.startSegmentation.assert_called_once()
+        croppedNode = self.logic.startSegmentation.call_args[0][0]
+        self.assertIsNot(croppedNode, self.node)
+        self.assertLess(
+            croppedNode.GetImageData().GetNumberOfPoints(), self.node.GetImageData().GetNumberOfPoints()
+        )
+
+        self.logic.inferenceFinished()
+        slicer.app.processEvents()
+        self.assertFalse(slicer.mrmlScene.IsNodePresent(croppedNode))
+        self.logic.loadSegmentation.assert_called_once()
+
+    def test_preview_is_replaced_by_full_resolution_segmentation(self):
+        self.widget.previewCheckBox.setChecked(True)
+        self.widget.applyButton.click()
+        self.logic.startSegmentation.assert_called_once()
+
+        self.logic.inferenceFinished()
+        slicer.app.processEvents()
+        self.assertEqual(self.logic.startSegmentation.call_count, 2)
+        self.logic.startSegmentation.assert_called_with(self.node)
+        self.assertTrue(self.widget.stopButton.isVisible())
+
+        self.logic.inferenceFinished()
+        slicer.app.processEvents()
+        self.assertTrue(self.widget.applyButton.isVisible())
+        self.assertFalse(self.widget.refineButton.isVisible())
+        self.assertEqual(self.logic.loadSegmentation.call_count, 2)
+        self.assertEqual(len(list(slicer.mrmlScene.GetNodesByClass("vtkMRMLSegmentationNode"))), 1)
+
+    def test_preview_can_be_refined_on_request(self):
+        self.widget.previewCheckBox.setChecked(True)
+        self.widget.refineAutomaticallyCheckBox.setChecked(False)
+        self.widget.applyButton.click()
+        self.logic.inferenceFinished()
+        slicer.app.processEvents()
+        self.logic.startSegmentation.assert_called_once()
+        self.assertTrue(self.widget.refineButton.isVisible())
+
+        self.widget.refineButton.click()
+        self.logic.startSegmentation.assert_called_with(self.node)
+        self.logic.inferenceFinished()
+        slicer.app.processEvents()
+        self.assertFalse(self.widget.refineButton.isVisible())
+
+    def test_default_inference_profile_is_balanced(self):
+        self.assertEqual(self.widget.getSelectedInferenceProfile(), "Balanced")
+        self.widget.applyButton.click()
+        parameter = self.logic.setParameter.call_args[0][0]
+        self.assertEqual(parameter.stepSize, 0.5)
+        self.assertTrue(parameter.disableTta)
+
+    def test_selected_inference_profile_is_set_on_parameter(self):
+        self.widget.inferenceProfileComboBox.setCurrentText("Fast")
+        self.widget.applyButton.click()
+        parameter = self.logic.setParameter.call_args[0][0]
+        self.assertEqual(parameter.stepSize, 1.0)
+        self.assertTrue(parameter.disableTta)
+
+    def test_onnx_device_runs_onnx_logic_on_cpu(self):
+        onnxLogic = MockLogic()
+        self.widget._createOnnxLogic = MagicMock(return_value=onnxLogic)
+        self.widget.deviceComboBox.setCurrentText(self.widget.onnxDevice)
+        self.widget._installOnnxRuntimeIfNeeded = MagicMock(return_value=True)
+        self.widget.applyButton.click()
+
+        self.logic.startSegmentation.assert_not_called()
+        onnxLogic.startSegmentation.assert_called_once_with(self.node)
+        self.assertEqual(onnxLogic.setParameter.call_args[0][0].device, "cpu")
+
+        onnxLogic.inferenceFinished()
+        slicer.app.processEvents()
+        onnxLogic.loadSegmentation.assert_called_once()
+        self.assertTrue(self.widget.applyButton.isVisible())
+
+    def test_fold_ensemble_cache_key_uses_the_merge_method_of_the_workers(self):
+        parameter = MagicMock()
+        self.widget._nParallelFoldWorkers = MagicMock(return_value=1)
+        self.assertIsNone(self.widget._foldEnsembleMethod(parameter))
+
+        self.widget._nParallelFoldWorkers = MagicMock(return_value=3)
+        self.assertEqual(self.widget._foldEnsembleMethod(parameter), "labelVote")
+        self.widget.deviceComboBox.setCurrentText(self.widget.onnxDevice)
+        self.assertEqual(self.widget._foldEnsembleMethod(parameter), "probabilityAverage")
+
+    def test_onnx_int8_device_reports_quantized_weights_accuracy(self):
+        onnxLogic = MockLogic()
+        self.widget._createOnnxLogic = MagicMock(return_value=onnxLogic)
+        self.widget._installOnnxRuntimeIfNeeded = MagicMock(return_value=True)
+        dependencyChecker = self.widget._dependencyChecker
+        dependencyChecker.areQuantizedWeightsAvailable = MagicMock(return_value=True)
+        dependencyChecker.generateQuantizedWeights = MagicMock()
+        dependencyChecker.readQuantizationReport = MagicMock(return_value="INT8 accuracy report")
+        self.widget.deviceComboBox.setCurrentText(self.widget.onnxInt8Device)
+        self.widget.applyButton.click()
+
+        self.widget._createOnnxLogic.assert_called_once_with("int8")
+        dependencyChecker.generateQuantizedWeights.assert_not_called()
+        onnxLogic.startSegmentation.assert_called_once_with(self.node)
+        self.widget._logSink.flush()
+        self.assertIn("INT8 accuracy report", self.widget.currentInfoTextEdit.toPlainText())
+
     def test_loading_replaces_existing_segmentation_node(self):
         self.logic.inferenceFinished()
         slicer.app.processEvents()
@@ -137,6 +237,27 @@ class SegmentationWidgetTestCase(DentalSegmentatorTestCase):
             self.assertEqual(len(list(tmpPath.glob("*.nii.gz"))), 1)
             self.assertEqual(len(list(tmpPath.glob("*.gltf"))), 1)
 
+    def test_export_reuses_the_displayed_surfaces(self):
+        self.logic.inferenceFinished()
+        slicer.app.processEvents()
+        nMisses = self.widget.surfaceCache.nMisses
+        self.assertGreaterEqual(nMisses, 5)
+
+        with TemporaryDirectory() as tmp:
+            self.widget.exportSegmentation(self.widget.getCurrentSegmentationNode(), tmp, ExportFormat.STL)
+            self.assertEqual(len(list(Path(tmp).glob("*.stl"))), 5)
+        self.assertEqual(self.widget.surfaceCache.nMisses, nMisses)
+
+    def test_surface_smoothing_changes_are_cached(self):
+        self.logic.inferenceFinished()
+        slicer.app.processEvents()
+        initialSmoothing = self.widget.surfaceSmoothingSlider.value
+
+        self.widget.surfaceSmoothingSlider.setValue(0.9 if initialSmoothing != 0.9 else 0.1)
+        nMisses = self.widget.surfaceCache.nMisses
+        self.widget.surfaceSmoothingSlider.setValue(initialSmoothing)
+        self.assertEqual(self.widget.surfaceCache.nMisses, nMisses)
+
     def test_synchronises_segmentation_selector_to_processed_volume(self):
         self.assertIsNone(self.widget.getCurrentSegmentationNode())
         self.logic.inferenceFinished()
@@ -187,3 +308,85 @@ class SegmentationWidgetTestCase(DentalSegmentatorTestCase):
         slicer.app.processEvents()
         self.assertTrue(self.widget.applyButton.isVisible())
         self.logic.stopSegmentation.assert_called_once()
+
+    def test_queued_volumes_are_segmented_one_after_the_other(self):
+        otherNode = SampleData.SampleDataLogic().downloadMRHead()
+        self.widget.segmentationQueue.enqueue(self.node)
+        self.widget.segmentationQueue.enqueue(otherNode)
+        self.widget.queueWidget.startButton.click()
+        slicer.app.processEvents()
+        self.logic.startSegmentation.assert_called_once_with(self.node)
+        self.assertFalse(self.widget.applyButton.isVisible())
+
+        self.logic.inferenceFinished()
+        slicer.app.processEvents()
+        self.logic.startSegmentation.assert_called_with(otherNode)
+        self.assertFalse(self.widget.applyButton.isVisible())
+
+        self.logic.inferenceFinished()
+        slicer.app.processEvents()
+        self.assertEqual(self.logic.startSegmentation.call_count, 2)
+        self.assertTrue(self.widget.applyButton.isVisible())
+        self.assertIn(self.node, self.widget.processedVolumes)
+        self.assertIn(otherNode, self.widget.processedVolumes)
+
+    def test_queued_volumes_can_be_reordered_and_cancelled(self):
+        otherNode = SampleData.SampleDataLogic().downloadMRHead()
+        queue = self.widget.segmentationQueue
+        queue.enqueue(self.node)
+        queue.enqueue(otherNode)
+        self.assertFalse(queue.enqueue(otherNode))
+
+        self.assertEqual(queue.move(1, -1), 0)
+        self.assertEqual(queue.volumeNodes(), [otherNode, self.node])
+        self.assertEqual(self.widget.queueWidget.queueListWidget.count, 2)
+
+        queue.remove(otherNode)
+        self.assertEqual(queue.volumeNodes(), [self.node])
+        self.assertEqual(self.widget.queueWidget.queueListWidget.count, 1)
+
+    def test_stopping_keeps_remaining_queued_volumes(self):
+        otherNode = SampleData.SampleDataLogic().downloadMRHead()
+        self.widget.segmentationQueue.enqueue(self.node)
+        self.widget.segmentationQueue.enqueue(otherNode)
+        self.widget.queueWidget.startButton.click()
+        self.widget.stopButton.click()
+        slicer.app.processEvents()
+
+        self.logic.startSegmentation.assert_called_once_with(self.node)
+        self.assertEqual(self.widget.segmentationQueue.volumeNodes(), [otherNode])
+        self.assertTrue(self.widget.applyButton.isVisible())
+
+    def test_applying_twice_on_same_volume_uses_result_cache(self):
+        self.widget.applyButton.click()
+        self.logic.inferenceFinished()
+        slicer.app.processEvents()
+        self.assertEqual(len(self.resultCache.entries()), 1)
+
+        self.widget.applyButton.click()
+        slicer.app.processEvents()
+        self.logic.startSegmentation.assert_called_once()
+        self.assertEqual(self.logic.loadSegmentation.call_count, 1)
+        self.assertTrue(self.widget.applyButton.isVisible())
+        self.assertIsNotNone(self.widget.getCurrentSegmentationNode())
+
+    def test_segmentation_stages_are_traced(self):
+        self.widget.applyButton.click()
+        self.logic.inferenceFinished()
+        slicer.app.processEvents()
+
+        stages = [stage.name for stage in self.widget.tracer.summary()]
+        for stage in ["Inference", "Load segmentation", "Update segmentation display", "Post processing"]:
+            self.assertIn(stage, stages)
+        self.assertIn("Post process Mandible", stages)
+
+    def test_disabled_result_cache_is_not_used(self):
+        self.widget.resultCachePanel.collapsibleButton.collapsed = False
+        self.widget.cacheEnabledCheckBox.setChecked(False)
+        for _ in range(2):
+            self.widget.applyButton.click()
+            self.logic.inferenceFinished()
+            slicer.app.processEvents()
+
+        self.assertEqual(self.logic.startSegmentation.call_count, 2)
+        self.assertEqual(len(self.resultCache.entries()), 0)
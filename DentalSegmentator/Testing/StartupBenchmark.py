@@ -0,0 +1,75 @@
+"""
+Measure the DentalSegmentator startup times to track regressions.
+
+Run in a fresh Slicer process, as the measured imports are cached by the Python interpreter once done :
+
+    Slicer --no-main-window --python-script DentalSegmentator/Testing/StartupBenchmark.py --output startup.json
+
+Reports the DentalSegmentatorLib import time, the heavy modules loaded by this import, the time until the segmentation
+widget is displayed and the time taken to build the deferred panels.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+heavyModules = ["numpy", "SegmentEditorEffects", "github", "torch", "nnunetv2", "SimpleITK"]
+
+
+def elapsed_ms(startTime):
+    return (time.perf_counter() - startTime) * 1000
+
+
+def runBenchmark():
+    import slicer
+
+    sys.path.insert(0, Path(__file__).parents[1].as_posix())
+    loadedModules = set(sys.modules)
+
+    startTime = time.perf_counter()
+    from DentalSegmentatorLib import SegmentationWidget
+    from DentalSegmentatorLib.Utils import LazyWidget
+    results = {
+        "import_ms": elapsed_ms(startTime),
+        "heavy_modules_loaded_on_import": [m for m in heavyModules if m in set(sys.modules) - loadedModules],
+    }
+
+    startTime = time.perf_counter()
+    widget = SegmentationWidget()
+    results["construction_ms"] = elapsed_ms(startTime)
+
+    widget.show()
+    slicer.app.processEvents()
+    results["widget_shown_ms"] = elapsed_ms(startTime)
+
+    startTime = time.perf_counter()
+    deferredPanels = {name: panel for name, panel in vars(widget).items() if isinstance(panel, LazyWidget)}
+    for panel in deferredPanels.values():
+        panel.widget()
+    results["deferred_panels_ms"] = elapsed_ms(startTime)
+    results["deferred_panels"] = sorted(deferredPanels)
+
+    widget.close()
+    return results
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="DentalSegmentator startup benchmark.")
+    parser.add_argument("--output", type=Path, help="Optional JSON file where the results are written.")
+    args = parser.parse_args(argv)
+
+    results = runBenchmark()
+    for key, value in results.items():
+        print(f"{key:>32} : {value:.1f}" if isinstance(value, float) else f"{key:>32} : {value}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    import slicer
+
+    main(sys.argv[1:])
+    slicer.util.exit()
@@ -0,0 +1,66 @@
+import json
+import threading
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from DentalSegmentatorLib import Tracer
+from .Utils import DentalSegmentatorTestCase
+
+
+class TracingTestCase(DentalSegmentatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tracer = Tracer()
+
+    def test_nested_spans_are_recorded_in_their_parent_span(self):
+        with self.tracer.span("Post processing"):
+            for name in ["Mandible", "Maxilla"]:
+                with self.tracer.span(f"Post process {name}", segment=name):
+                    pass
+
+        parent, *children = self.tracer.spans()
+        self.assertEqual(parent.name, "Post processing")
+        self.assertEqual([child.name for child in children], ["Post process Mandible", "Post process Maxilla"])
+        for child in children:
+            self.assertGreaterEqual(child.start_s, parent.start_s)
+            self.assertLessEqual(child.start_s + child.duration_s, parent.start_s + parent.duration_s)
+
+    def test_span_is_recorded_on_exception(self):
+        with self.assertRaises(RuntimeError):
+            with self.tracer.span("Export"):
+                raise RuntimeError()
+
+        self.assertEqual([span.name for span in self.tracer.spans()], ["Export"])
+
+    def test_summary_groups_spans_by_name(self):
+        token = self.tracer.begin("Inference")
+        self.tracer.end(token)
+        for _ in range(3):
+            with self.tracer.span("Export STL"):
+                pass
+
+        summary = self.tracer.summary()
+        self.assertEqual([(s.name, s.count) for s in summary], [("Inference", 1), ("Export STL", 3)])
+        self.assertIn("Export STL", self.tracer.formatSummary())
+
+    def test_disabled_tracer_doesnt_record_spans(self):
+        self.tracer.isEnabled = False
+        with self.tracer.span("Inference"):
+            pass
+        self.assertEqual(self.tracer.spans(), [])
+
+    def test_can_be_saved_as_chrome_trace(self):
+        with self.tracer.span("Export", "export"):
+            thread = threading.Thread(target=lambda: self.tracer.end(self.tracer.begin("Export STL", "export")))
+            thread.start()
+            thread.join()
+
+        with TemporaryDirectory() as tmpDir:
+            tracePath = Path(tmpDir).joinpath("trace.json")
+            self.tracer.saveChromeTrace(tracePath)
+            events = json.loads(tracePath.read_text())["traceEvents"]
+
+        completeEvents = [event for event in events if event["ph"] == "X"]
+        self.assertEqual([event["name"] for event in completeEvents], ["Export", "Export STL"])
+        self.assertNotEqual(completeEvents[0]["tid"], completeEvents[1]["tid"])
+        self.assertEqual(len([event for event in events if event["ph"] == "M"]), 2)
@@ -1,8 +1,11 @@
 import unittest
 from pathlib import Path
+from unittest.mock import MagicMock
 
 import slicer
 
+from DentalSegmentatorLib import Signal
+
 
 class DentalSegmentatorTestCase(unittest.TestCase):
     def setUp(self):
@@ -34,3 +37,73 @@ def get_test_multi_label_path():
 
 def get_test_multi_label_path_with_segments_1_3_5():
     return _dataFolderPath().joinpath("PostDentalSurgery_Segmentation_1_3_5.nii.gz").as_posix()
+
+
+def dice_scores(labelArray, referenceArray):
+    """
+    :returns: Dice score of each DentalSegmentator segment name.
+    :raises RuntimeError: if the label arrays don't have the same shape.
+    """
+    import numpy as np
+    from DentalSegmentatorLib import SegmentationPostProcessor
+
+    if labelArray.shape != referenceArray.shape:
+        raise RuntimeError(f"Segmentation shape {labelArray.shape} doesn't match reference {referenceArray.shape}.")
+
+    scores = {}
+    for labelValue, segmentName in enumerate(SegmentationPostProcessor.labels, start=1):
+        isLabel, isReference = labelArray == labelValue, referenceArray == labelValue
+        nVoxels = isLabel.sum() + isReference.sum()
+        scores[segmentName] = float(2 * np.logical_and(isLabel, isReference).sum() / nVoxels) if nVoxels else 1.0
+    return scores
+
+
+def run_inference(logic, parameter, volumeNode):
+    """
+    Run the segmentation logic inference and wait for its results.
+
+    :returns: Result label array and inference time in seconds.
+    :raises RuntimeError: if the inference fails.
+    """
+    import time
+    import numpy as np
+    from DentalSegmentatorLib import readLabelArray
+    from DentalSegmentatorLib.SegmentationLoading import inferenceResultPath
+
+    errors = []
+    connectId = logic.errorOccurred.connect(errors.append)
+    try:
+        logic.setParameter(parameter)
+        startTime = time.perf_counter()
+        logic.startSegmentation(volumeNode)
+        logic.waitForSegmentationFinished()
+        slicer.app.processEvents()
+        inference_s = time.perf_counter() - startTime
+    finally:
+        logic.errorOccurred.disconnect(connectId)
+
+    resultPath = inferenceResultPath(logic)
+    if errors or resultPath is None:
+        raise RuntimeError(f"Inference failed :\n{''.join(errors)}")
+    return np.asarray(readLabelArray(resultPath).labelArray), inference_s
+
+
+class MockLogic:
+    def __init__(self):
+        self.inferenceFinished = Signal()
+        self.errorOccurred = Signal("str")
+        self.progressInfo = Signal("str")
+        self.startSegmentation = MagicMock()
+        self.stopSegmentation = MagicMock()
+        self.setParameter = MagicMock()
+        self.waitForSegmentationFinished = MagicMock()
+        self.loadSegmentation = MagicMock()
+        self.loadSegmentation.side_effect = self.load_segmentation
+
+    @staticmethod
+    def load_segmentation():
+        return slicer.util.loadSegmentation(get_test_multi_label_path())
+
+    @staticmethod
+    def load_segmentation_partial():
+        return slicer.util.loadSegmentation(get_test_multi_label_path_with_segments_1_3_5())
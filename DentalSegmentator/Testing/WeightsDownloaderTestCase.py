@@ -0,0 +1,119 @@
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from DentalSegmentatorLib.WeightsDownloader import ChunkedDownloader
+from .Utils import DentalSegmentatorTestCase
+
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves the server payload with HTTP Range support. Range requests starting at one of the server failingOffsets
+    return an error.
+    """
+
+    def log_message(self, *_):
+        pass
+
+    def _sendHeaders(self, status, start, end):
+        self.send_response(status)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("ETag", '"test-etag"')
+        if self.server.acceptsRanges:
+            self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(self.server.payload)}")
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._sendHeaders(200, 0, len(self.server.payload) - 1)
+
+    def do_GET(self):
+        payload = self.server.payload
+        rangeHeader = self.headers.get("Range")
+        if rangeHeader is None or not self.server.acceptsRanges:
+            self.server.requestedRanges.append(None)
+            self._sendHeaders(200, 0, len(payload) - 1)
+            self.wfile.write(payload)
+            return
+
+        start, end = (int(v) for v in rangeHeader.replace("bytes=", "").split("-"))
+        self.server.requestedRanges.append((start, end))
+        if start in self.server.failingOffsets:
+            self.send_error(503)
+            return
+
+        self._sendHeaders(206, start, end)
+        self.wfile.write(payload[start:end + 1])
+
+
+class WeightsDownloaderTestCase(DentalSegmentatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmpDir = TemporaryDirectory()
+        self.destPath = Path(self.tmpDir.name).joinpath("weights.zip")
+        self.payload = os.urandom(100 * 1024 + 17)
+        self.sha256 = hashlib.sha256(self.payload).hexdigest()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), RangeRequestHandler)
+        self.server.payload = self.payload
+        self.server.acceptsRanges = True
+        self.server.failingOffsets = set()
+        self.server.requestedRanges = []
+        self.serverThread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.serverThread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/weights.zip"
+
+    def tearDown(self):
+        super().tearDown()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpDir.cleanup()
+
+    def createDownloader(self, expectedSha256=None, **kwargs):
+        return ChunkedDownloader(
+            self.url, self.destPath, expectedSha256=expectedSha256 or self.sha256, chunkSize=16 * 1024, **kwargs
+        )
+
+    def test_downloads_file_in_parallel_chunks(self):
+        progress = []
+        path = self.createDownloader(progressCallback=lambda *args: progress.append(args)).download()
+
+        self.assertEqual(path.read_bytes(), self.payload)
+        self.assertEqual(len(self.server.requestedRanges), 7)
+        self.assertEqual(progress[-1], (len(self.payload), len(self.payload)))
+        self.assertFalse(self.createDownloader().partialPath.exists())
+        self.assertFalse(self.createDownloader().journalPath.exists())
+
+    def test_interrupted_download_resumes_missing_chunks_only(self):
+        self.server.failingOffsets = {32 * 1024}
+        with self.assertRaises(Exception):
+            self.createDownloader(nConnections=1).download()
+        self.assertTrue(self.createDownloader().journalPath.exists())
+
+        self.server.failingOffsets = set()
+        self.server.requestedRanges = []
+        path = self.createDownloader().download()
+
+        self.assertEqual(path.read_bytes(), self.payload)
+        self.assertIn((32 * 1024, 48 * 1024 - 1), self.server.requestedRanges)
+        self.assertNotIn((0, 16 * 1024 - 1), self.server.requestedRanges)
+
+    def test_sha256_mismatch_raises_and_discards_download(self):
+        downloader = self.createDownloader(expectedSha256="0" * 64)
+        with self.assertRaises(RuntimeError):
+            downloader.download()
+
+        self.assertFalse(self.destPath.exists())
+        self.assertFalse(downloader.partialPath.exists())
+        self.assertFalse(downloader.journalPath.exists())
+
+    def test_server_without_range_support_is_downloaded_in_one_stream(self):
+        self.server.acceptsRanges = False
+        path = self.createDownloader().download()
+
+        self.assertEqual(path.read_bytes(), self.payload)
+        self.assertEqual(self.server.requestedRanges, [None])